@@ -0,0 +1,281 @@
+'''
+A load tester for galyleo_server_blueprint.  For each scenario in a JSON config file, it
+starts the blueprint in a separate process, serving synthetic tables (see benchmarks.tables)
+through one of the server modes, replays a weighted mix of dashboard requests (table specs,
+all-values, numeric specs and filtered rows with varied Filter-Spec headers) from a pool of
+client threads for a fixed duration, and reports throughput, latency percentiles and the
+server's CPU time and peak RSS.
+
+Usage:
+    python -m benchmarks.load_test benchmarks/load_test.json [--scenario name] [--output results.json]
+
+A config file is a dictionary {"scenarios": [<scenario>, ...]}, where each scenario is a
+dictionary with the fields (all but name optional):
+    name: name of the scenario
+    mode: the server mode: "rows" (GalyleoDataServer over a list of rows), "single_flight",
+        "snapshot" (refresh_interval = 60), or "columnar" (ColumnarDataServer).  Default "rows"
+    tables: list of {"name", "rows", "seed"}.  Default one table of 100000 rows
+    workers: the workers argument of the table servers.  Default 1
+    concurrency: number of client threads.  Default 8
+    duration: length of the run, in seconds.  Default 10
+    mix: weights of the request kinds {"get_table_spec", "get_all_values", "get_numeric_spec",
+        "get_filtered_rows"}.  Default {"get_table_spec": 1, "get_all_values": 2,
+        "get_numeric_spec": 2, "get_filtered_rows": 5}
+    seed: random seed for the request stream.  Default 0
+The clients are Python threads, so on a small machine the load generator itself can be the
+bottleneck; compare scenarios run on the same machine.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from json import dumps, loads
+
+from benchmarks.tables import PARTIES, SCHEMA, STATES, make_rows
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_MIX = {"get_table_spec": 1, "get_all_values": 2, "get_numeric_spec": 2, "get_filtered_rows": 5}
+DEFAULT_SCENARIO = {"mode": "rows", "tables": [{"name": "votes", "rows": 100000, "seed": 0}], "workers": 1,
+                    "concurrency": 8, "duration": 10, "mix": DEFAULT_MIX, "seed": 0}
+MODES = ("rows", "single_flight", "snapshot", "columnar")
+
+
+def _table_server(mode, rows, workers):
+    '''
+    Build the table server for mode over rows
+    '''
+    from galyleo.galyleo_columns import ColumnarDataServer
+    from galyleo.galyleo_table_server import GalyleoDataServer
+    if mode == 'columnar':
+        server = ColumnarDataServer.from_rows(SCHEMA, rows)
+        server.workers = workers
+        return server
+    options = {"single_flight": mode == 'single_flight', "refresh_interval": 60 if mode == 'snapshot' else None}
+    return GalyleoDataServer(SCHEMA, lambda: rows, workers = workers, **options)
+
+def _serve(scenario, port_queue):
+    '''
+    The server process: register the scenario's tables with the blueprint and serve it,
+    reporting the port on port_queue
+    '''
+    from flask import Flask
+    from werkzeug.serving import make_server
+    from galyleo.galyleo_server_framework import add_table_server, galyleo_server_blueprint
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app = Flask('galyleo_load_test')
+    app.register_blueprint(galyleo_server_blueprint)
+    for table in scenario["tables"]:
+        add_table_server(table["name"], _table_server(scenario["mode"], make_rows(table["rows"], table.get("seed", 0)), scenario["workers"]))
+    server = make_server('127.0.0.1', 0, app, threaded = True)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+def _process_stats(pid):
+    '''
+    Return (cpu seconds, rss bytes) of process pid, or (None, None) if they can't be read
+    '''
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            cpu = process.cpu_times()
+            return (cpu.user + cpu.system, process.memory_info().rss)
+        except psutil.Error:
+            return (None, None)
+    try:
+        with open(f'/proc/{pid}/stat', 'r', encoding = 'utf-8') as stat_file:
+            fields = stat_file.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        rss = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+        return (cpu, rss)
+    except (OSError, IndexError, ValueError):
+        return (None, None)
+
+def random_filter_spec(generator):
+    '''
+    Return a random filter spec of the kind a dashboard sends: a dropdown selection,
+    a slider range, or a combination of the two
+    '''
+    states = {"operator": "IN_LIST", "column": "State", "values": generator.sample(STATES, generator.randint(1, 5))}
+    start = 1828 + 4 * generator.randrange(40)
+    years = {"operator": "IN_RANGE", "column": "Year", "min_val": start, "max_val": start + 4 * generator.randint(1, 10)}
+    parties = {"operator": "IN_LIST", "column": "Party", "values": generator.sample(PARTIES, 2)}
+    return generator.choice([states, years, {"operator": "ALL", "arguments": [states, years]},
+                             {"operator": "ANY", "arguments": [parties, years]}])
+
+def make_request(kind, table_name, generator):
+    '''
+    Return (path, headers) for a request of kind (a key of DEFAULT_MIX) to table table_name
+    '''
+    headers = {"Table-Name": table_name}
+    if kind == 'get_table_spec':
+        return ('/get_table_spec', headers)
+    if kind == 'get_all_values':
+        return (f'/get_all_values?column_name={generator.choice(["State", "Party"])}', headers)
+    if kind == 'get_numeric_spec':
+        return (f'/get_numeric_spec?column_name={generator.choice(["Year", "Votes"])}', headers)
+    if kind == 'get_filtered_rows':
+        return ('/get_filtered_rows', dict(headers, **{"Filter-Spec": dumps(random_filter_spec(generator))}))
+    raise ValueError(f'Unknown request kind {kind}')
+
+def percentiles(latencies):
+    '''
+    Return {"count", "mean", "p50", "p95", "p99", "max"} of a list of latencies in seconds
+    (nearest-rank percentiles), or {"count": 0} if the list is empty
+    '''
+    if len(latencies) == 0:
+        return {"count": 0}
+    ordered = sorted(latencies)
+    def rank(fraction):
+        return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+    return {"count": len(ordered), "mean": sum(ordered) / len(ordered), "p50": rank(0.5), "p95": rank(0.95),
+            "p99": rank(0.99), "max": ordered[-1]}
+
+def _client(base_url, scenario, seed, deadline, results):
+    '''
+    A client thread: issue requests drawn from the scenario's mix until deadline, appending
+    (kind, latency, ok) to results
+    '''
+    generator = random.Random(seed)
+    kinds = list(scenario["mix"].keys())
+    weights = [scenario["mix"][kind] for kind in kinds]
+    table_names = [table["name"] for table in scenario["tables"]]
+    while time.monotonic() < deadline:
+        kind = generator.choices(kinds, weights)[0]
+        (path, headers) = make_request(kind, generator.choice(table_names), generator)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(base_url + path, headers = headers), timeout = 60) as response:
+                response.read()
+                ok = response.status == 200
+        except (urllib.error.URLError, OSError):
+            ok = False
+        results.append((kind, time.perf_counter() - start, ok))
+
+def run_scenario(scenario):
+    '''
+    Run a scenario (see the module documentation) and return its report: a dictionary
+    {"name", "mode", "concurrency", "duration_seconds", "requests", "errors", "throughput",
+    "latency": {"all": percentiles, <kind>: percentiles, ...},
+    "server": {"cpu_seconds", "cpu_utilization", "peak_rss_bytes"}}
+    '''
+    scenario = dict(DEFAULT_SCENARIO, **scenario)
+    if scenario["mode"] not in MODES:
+        raise ValueError(f'Unknown server mode {scenario["mode"]}; the modes are {MODES}')
+    port_queue = multiprocessing.Queue()
+    server_process = multiprocessing.Process(target = _serve, args = (scenario, port_queue), daemon = True)
+    server_process.start()
+    try:
+        port = port_queue.get(timeout = 300)
+        base_url = f'http://127.0.0.1:{port}'
+        # warm up: build any lazily-built state (snapshots, pools) before timing
+        for kind in scenario["mix"]:
+            _client(base_url, dict(scenario, mix = {kind: 1}), 0, time.monotonic() + 0.01, [])
+        (cpu_start, peak_rss) = _process_stats(server_process.pid)
+        results = []
+        start = time.monotonic()
+        deadline = start + scenario["duration"]
+        threads = [threading.Thread(target = _client, args = (base_url, scenario, scenario["seed"] * 1000 + i, deadline, results))
+                   for i in range(scenario["concurrency"])]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            (_, rss) = _process_stats(server_process.pid)
+            if rss is not None and (peak_rss is None or rss > peak_rss):
+                peak_rss = rss
+            time.sleep(0.25)
+        elapsed = time.monotonic() - start
+        (cpu_end, _) = _process_stats(server_process.pid)
+    finally:
+        server_process.terminate()
+        server_process.join()
+    cpu_seconds = None if cpu_start is None or cpu_end is None else cpu_end - cpu_start
+    latency = {"all": percentiles([latency for (_, latency, _) in results])}
+    for kind in scenario["mix"]:
+        latency[kind] = percentiles([latency for (result_kind, latency, _) in results if result_kind == kind])
+    return {
+        "name": scenario.get("name", scenario["mode"]),
+        "mode": scenario["mode"],
+        "concurrency": scenario["concurrency"],
+        "duration_seconds": elapsed,
+        "requests": len(results),
+        "errors": len([result for result in results if not result[2]]),
+        "throughput": len(results) / elapsed,
+        "latency": latency,
+        "server": {"cpu_seconds": cpu_seconds, "cpu_utilization": None if cpu_seconds is None else cpu_seconds / elapsed,
+                   "peak_rss_bytes": peak_rss}
+    }
+
+def format_report(report):
+    '''
+    Format a scenario report as a few lines of text
+    '''
+    lines = [f'{report["name"]} ({report["mode"]}, {report["concurrency"]} clients): {report["requests"]} requests, '
+             f'{report["errors"]} errors, {report["throughput"]:.1f} requests/s']
+    for (kind, stats) in report["latency"].items():
+        if stats["count"] > 0:
+            lines.append(f'    {kind:18} n={stats["count"]:<7} p50={stats["p50"] * 1000:.1f}ms p95={stats["p95"] * 1000:.1f}ms p99={stats["p99"] * 1000:.1f}ms')
+    server = report["server"]
+    if server["cpu_seconds"] is not None:
+        lines.append(f'    server cpu={server["cpu_seconds"]:.2f}s ({server["cpu_utilization"] * 100:.0f}%) peak rss={server["peak_rss_bytes"] / 2 ** 20:.1f}MB')
+    return '\n'.join(lines)
+
+def main(argv = None):
+    '''
+    Run the scenarios of a config file from the command line.  Returns the exit status
+    '''
+    parser = argparse.ArgumentParser(description = 'Galyleo table server load tester')
+    parser.add_argument('config', help = 'JSON file of scenarios')
+    parser.add_argument('--scenario', default = None, help = 'run only the scenario with this name')
+    parser.add_argument('--output', default = None, help = 'file to write the reports to, as JSON')
+    arguments = parser.parse_args(argv)
+    with open(arguments.config, 'r', encoding = 'utf-8') as config_file:
+        scenarios = loads(config_file.read())["scenarios"]
+    if arguments.scenario is not None:
+        scenarios = [scenario for scenario in scenarios if scenario.get("name") == arguments.scenario]
+    reports = []
+    for scenario in scenarios:
+        reports.append(run_scenario(scenario))
+        print(format_report(reports[-1]))
+    if arguments.output is not None:
+        with open(arguments.output, 'w', encoding = 'utf-8') as output_file:
+            output_file.write(dumps(reports, indent = 2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
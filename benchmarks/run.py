@@ -0,0 +1,255 @@
+'''
+Microbenchmarks for tables, filters, the table server and the JupyterLab client, over
+synthetic tables (see benchmarks.tables) of 10k, 100k and 1M rows.  Each benchmark is timed
+over several runs (the minimum and median are reported) and run once more under tracemalloc
+to measure its peak memory.  Results are written as JSON; --compare checks them against a
+baseline file and exits with status 1 if any benchmark is slower, or uses more memory, than
+the baseline by more than the threshold.  Baselines depend on the machine, so compare only
+against a baseline recorded on the same machine (--save writes one).
+
+Usage:
+    python -m benchmarks.run [--sizes 10000,100000,1000000] [--repeats 3] [--only name,...]
+                             [--output results.json] [--save benchmarks/baseline.json]
+                             [--compare benchmarks/baseline.json] [--threshold 0.25] [--no-memory]
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+from json import dumps, loads
+
+from benchmarks.tables import FILTER_SPECS, PARTIES, SCHEMA, make_table
+from galyleo.galyleo_columns import ColumnarDataServer
+from galyleo.galyleo_exceptions import DataSizeExceeded
+from galyleo.galyleo_jupyterlab_client import GalyleoClient
+from galyleo.galyleo_table_server import Filter
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+DEFAULT_REPEATS = 3
+DEFAULT_THRESHOLD = 0.25
+
+
+class _FakeComm:
+    '''
+    Stands in for the ipykernel Comm: counts the messages which would be sent
+    '''
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, data):
+        self.sent += 1
+
+
+def _dashboard_client():
+    '''
+    A GalyleoClient whose Comm is a _FakeComm, so ipykernel isn't needed
+    '''
+    client = GalyleoClient.__new__(GalyleoClient)
+    client._comm_ = _FakeComm()  # pylint: disable=protected-access
+    return client
+
+
+def bench_aggregate_by(table):
+    '''
+    aggregate_by over two string columns
+    '''
+    return lambda: table.aggregate_by(['State', 'Party'])
+
+def bench_pivot_on_column(table):
+    '''
+    pivot_on_column on a five-valued column, with an "Other" column
+    '''
+    return lambda: table.pivot_on_column('Party', 'Votes', 'pivot', set(PARTIES[:2]), True)
+
+def bench_filter_index(table):
+    '''
+    Filter.filter_index for each of the FILTER_SPECS
+    '''
+    filters = [Filter(spec, table.schema) for spec in FILTER_SPECS]
+    return lambda: [row_filter.filter_index(table.data) for row_filter in filters]
+
+def bench_check_schema_match(table):
+    '''
+    check_schema_match of the whole table
+    '''
+    pairs = [(column["name"], column["type"]) for column in SCHEMA]
+    return lambda: table.check_schema_match(pairs, table.data)
+
+def bench_to_json(table):
+    '''
+    to_json of the whole table
+    '''
+    return table.to_json
+
+def bench_send_data_to_dashboard(table):
+    '''
+    send_data_to_dashboard to a fake Comm.  Tables over the size limits are rejected, which is also timed
+    '''
+    client = _dashboard_client()
+    def send():
+        try:
+            client.send_data_to_dashboard(table)
+        except DataSizeExceeded:
+            pass
+    return send
+
+def bench_columnar_filter(table):
+    '''
+    ColumnarDataServer.get_filtered_rows for each of the FILTER_SPECS
+    '''
+    server = ColumnarDataServer.from_rows(SCHEMA, table.data)
+    return lambda: [server.get_filtered_rows(spec) for spec in FILTER_SPECS]
+
+BENCHMARKS = {
+    "aggregate_by": bench_aggregate_by,
+    "pivot_on_column": bench_pivot_on_column,
+    "filter_index": bench_filter_index,
+    "check_schema_match": bench_check_schema_match,
+    "to_json": bench_to_json,
+    "send_data_to_dashboard": bench_send_data_to_dashboard,
+    "columnar_filter": bench_columnar_filter
+}
+'''
+The benchmarks: each maps a table to a function of no arguments to time
+'''
+
+
+def measure(function, repeats = DEFAULT_REPEATS, memory = True):
+    '''
+    Time function over repeats runs and, if memory is True, measure its peak memory in one more run
+
+    Arguments:
+        function: a function of no arguments
+        repeats: number of timed runs
+        memory: if True, also measure the peak memory allocated by function
+    Returns:
+        {"min_seconds", "median_seconds", "peak_bytes"}; peak_bytes is None if memory is False
+    '''
+    times = []
+    for i in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"min_seconds": min(times), "median_seconds": statistics.median(times), "peak_bytes": peak}
+
+def run_benchmarks(sizes = None, names = None, repeats = DEFAULT_REPEATS, memory = True, log = None):
+    '''
+    Run the benchmarks named in names (default all) at each of sizes (default DEFAULT_SIZES)
+
+    Arguments:
+        sizes: the table sizes, in rows
+        names: the names of the benchmarks to run
+        repeats: number of timed runs of each benchmark
+        memory: if True, measure peak memory
+        log: if not None, a function called with a progress message after each benchmark
+    Returns:
+        a dictionary {"<name>/<size>": measurement}, in the form returned by measure
+    '''
+    sizes = DEFAULT_SIZES if sizes is None else sizes
+    names = list(BENCHMARKS.keys()) if names is None else names
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if len(unknown) > 0:
+        raise ValueError(f'Unknown benchmarks {unknown}')
+    results = {}
+    for size in sizes:
+        table = make_table(size)
+        for name in names:
+            function = BENCHMARKS[name](table)
+            results[f'{name}/{size}'] = measure(function, repeats, memory)
+            if log is not None:
+                log(f'{name}/{size}: {results[f"{name}/{size}"]["min_seconds"]:.4f} s')
+    return results
+
+def compare(results, baseline, threshold = DEFAULT_THRESHOLD):
+    '''
+    Compare results against baseline
+
+    Arguments:
+        results: results of run_benchmarks
+        baseline: results of an earlier run_benchmarks
+        threshold: the fractional increase in time or peak memory which is reported as a regression
+    Returns:
+        a list of (key, measure, baseline value, current value) for each regression
+    '''
+    regressions = []
+    for (key, result) in results.items():
+        if key not in baseline:
+            continue
+        for field in ("min_seconds", "peak_bytes"):
+            old, new = baseline[key].get(field), result.get(field)
+            if old is not None and new is not None and old > 0 and new > old * (1 + threshold):
+                regressions.append((key, field, old, new))
+    return regressions
+
+def main(argv = None):
+    '''
+    Run the benchmarks from the command line.  Returns the exit status
+    '''
+    parser = argparse.ArgumentParser(description = 'Galyleo microbenchmarks')
+    parser.add_argument('--sizes', default = ','.join(str(size) for size in DEFAULT_SIZES), help = 'comma-separated table sizes, in rows')
+    parser.add_argument('--only', default = None, help = 'comma-separated names of the benchmarks to run')
+    parser.add_argument('--repeats', type = int, default = DEFAULT_REPEATS, help = 'timed runs of each benchmark')
+    parser.add_argument('--output', default = None, help = 'file to write the results to')
+    parser.add_argument('--save', default = None, help = 'file to write the results to as a new baseline')
+    parser.add_argument('--compare', default = None, help = 'baseline file to compare the results with')
+    parser.add_argument('--threshold', type = float, default = DEFAULT_THRESHOLD, help = 'fractional slowdown reported as a regression')
+    parser.add_argument('--no-memory', action = 'store_true', help = 'skip the peak memory measurement')
+    arguments = parser.parse_args(argv)
+    sizes = [int(size) for size in arguments.sizes.split(',')]
+    names = None if arguments.only is None else arguments.only.split(',')
+    results = run_benchmarks(sizes, names, arguments.repeats, not arguments.no_memory, log = print)
+    for path in (arguments.output, arguments.save):
+        if path is not None:
+            with open(path, 'w', encoding = 'utf-8') as output_file:
+                output_file.write(dumps(results, indent = 2, sort_keys = True) + '\n')
+    if arguments.compare is None:
+        return 0
+    with open(arguments.compare, 'r', encoding = 'utf-8') as baseline_file:
+        baseline = loads(baseline_file.read())
+    regressions = compare(results, baseline, arguments.threshold)
+    for (key, field, old, new) in regressions:
+        print(f'REGRESSION {key} {field}: {old:.6g} -> {new:.6g} ({(new / old - 1) * 100:+.1f}%)')
+    if len(regressions) == 0:
+        print(f'No regressions beyond {arguments.threshold * 100:.0f}% against {arguments.compare}')
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
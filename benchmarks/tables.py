@@ -0,0 +1,103 @@
+'''
+Synthetic tables for the benchmarks and the load tester.  The tables mix column types the
+way election and census dashboards do: a few low-cardinality string columns (state, party),
+a high-cardinality string column (candidate name), integer year and count columns, a
+floating-point percentage and a boolean.  Tables are generated from a seed, so every run of
+a benchmark sees the same data.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import random
+
+from galyleo.galyleo_constants import GALYLEO_BOOLEAN, GALYLEO_NUMBER, GALYLEO_STRING
+from galyleo.galyleo_table import GalyleoTable
+
+STATES = ['Alabama', 'Alaska', 'Arizona', 'Arkansas', 'California', 'Colorado', 'Connecticut', 'Delaware',
+          'Florida', 'Georgia', 'Hawaii', 'Idaho', 'Illinois', 'Indiana', 'Iowa', 'Kansas', 'Kentucky',
+          'Louisiana', 'Maine', 'Maryland', 'Massachusetts', 'Michigan', 'Minnesota', 'Mississippi',
+          'Missouri', 'Montana', 'Nebraska', 'Nevada', 'New Hampshire', 'New Jersey', 'New Mexico',
+          'New York', 'North Carolina', 'North Dakota', 'Ohio', 'Oklahoma', 'Oregon', 'Pennsylvania',
+          'Rhode Island', 'South Carolina', 'South Dakota', 'Tennessee', 'Texas', 'Utah', 'Vermont',
+          'Virginia', 'Washington', 'West Virginia', 'Wisconsin', 'Wyoming']
+
+PARTIES = ['Democratic', 'Republican', 'Libertarian', 'Green', 'Independent']
+
+SCHEMA = [
+    {"name": "Year", "type": GALYLEO_NUMBER},
+    {"name": "State", "type": GALYLEO_STRING},
+    {"name": "Name", "type": GALYLEO_STRING},
+    {"name": "Party", "type": GALYLEO_STRING},
+    {"name": "Votes", "type": GALYLEO_NUMBER},
+    {"name": "Percentage", "type": GALYLEO_NUMBER},
+    {"name": "Incumbent", "type": GALYLEO_BOOLEAN}
+]
+'''
+The schema of the synthetic tables
+'''
+
+def make_rows(num_rows, seed = 0):
+    '''
+    Generate num_rows rows of the synthetic table
+
+    Arguments:
+        num_rows: the number of rows
+        seed: the random seed
+    Returns:
+        a list of rows, matching SCHEMA
+    '''
+    generator = random.Random(seed)
+    names = [f'Candidate {i}' for i in range(max(10, num_rows // 100))]
+    return [[1828 + 4 * generator.randrange(49), generator.choice(STATES), generator.choice(names),
+             generator.choice(PARTIES), generator.randrange(1000000), round(generator.random() * 100, 2),
+             generator.random() < 0.3] for i in range(num_rows)]
+
+def make_table(num_rows, seed = 0, name = None):
+    '''
+    Generate a GalyleoTable with num_rows rows of synthetic data
+
+    Arguments:
+        num_rows: the number of rows
+        seed: the random seed
+        name: the name of the table (default synthetic_<num_rows>)
+    '''
+    table = GalyleoTable(f'synthetic_{num_rows}' if name is None else name)
+    table.schema = SCHEMA
+    table.data = make_rows(num_rows, seed)
+    return table
+
+FILTER_SPECS = [
+    {"operator": "IN_LIST", "column": "State", "values": ['California', 'Texas', 'New York']},
+    {"operator": "IN_RANGE", "column": "Year", "min_val": 1960, "max_val": 2000},
+    {"operator": "ALL", "arguments": [
+        {"operator": "IN_LIST", "column": "Party", "values": ['Democratic', 'Republican']},
+        {"operator": "IN_RANGE", "column": "Percentage", "min_val": 40, "max_val": 60}]},
+    {"operator": "ANY", "arguments": [
+        {"operator": "IN_LIST", "column": "State", "values": ['Ohio']},
+        {"operator": "NONE", "arguments": [{"operator": "IN_RANGE", "column": "Votes", "min_val": 0, "max_val": 900000}]}]}
+]
+'''
+Filter specs of the shapes dashboards send: a dropdown, a slider, and combinations
+'''
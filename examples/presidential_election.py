@@ -35,7 +35,7 @@ election dashboard.  To run this, make sure that FLASK_APP is set to presidentia
 # import sys
 
 
-from galyleo.galyleo_table_server import GalyleoDataServer
+from galyleo.galyleo_dataframe_server import DataFrameDataServer
 from galyleo.galyleo_constants import GALYLEO_NUMBER, GALYLEO_STRING 
 import pandas as pd
 from flask import Flask
@@ -49,28 +49,19 @@ try:
 except ImportError:
   pass
 
-class ServeFromPandas:
+def serve_from_pandas(spec):
     '''
-    A very simple class which reads a csv file into  a pandas dataframe assigns types to each column, and then has a simple
-    get_rows() function which converts the dataframe into a list of lists.
+    Read a csv file into a pandas dataframe, assign types to each column, and serve it with a
+    DataFrameDataServer, which filters the dataframe's columns directly rather than converting
+    the dataframe to a list of lists on each request.
     Parameters:
-        spec: a pair (<path to csv_file>, <list of types>), where the kth type is the galyleo type of column k 
+        spec: a pair (<path to csv_file>, <list of types>), where the kth type is the galyleo type of column k
     '''
-    def __init__(self, spec):
-        file_name = spec[0]
-        galyleo_types = spec[1]
-        self.dataframe  = pd.read_csv(file_name)
-        columns = self.dataframe.columns.to_list()
-        schema = [{"name": columns[i], "type": galyleo_types[i]} for i in range(len(columns))]
-        self.server = GalyleoDataServer(schema, self.get_rows)
-        self.columns = columns
-        self.types = galyleo_types
-
-    def get_rows(self):
-        '''
-        Implement the get_rows() function as required by the API
-        '''
-        return self.dataframe.to_numpy().tolist()
+    (file_name, galyleo_types) = spec
+    dataframe = pd.read_csv(file_name)
+    columns = dataframe.columns.to_list()
+    schema = [{"name": columns[i], "type": galyleo_types[i]} for i in range(len(columns))]
+    return DataFrameDataServer(dataframe, schema)
 
 app = Flask(__name__)
 CORS(app)
@@ -88,8 +79,7 @@ tables = {
 # Create the tables with the spec and register them with the framework
 #
 for table in tables:
-    server = ServeFromPandas(tables[table])
-    add_table_server(table, server.server)
+    add_table_server(table, serve_from_pandas(tables[table]))
 
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=8080, debug=True)
@@ -44,3 +44,40 @@ Convenience routines provided here to import data from pandas, and json format.
 4. galyleo_jupyter_client: A clien that actually sends data to JupyterLab
 """
 name = "galyleo"
+
+# The classes and functions most programs need, by module.  They are imported the first
+# time they are used (galyleo.GalyleoTable, from galyleo import GalyleoTable), so that
+# importing galyleo doesn't import numpy, Flask or ipykernel.
+_LAZY_ATTRIBUTES = {
+    "GalyleoTable": "galyleo.galyleo_table",
+    "RemoteGalyleoTable": "galyleo.galyleo_table",
+    "Schema": "galyleo.galyleo_schema",
+    "InvalidDataException": "galyleo.galyleo_exceptions",
+    "DataSizeExceeded": "galyleo.galyleo_exceptions",
+    "GalyleoClient": "galyleo.galyleo_jupyterlab_client",
+    "GalyleoDataServer": "galyleo.galyleo_table_server",
+    "ColumnarDataServer": "galyleo.galyleo_columns",
+    "SQLiteDataServer": "galyleo.galyleo_sqlite_server",
+    "DataFrameDataServer": "galyleo.galyleo_dataframe_server",
+    "LiveFeedDataServer": "galyleo.galyleo_live_feed",
+    "galyleo_server_blueprint": "galyleo.galyleo_server_framework",
+    "add_table_server": "galyleo.galyleo_server_framework",
+    "create_server_from_csv": "galyleo.galyleo_server_framework",
+    "add_refresh_job": "galyleo.galyleo_server_framework",
+    "start_feeds": "galyleo.galyleo_server_framework",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES.keys())
+
+
+def __getattr__(attribute):
+    if attribute not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module 'galyleo' has no attribute '{attribute}'")
+    from importlib import import_module  # pylint: disable=import-outside-toplevel
+    value = getattr(import_module(_LAZY_ATTRIBUTES[attribute]), attribute)
+    globals()[attribute] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(_LAZY_ATTRIBUTES.keys()))
@@ -0,0 +1,154 @@
+'''
+Aggregation pushdown.  An aggregate spec asks for a table grouped by some of its columns,
+with aggregates over the rows of each group, so that a dashboard which charts sums or counts
+by category receives one row per category rather than every row.  An aggregate spec is a
+dictionary:
+    {
+        "group_by": list of column names (may be empty, for a single row of totals),
+        "aggregates": list of {"operator": <operator>, "column": <column name>, "name": <name>}
+    }
+where operator is one of AGGREGATE_OPERATORS.  "count" counts the rows of the group and
+takes no column; "sum" and "mean" need a number column; "min" and "max" take any column but
+a boolean one.  Missing values (None and NaN) are skipped by all but "count"; the mean, min
+or max of a group with no values is None.  name defaults to "count" for count and to
+<operator>_<column> otherwise.  aggregates defaults to [{"operator": "count"}].
+
+As in GalyleoTable.aggregate_by, the result has the group columns in schema order, followed
+by the aggregates, and one row for each distinct combination of values of the group columns
+in order of first appearance.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from galyleo.galyleo_constants import GALYLEO_BOOLEAN, GALYLEO_NUMBER
+from galyleo.galyleo_exceptions import InvalidDataException
+
+AGGREGATE_OPERATORS = ('count', 'sum', 'mean', 'min', 'max')
+
+
+def check_valid_aggregate_spec(aggregate_spec, schema):
+    '''
+    Check aggregate_spec against schema, and return it in a normalized form.  Raises an
+    InvalidDataException with an error message if the aggregate spec is invalid
+
+    Arguments:
+        aggregate_spec: the spec to check
+        schema: the Schema of the table
+    Returns:
+        a pair (group_indices, aggregates), where group_indices are the indices of the
+        group columns in schema order, and aggregates is a list of (name, operator, index)
+        with index None for count
+    '''
+    if not isinstance(aggregate_spec, dict):
+        raise InvalidDataException(f'aggregate_spec must be a dictionary, not {type(aggregate_spec)}')
+    group_by = aggregate_spec.get("group_by", [])
+    if not isinstance(group_by, list):
+        raise InvalidDataException(f'The group_by field must be a list, not {type(group_by)}')
+    missing = [name for name in group_by if name not in schema.names]
+    if len(missing) > 0:
+        raise InvalidDataException(f'Group columns {missing} are not present in the schema')
+    group_indices = [i for i in range(len(schema)) if schema.names[i] in set(group_by)]
+    specs = aggregate_spec.get("aggregates", [{"operator": "count"}])
+    if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+        raise InvalidDataException(f'The aggregates field must be a list of dictionaries, not {specs}')
+    aggregates = []
+    for spec in specs:
+        operator = spec.get("operator")
+        if operator not in AGGREGATE_OPERATORS:
+            raise InvalidDataException(f'{operator} is not a valid aggregate.  Valid aggregates are {AGGREGATE_OPERATORS}')
+        if operator == 'count':
+            aggregates.append((spec.get("name", "count"), operator, None))
+            continue
+        column = spec.get("column")
+        if column not in schema.names:
+            raise InvalidDataException(f'{operator} requires a column of the table, not {column}')
+        index = schema.index(column)
+        column_type = schema.types[index]
+        if (operator in {'sum', 'mean'} and column_type != GALYLEO_NUMBER) or column_type == GALYLEO_BOOLEAN:
+            raise InvalidDataException(f'Cannot compute the {operator} of {column}, a column of type {column_type}')
+        aggregates.append((spec.get("name", f'{operator}_{column}'), operator, index))
+    names = [schema.names[i] for i in group_indices] + [name for (name, _, _) in aggregates]
+    if len(names) == 0:
+        raise InvalidDataException('An aggregate spec must have at least one group column or aggregate')
+    if len(set(names)) != len(names):
+        raise InvalidDataException(f'The names of the result columns must be distinct, not {names}')
+    return group_indices, aggregates
+
+def result_schema(schema, group_indices, aggregates):
+    '''
+    Return the schema, as a list of {"name", "type"} records, of an aggregation of a table
+    with schema schema (see check_valid_aggregate_spec)
+    '''
+    columns = [{"name": schema.names[i], "type": schema.types[i]} for i in group_indices]
+    for (name, operator, index) in aggregates:
+        column_type = GALYLEO_NUMBER if operator in {'count', 'sum', 'mean'} else schema.types[index]
+        columns.append({"name": name, "type": column_type})
+    return columns
+
+def _is_missing(value):
+    '''
+    Internal use only.  True if value is None or NaN
+    '''
+    return value is None or (isinstance(value, float) and value != value)
+
+def _aggregate_values(operator, values):
+    '''
+    Internal use only.  Compute operator (other than count) over the values of a group
+    '''
+    present = [value for value in values if not _is_missing(value)]
+    if operator == 'sum':
+        return sum(present)
+    if len(present) == 0:
+        return None
+    if operator == 'mean':
+        return sum(present) / len(present)
+    return min(present) if operator == 'min' else max(present)
+
+def aggregate_rows(rows, group_indices, aggregates):
+    '''
+    Aggregate rows (see the module documentation)
+
+    Arguments:
+        rows: the rows, as a list of lists
+        group_indices: the indices of the group columns, from check_valid_aggregate_spec
+        aggregates: the list of (name, operator, index), from check_valid_aggregate_spec
+    Returns:
+        the aggregated rows, as a list of lists
+    '''
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row[i] for i in group_indices), []).append(row)
+    if len(group_indices) == 0 and len(groups) == 0:
+        groups[()] = []
+    result = []
+    for (key, group) in groups.items():
+        values = list(key)
+        for (_, operator, index) in aggregates:
+            if operator == 'count':
+                values.append(len(group))
+            else:
+                values.append(_aggregate_values(operator, [row[index] for row in group]))
+        result.append(values)
+    return result
@@ -0,0 +1,87 @@
+'''
+Data versions for the tables served by galyleo_server_framework, used to push change
+notifications to dashboards.  Each table key has a version number, which starts at 0 and is
+incremented each time the table's data changes; a subscriber waits until the version of any
+of its tables differs from the one it last saw.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+
+
+class ChangeNotifier:
+    '''
+    A thread-safe map from table key to data version, on which threads can wait for changes
+    '''
+    def __init__(self):
+        self._versions = {}
+        self._condition = threading.Condition()
+
+    def version(self, key):
+        '''
+        Return the current data version of the table with key key
+
+        Arguments:
+            key: the table key (see galyleo_table_registry.get_table_key)
+        '''
+        with self._condition:
+            return self._versions.get(key, 0)
+
+    def notify(self, key):
+        '''
+        Record that the data of the table with key key has changed, waking any waiting subscribers
+
+        Arguments:
+            key: the table key (see galyleo_table_registry.get_table_key)
+        Returns:
+            the new data version of the table
+        '''
+        with self._condition:
+            version = self._versions.get(key, 0) + 1
+            self._versions[key] = version
+            self._condition.notify_all()
+            return version
+
+    def _changes(self, known_versions):
+        '''
+        Internal use only.  The tables whose versions differ from known_versions.  Caller holds the lock
+        '''
+        return {key: self._versions.get(key, 0) for key in known_versions if self._versions.get(key, 0) != known_versions[key]}
+
+    def wait_for_changes(self, known_versions, timeout = None):
+        '''
+        Wait until the version of at least one of the tables in known_versions differs from
+        the version given there, or until timeout seconds have passed
+
+        Arguments:
+            known_versions: a dictionary {table key: data version last seen}
+            timeout: maximum time to wait, in seconds.  None waits until there is a change
+        Returns:
+            a dictionary {table key: current data version} of the tables which have changed, empty on a timeout
+        '''
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._changes(known_versions)) > 0, timeout)
+            return self._changes(known_versions)
@@ -0,0 +1,293 @@
+'''
+An on-disk columnar format for Galyleo tables, designed to be opened with numpy.memmap so
+that a table of any size is ready to serve in milliseconds.  A table is stored as a directory:
+
+    header.json: the name, schema, number of rows, block size, and for each column the
+        name and dtype of its data file, its string dictionary (if any) and its zone map
+    column_<i>.bin: the raw values of column i (codes, for a dictionary-encoded column)
+    column_<i>.dict.bin: the sorted dictionary of column i, if it is a string column
+
+The rows are divided into fixed-size blocks, and the zone map of a column holds the
+minimum and maximum value (code, or tick count for a temporal column) in each block.  When a filter is evaluated, blocks whose
+zone maps show that no row can pass are skipped without being read.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+from json import JSONDecodeError, dumps, loads
+
+import numpy
+
+from galyleo.galyleo_columns import ColumnarDataServer, EncodedColumn, encode_rows, filter_mask
+from galyleo.galyleo_constants import COLUMNAR_BLOCK_SIZE
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_metrics import metrics
+from galyleo.galyleo_table_server import check_range_bounds
+
+COLUMNAR_FORMAT = 'galyleo-columnar'
+COLUMNAR_FORMAT_VERSION = 1
+HEADER_FILE = 'header.json'
+
+
+def _zone_map(column, block_size):
+    '''
+    Internal use only.  Compute the [min, max] of each block of column, ignoring missing
+    values; a block with no values has entry None
+    '''
+    result = []
+    for start in range(0, len(column), block_size):
+        block = column.values[start:start + block_size]
+        if column.dictionary is not None:
+            block = block[block >= 0]
+        elif block.dtype.kind == 'f':
+            block = block[~numpy.isnan(block)]
+        elif block.dtype.kind in 'mM':
+            block = block[~numpy.isnat(block)].view(numpy.int64)
+        result.append(None if len(block) == 0 else [block.min().item(), block.max().item()])
+    return result
+
+def write_columnar_table(path, name, schema, rows, block_size = COLUMNAR_BLOCK_SIZE):
+    '''
+    Write a table in the columnar format to the directory path, which is created if
+    necessary.  Existing files of a table at path are overwritten; the header is written
+    last, so a reader never sees a header for data which is incomplete.
+
+    Arguments:
+        path: the directory to write the table to
+        name: the name of the table
+        schema: a list of records of the form {"name": <column_name, "type": <column_type>}.
+        rows: list of list of values
+        block_size: the number of rows in each zone-map block
+    '''
+    if block_size < 1:
+        raise InvalidDataException(f'block_size must be at least 1, not {block_size}')
+    columns = encode_rows(schema, rows)
+    os.makedirs(path, exist_ok = True)
+    column_entries = []
+    for i, column in enumerate(columns):
+        entry = {"file": f'column_{i}.bin', "dtype": column.values.dtype.str, "zone_map": _zone_map(column, block_size)}
+        column.values.tofile(os.path.join(path, entry["file"]))
+        if column.dictionary is not None:
+            entry["dictionary"] = f'column_{i}.dict.bin'
+            entry["dictionary_dtype"] = column.dictionary.dtype.str
+            entry["dictionary_length"] = len(column.dictionary)
+            column.dictionary.tofile(os.path.join(path, entry["dictionary"]))
+        column_entries.append(entry)
+    header = {
+        "format": COLUMNAR_FORMAT,
+        "version": COLUMNAR_FORMAT_VERSION,
+        "name": name,
+        "schema": list(schema),
+        "num_rows": len(rows),
+        "block_size": block_size,
+        "columns": column_entries
+    }
+    temporary_path = os.path.join(path, HEADER_FILE + '.tmp')
+    with open(temporary_path, 'w', encoding = 'utf-8') as header_file:
+        header_file.write(dumps(header))
+    os.replace(temporary_path, os.path.join(path, HEADER_FILE))
+
+def read_columnar_header(path):
+    '''
+    Read and check the header of the columnar table at path.  Raises an InvalidDataException
+    if there is no header or it is malformed
+
+    Arguments:
+        path: the directory holding the table
+    Returns:
+        the header, as a dictionary
+    '''
+    try:
+        with open(os.path.join(path, HEADER_FILE), 'r', encoding = 'utf-8') as header_file:
+            header = loads(header_file.read())
+    except (OSError, JSONDecodeError) as original_error:
+        raise InvalidDataException(f'Cannot read a columnar table header from {path}') from original_error
+    if not isinstance(header, dict) or header.get("format") != COLUMNAR_FORMAT:
+        raise InvalidDataException(f'{path} is not a {COLUMNAR_FORMAT} table')
+    if header.get("version") != COLUMNAR_FORMAT_VERSION:
+        raise InvalidDataException(f'Unsupported {COLUMNAR_FORMAT} version {header.get("version")}')
+    missing = {"name", "schema", "num_rows", "block_size", "columns"} - set(header.keys())
+    if len(missing) > 0:
+        raise InvalidDataException(f'Columnar table header is missing fields {missing}')
+    if len(header["columns"]) != len(header["schema"]):
+        raise InvalidDataException('Columnar table header has a different number of columns and schema entries')
+    return header
+
+def _map_file(path, file_name, dtype, length):
+    '''
+    Internal use only.  Memory-map a data file read-only, checking that it has the right size
+    '''
+    file_path = os.path.join(path, file_name)
+    dtype = numpy.dtype(dtype)
+    try:
+        size = os.path.getsize(file_path)
+    except OSError as original_error:
+        raise InvalidDataException(f'Missing columnar data file {file_path}') from original_error
+    if size != length * dtype.itemsize:
+        raise InvalidDataException(f'{file_path} has {size} bytes, expected {length * dtype.itemsize}')
+    if length == 0:
+        return numpy.zeros(0, dtype = dtype)
+    return numpy.memmap(file_path, dtype = dtype, mode = 'r', shape = (length,))
+
+def _block_candidates(filter_spec, zone_maps, columns, num_blocks):
+    '''
+    Internal use only.  Return a boolean array with one entry per block, which is False
+    only for blocks in which no row can pass filter_spec.  IN_RANGE and IN_LIST leaves use
+    the zone maps; NONE is not refined (a block can't be excluded by a negation of zone maps).
+    '''
+    operator = filter_spec["operator"]
+    if operator == 'ALL':
+        result = numpy.ones(num_blocks, dtype = numpy.bool_)
+        for argument in filter_spec["arguments"]:
+            result &= _block_candidates(argument, zone_maps, columns, num_blocks)
+        return result
+    if operator == 'ANY':
+        result = numpy.zeros(num_blocks, dtype = numpy.bool_)
+        for argument in filter_spec["arguments"]:
+            result |= _block_candidates(argument, zone_maps, columns, num_blocks)
+        return result
+    if operator == 'NONE' or filter_spec["column"] not in zone_maps:
+        return numpy.ones(num_blocks, dtype = numpy.bool_)
+    lows, highs, empty = zone_maps[filter_spec["column"]]
+    column = columns[filter_spec["column"]]
+    if operator == 'IN_RANGE':
+        min_val, max_val = filter_spec["min_val"], filter_spec["max_val"]
+        check_range_bounds(column.galyleo_type, min_val, max_val)
+        if column.dictionary is not None:
+            min_val = numpy.searchsorted(column.dictionary, min_val, side = 'left')
+            max_val = numpy.searchsorted(column.dictionary, max_val, side = 'right') - 1
+        elif column.values.dtype.kind in 'mM':
+            (min_val, max_val) = column.temporal_keys([min_val, max_val]).view(numpy.int64)
+        return ~empty & (highs >= min_val) & (lows <= max_val)
+    if column.dictionary is not None:
+        values = column.codes_for(filter_spec["values"])
+    elif column.values.dtype.kind in 'mM':
+        values = column.temporal_keys([value for value in filter_spec["values"] if isinstance(value, str)]).view(numpy.int64)
+    else:
+        values = [value for value in filter_spec["values"] if isinstance(value, (int, float))]
+    result = numpy.zeros(num_blocks, dtype = numpy.bool_)
+    for value in values:
+        result |= (lows <= value) & (highs >= value)
+    return result & ~empty
+
+
+class ColumnarFileDataServer(ColumnarDataServer):
+    '''
+    A GalyleoDataServer for a table in the on-disk columnar format.  The column files are
+    memory-mapped, so opening the table reads only the header, and the operating system
+    pages in only the blocks a request touches.  Filters skip the blocks which the zone
+    maps show can't contain a matching row.
+
+    Arguments:
+        path: the directory holding the table
+        header_variables: as for GalyleoDataServer
+        workers: as for GalyleoDataServer
+    '''
+    def __init__(self, path, header_variables = None, workers = 1):
+        header = read_columnar_header(path)
+        self.path = path
+        self.name = header["name"]
+        self.block_size = header["block_size"]
+        num_rows = header["num_rows"]
+        columns = []
+        self._zone_maps = {}
+        for i, entry in enumerate(header["columns"]):
+            values = _map_file(path, entry["file"], entry["dtype"], num_rows)
+            dictionary = None
+            if "dictionary" in entry:
+                dictionary = _map_file(path, entry["dictionary"], entry["dictionary_dtype"], entry["dictionary_length"])
+            columns.append(EncodedColumn(header["schema"][i]["type"], values, dictionary))
+            zone_map = entry["zone_map"]
+            empty = numpy.array([zone is None for zone in zone_map], dtype = numpy.bool_)
+            lows = numpy.array([0 if zone is None else zone[0] for zone in zone_map])
+            highs = numpy.array([0 if zone is None else zone[1] for zone in zone_map])
+            self._zone_maps[header["schema"][i]["name"]] = (lows, highs, empty)
+        super().__init__(header["schema"], columns, header_variables, workers)
+
+    def candidate_blocks(self, filter_spec):
+        '''
+        Return the indices of the blocks which may contain rows passing filter_spec
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary
+        '''
+        num_rows = self.num_rows()
+        num_blocks = (num_rows + self.block_size - 1) // self.block_size
+        by_name = dict(zip(self.schema.names, self.columns()))
+        return numpy.flatnonzero(_block_candidates(filter_spec, self._zone_maps, by_name, num_blocks))
+
+    def filtered_indices(self, filter_spec):
+        '''
+        Return the indices of the rows which pass filter_spec, reading only candidate blocks.
+        Runs of adjacent candidate blocks are evaluated together.
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary
+        '''
+        by_name = dict(zip(self.schema.names, self.columns()))
+        blocks = self.candidate_blocks(filter_spec)
+        if len(blocks) == 0:
+            return numpy.zeros(0, dtype = numpy.int64)
+        num_rows = self.num_rows()
+        # split the candidate blocks into runs of consecutive blocks
+        breaks = numpy.flatnonzero(numpy.diff(blocks) > 1) + 1
+        result = []
+        for run in numpy.split(blocks, breaks):
+            start = int(run[0]) * self.block_size
+            end = min(num_rows, (int(run[-1]) + 1) * self.block_size)
+            run_columns = {name: column.slice(start, end) for (name, column) in by_name.items()}
+            result.append(numpy.flatnonzero(filter_mask(filter_spec, run_columns)) + start)
+        return numpy.concatenate(result)
+
+    def filter_mask(self, filter_spec, columns = None, workers = None):
+        '''
+        Return the boolean mask of the rows which pass filter_spec, skipping blocks by zone map
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary
+            columns: ignored; the table's own columns are used
+            workers: ignored
+        '''
+        mask = numpy.zeros(self.num_rows(), dtype = numpy.bool_)
+        mask[self.filtered_indices(filter_spec)] = True
+        return mask
+
+    def get_filtered_rows(self, filter_spec, workers = None):
+        '''
+        Filter the rows according to the specification given by filter_spec.
+        Returns the rows for which the resulting filter returns True.
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary
+            workers: ignored; block skipping replaces parallel evaluation here
+        Returns:
+            The rows which pass the filter
+        '''
+        labels = {"table": self.table_label}
+        with metrics.timer('galyleo_filter_seconds', labels):
+            indices = self.filtered_indices(filter_spec)
+        with metrics.timer('galyleo_get_rows_seconds', labels):
+            return self._rows_at(self.columns(), indices)
@@ -0,0 +1,535 @@
+'''
+Columnar storage for Galyleo tables.  A column is held as a NumPy array; string-valued
+columns are dictionary-encoded, so the array holds integer codes into a sorted array of
+the distinct strings, and date, datetime and timeofday columns are held as datetime64 and
+timedelta64 arrays (see galyleo_temporal).  Filters are evaluated over columns as vectorized boolean masks,
+with exactly the semantics of galyleo_table_server.Filter, and only the rows which pass
+the filter are converted back to Python values.  ColumnarDataServer is a GalyleoDataServer
+which serves a table held in this form.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import numpy
+
+from galyleo.galyleo_aggregation import check_valid_aggregate_spec, result_schema
+from galyleo.galyleo_constants import GALYLEO_BOOLEAN, GALYLEO_NUMBER, PARALLEL_MIN_ROWS
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_metrics import metrics
+from galyleo.galyleo_parallel import chunk_ranges, parallel_map
+from galyleo.galyleo_table_server import GalyleoDataServer, check_range_bounds
+from galyleo.galyleo_temporal import format_temporal, is_temporal, parse_temporal
+
+
+class EncodedColumn:
+    '''
+    A single column of a table in columnar form.  values is a one-dimensional NumPy array.
+    For a dictionary-encoded column, dictionary is a sorted NumPy array of the distinct
+    values, and values holds the index of each entry in dictionary; since the dictionary
+    is sorted, the order of the codes is the order of the values.  A missing value (None
+    or NaN) has code -1, and is decoded as None.  For other columns dictionary is None, and
+    a missing number is NaN, also decoded as None.
+    A temporal column holds a datetime64 or timedelta64 array and is decoded to ISO strings.
+
+    Arguments:
+        galyleo_type: the Galyleo type of the column
+        values: the array of values (or codes)
+        dictionary: the sorted array of distinct values, or None
+    '''
+    __slots__ = ('galyleo_type', 'values', 'dictionary')
+
+    def __init__(self, galyleo_type, values, dictionary = None):
+        self.galyleo_type = galyleo_type
+        self.values = values
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.values)
+
+    def slice(self, start, end):
+        '''
+        Return an EncodedColumn which is a view of rows start to end of this column.
+        No data is copied.
+
+        Arguments:
+            start: the first row of the slice
+            end: one past the last row of the slice
+        '''
+        return EncodedColumn(self.galyleo_type, self.values[start:end], self.dictionary)
+
+    def decode(self, indices = None):
+        '''
+        Convert the column, or the rows at indices, to a list of Python values.
+
+        Arguments:
+            indices: an array of row indices, or None for the whole column
+        Returns:
+            the list of values
+        '''
+        values = self.values if indices is None else self.values[indices]
+        if self.dictionary is not None:
+            if len(self.dictionary) == 0:
+                return [None] * len(values)
+            result = self.dictionary[values].tolist()
+            for i in numpy.flatnonzero(values < 0):
+                result[i] = None
+            return result
+        if values.dtype.kind in 'mM':
+            return format_temporal(self.galyleo_type, values)
+        result = values.tolist()
+        if values.dtype.kind == 'f':
+            for i in numpy.flatnonzero(numpy.isnan(values)):
+                result[i] = None
+        return result
+
+    def distinct(self):
+        '''
+        Return the sorted list of the distinct values in this column.  Missing values
+        are omitted.
+        '''
+        if self.dictionary is not None:
+            codes = numpy.unique(self.values)
+            return self.dictionary[codes[codes >= 0]].tolist()
+        values = numpy.unique(self.values[_present_mask(self, self.values)])
+        if values.dtype.kind in 'mM':
+            return format_temporal(self.galyleo_type, values)
+        return values.tolist()
+
+    def codes_for(self, value_list):
+        '''
+        Return the codes of the members of value_list which appear in the dictionary of
+        a dictionary-encoded column
+
+        Arguments:
+            value_list: the values to look up
+        '''
+        candidates = numpy.array([value for value in value_list if isinstance(value, str)], dtype = str)
+        if len(candidates) == 0 or len(self.dictionary) == 0:
+            return numpy.zeros(0, dtype = numpy.int64)
+        positions = numpy.minimum(numpy.searchsorted(self.dictionary, candidates), len(self.dictionary) - 1)
+        return positions[self.dictionary[positions] == candidates]
+
+    def temporal_keys(self, value_list):
+        '''
+        Parse value_list (ISO strings) to an array of the dtype of a temporal column.  Raises
+        an InvalidDataException if a value isn't an ISO string of the column's type
+
+        Arguments:
+            value_list: the values to parse
+        '''
+        if not all(isinstance(value, str) for value in value_list):
+            raise InvalidDataException(f'Values for {self.galyleo_type} column must be ISO strings, not {value_list}')
+        return parse_temporal(self.galyleo_type, value_list).astype(self.values.dtype)
+
+    def in_list_mask(self, value_list):
+        '''
+        Return the boolean mask of the rows whose value is a member of value_list
+        '''
+        if self.dictionary is not None:
+            return numpy.isin(self.values, self.codes_for(value_list))
+        if self.values.dtype.kind in 'mM':
+            return numpy.isin(self.values, self.temporal_keys([value for value in value_list if isinstance(value, str)]))
+        if self.galyleo_type in {GALYLEO_NUMBER, GALYLEO_BOOLEAN}:
+            value_list = [value for value in value_list if isinstance(value, (int, float))]
+        return numpy.isin(self.values, value_list)
+
+    def in_range_mask(self, min_val, max_val):
+        '''
+        Return the boolean mask of the rows whose value v satisfies min_val <= v <= max_val
+        '''
+        check_range_bounds(self.galyleo_type, min_val, max_val)
+        if self.dictionary is not None:
+            low = numpy.searchsorted(self.dictionary, min_val, side = 'left')
+            high = numpy.searchsorted(self.dictionary, max_val, side = 'right')
+            return (self.values >= low) & (self.values < high)
+        if self.values.dtype.kind in 'mM':
+            (min_val, max_val) = self.temporal_keys([min_val, max_val])
+        return (self.values >= min_val) & (self.values <= max_val)
+
+
+def encode_column(galyleo_type, values):
+    '''
+    Convert a list of Python values of type galyleo_type to an EncodedColumn.  Numbers are
+    stored as int64 if every value is an integer and float64 otherwise (a missing number is
+    NaN), booleans as bool (a boolean can't be missing: None raises an InvalidDataException,
+    rather than being read as False), dates, datetimes and times of day as datetime64 or
+    timedelta64 (see galyleo_temporal), and strings are dictionary-encoded.
+
+    Arguments:
+        galyleo_type: the Galyleo type of the column
+        values: the list of values
+    Returns:
+        an EncodedColumn holding the values
+    '''
+    if galyleo_type == GALYLEO_NUMBER:
+        array = numpy.asarray(values)
+        if array.dtype.kind not in 'iu':
+            array = array.astype(numpy.float64)
+        elif array.dtype != numpy.int64:
+            array = array.astype(numpy.int64)
+        return EncodedColumn(galyleo_type, array)
+    if galyleo_type == GALYLEO_BOOLEAN:
+        # a boolean column has no missing value, and None must not be read as False
+        if any(value is None for value in values):
+            raise InvalidDataException('Boolean columns cannot have missing values')
+        return EncodedColumn(galyleo_type, numpy.asarray(values, dtype = numpy.bool_))
+    if is_temporal(galyleo_type):
+        return EncodedColumn(galyleo_type, parse_temporal(galyleo_type, values))
+    missing = numpy.array([value is None or value != value for value in values], dtype = numpy.bool_)
+    strings = numpy.array(['' if missing[i] else str(value) for (i, value) in enumerate(values)], dtype = str)
+    present = ~missing
+    if not present.any():
+        return EncodedColumn(galyleo_type, numpy.full(len(strings), -1, dtype = numpy.int32), numpy.zeros(0, dtype = '<U1'))
+    dictionary, codes = numpy.unique(strings[present], return_inverse = True)
+    all_codes = numpy.full(len(strings), -1, dtype = numpy.int32)
+    all_codes[present] = codes.reshape(-1)
+    return EncodedColumn(galyleo_type, all_codes, dictionary)
+
+def encode_rows(schema, rows):
+    '''
+    Convert a table given as a schema and a list of rows to a list of EncodedColumns, one
+    per column of the schema.  Raises an InvalidDataException if a row is the wrong length
+    or a value can't be converted to its column's type
+
+    Arguments:
+        schema: list of {"name", "type"} records
+        rows: list of list of values
+    Returns:
+        the list of EncodedColumns
+    '''
+    num_columns = len(schema)
+    for row in rows:
+        if len(row) != num_columns:
+            raise InvalidDataException(f'All rows must have length {num_columns}')
+    try:
+        return [encode_column(schema[i]["type"], [row[i] for row in rows]) for i in range(num_columns)]
+    except (TypeError, ValueError) as original_error:
+        raise InvalidDataException(f'Bad data in table: {original_error}') from original_error
+
+def filter_mask(filter_spec, columns):
+    '''
+    Evaluate filter_spec over the columns of a table and return the boolean mask of the rows
+    which pass.  The semantics are identical to galyleo_table_server.Filter.
+
+    Arguments:
+        filter_spec: a valid filter spec (see galyleo_table_server.check_valid_spec)
+        columns: a dictionary from column name to EncodedColumn; all columns must have the same length
+    Returns:
+        a boolean NumPy array with one entry per row
+    '''
+    operator = filter_spec["operator"]
+    if operator in {'ALL', 'ANY', 'NONE'}:
+        num_rows = len(next(iter(columns.values()))) if len(columns) > 0 else 0
+        masks = [filter_mask(argument, columns) for argument in filter_spec["arguments"]]
+        if operator == 'ALL':
+            result = numpy.ones(num_rows, dtype = numpy.bool_)
+            for mask in masks:
+                result &= mask
+        elif operator == 'ANY':
+            result = numpy.zeros(num_rows, dtype = numpy.bool_)
+            for mask in masks:
+                result |= mask
+        else:
+            result = numpy.ones(num_rows, dtype = numpy.bool_)
+            for mask in masks:
+                result &= ~mask
+        return result
+    try:
+        column = columns[filter_spec["column"]]
+    except KeyError as original_error:
+        raise InvalidDataException(f'{filter_spec["column"]} is not a valid column') from original_error
+    if operator == 'IN_LIST':
+        return column.in_list_mask(filter_spec["values"])
+    return column.in_range_mask(filter_spec["min_val"], filter_spec["max_val"])
+
+def _present_mask(column, values):
+    '''
+    Internal use only.  The mask of the entries of values, taken from column, which are not missing
+    '''
+    if column.dictionary is not None:
+        return values >= 0
+    if values.dtype.kind == 'f':
+        return ~numpy.isnan(values)
+    if values.dtype.kind in 'mM':
+        return ~numpy.isnat(values)
+    return numpy.ones(len(values), dtype = numpy.bool_)
+
+def _group_ids(columns, indices, group_indices):
+    '''
+    Internal use only.  Number the groups of the rows at indices by the group columns, in
+    order of first appearance.  Returns (group_ids, firsts), where group_ids gives the group
+    of each row and firsts the position in indices of the first row of each group
+    '''
+    if len(group_indices) == 0:
+        return numpy.zeros(len(indices), dtype = numpy.int64), numpy.zeros(1, dtype = numpy.int64)
+    keys = []
+    for index in group_indices:
+        values = columns[index].values[indices]
+        keys.append(values if columns[index].dictionary is not None else numpy.unique(values, return_inverse = True)[1].reshape(-1))
+    (_, firsts, group_ids) = numpy.unique(numpy.stack(keys, axis = 1), axis = 0, return_index = True, return_inverse = True)
+    order = numpy.argsort(firsts, kind = 'stable')
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+    return rank[group_ids.reshape(-1)], firsts[order]
+
+def _extreme_values(operator, column, indices, group_ids, num_groups):
+    '''
+    Internal use only.  The min or max (per operator) of column over the rows at indices in
+    each group, None for a group with no values
+    '''
+    values = column.values[indices]
+    present = numpy.flatnonzero(_present_mask(column, values))
+    order = present[numpy.lexsort((values[present], group_ids[present]))]
+    result = [None] * num_groups
+    if len(order) == 0:
+        return result
+    sorted_groups = group_ids[order]
+    starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(sorted_groups)) + 1))
+    chosen = starts if operator == 'min' else numpy.concatenate((starts[1:], [len(order)])) - 1
+    for (group, value) in zip(sorted_groups[chosen].tolist(), column.decode(indices[order[chosen]])):
+        result[group] = value
+    return result
+
+def aggregate_columns(columns, indices, group_indices, aggregates):
+    '''
+    Aggregate the rows at indices of columns, with the semantics of
+    galyleo_aggregation.aggregate_rows
+
+    Arguments:
+        columns: the EncodedColumns of the table, in schema order
+        indices: the indices of the rows to aggregate
+        group_indices: the indices of the group columns, from check_valid_aggregate_spec
+        aggregates: the list of (name, operator, index), from check_valid_aggregate_spec
+    Returns:
+        the aggregated rows, as a list of lists
+    '''
+    (group_ids, firsts) = _group_ids(columns, indices, group_indices)
+    num_groups = len(firsts)
+    if len(indices) == 0 and len(group_indices) > 0:
+        return []
+    result = [columns[index].decode(indices[firsts]) for index in group_indices]
+    for (_, operator, index) in aggregates:
+        if operator == 'count':
+            result.append(numpy.bincount(group_ids, minlength = num_groups).tolist())
+        elif operator in {'min', 'max'}:
+            result.append(_extreme_values(operator, columns[index], indices, group_ids, num_groups))
+        else:
+            values = columns[index].values[indices]
+            present = _present_mask(columns[index], values)
+            if values.dtype.kind == 'f':
+                sums = numpy.bincount(group_ids[present], weights = values[present], minlength = num_groups)
+            else:
+                sums = numpy.zeros(num_groups, dtype = numpy.int64)
+                numpy.add.at(sums, group_ids, values)
+            if operator == 'sum':
+                result.append(sums.tolist())
+            else:
+                counts = numpy.bincount(group_ids[present], minlength = num_groups).tolist()
+                result.append([total / count if count > 0 else None for (total, count) in zip(sums.tolist(), counts)])
+    return [list(row) for row in zip(*result)]
+
+def _chunk_filter_mask(filter_spec, columns, start, end):
+    '''
+    Internal use only.  Compute filter_mask over rows start to end of columns
+    '''
+    return filter_mask(filter_spec, {name: column.slice(start, end) for (name, column) in columns.items()})
+
+
+class ColumnarDataServer(GalyleoDataServer):
+    '''
+    A GalyleoDataServer for a table held as EncodedColumns.  Filters, all_values and
+    numeric_spec are computed directly on the column arrays, and only the rows which
+    are returned are converted to Python values.  When workers > 1, filter masks for
+    tables with at least parallel_min_rows rows are computed in chunks on a thread
+    pool, since the NumPy kernels release the GIL.
+
+    Arguments:
+        schema: a list of records of the form {"name": <column_name, "type": <column_type>}.
+        columns: a list of EncodedColumns, one for each entry in the schema
+        header_variables: as for GalyleoDataServer
+        workers: as for GalyleoDataServer
+        parallel_min_rows: as for GalyleoDataServer
+        sketches: as for GalyleoDataServer; the list of columns returned by columns() is
+            the version of the data, so the sketches are rebuilt when it is replaced
+    '''
+    def __init__(self, schema, columns, header_variables = None, workers = 1, parallel_min_rows = PARALLEL_MIN_ROWS, sketches = False):
+        super().__init__(schema, self._all_rows, header_variables, workers, parallel_min_rows, sketches = sketches)
+        if len(columns) != len(schema):
+            raise InvalidDataException(f'{len(columns)} columns supplied for a schema of length {len(schema)}')
+        self._columns = columns
+
+    @classmethod
+    def from_rows(cls, schema, rows, header_variables = None):
+        '''
+        Create a ColumnarDataServer from a schema and a list of rows
+
+        Arguments:
+            schema: a list of records of the form {"name": <column_name, "type": <column_type>}.
+            rows: list of list of values
+            header_variables: as for GalyleoDataServer
+        '''
+        return cls(schema, encode_rows(schema, rows), header_variables)
+
+    def columns(self):
+        '''
+        Return the list of EncodedColumns, in schema order.  Subclasses whose data can
+        change override this, returning a new list when the data change; every request
+        calls it exactly once.
+        '''
+        return self._columns
+
+    def num_rows(self):
+        '''
+        Return the number of rows in the table
+        '''
+        columns = self.columns()
+        return len(columns[0]) if len(columns) > 0 else 0
+
+    def _column(self, columns, column_name):
+        '''
+        Internal use only.  Get the EncodedColumn for column_name from columns, raising
+        an InvalidDataException if there is no such column
+        '''
+        try:
+            return columns[self.schema.index(column_name)]
+        except ValueError as original_error:
+            raise InvalidDataException(f'{column_name} is not a column of this table') from original_error
+
+    def _rows_at(self, columns, indices = None):
+        '''
+        Internal use only.  Decode the rows at indices (all rows if indices is None)
+        '''
+        decoded = [column.decode(indices) for column in columns]
+        return [list(row) for row in zip(*decoded)]
+
+    def _all_rows(self):
+        return self._rows_at(self.columns())
+
+    def _source_version(self):
+        # columns() returns a new list when the data change, and never modifies an old one
+        return self.columns()
+
+    def _column_source(self):
+        return self.columns()
+
+    def _source_column(self, source, index):
+        return source[index].decode()
+
+    def all_values(self, column_name:str):
+        '''
+        get all the values from column_name
+        Arguments:
+
+            column_name: name of the column to get the values for
+
+        Returns:
+            Sorted list of the distinct values
+
+        '''
+        return self._column(self.columns(), column_name).distinct()
+
+    def numeric_spec(self, column_name:str):
+        '''
+        get the dictionary {min_val, max_val, increment} for column_name
+        Arguments:
+
+            column_name: name of the column to get the numeric spec for
+
+        Returns:
+            the minimum, maximum, and increment of the column
+
+        '''
+        column_type = self.get_column_type(column_name)
+        if column_type is None:
+            raise InvalidDataException(f'{column_name} is not a column of this table')
+        if column_type != GALYLEO_NUMBER:
+            raise InvalidDataException(f'The type of {column_name} must be {GALYLEO_NUMBER}, not {column_type}')
+        column = self._column(self.columns(), column_name)
+        values = numpy.unique(column.values[_present_mask(column, column.values)])
+        if len(values) < 2:
+            raise InvalidDataException(f'Bad data in column {column_name}')
+        return {"max_val": values[-1].item(), "min_val": values[0].item(), "increment": numpy.diff(values).min().item()}
+
+    def filter_mask(self, filter_spec, columns = None, workers = None):
+        '''
+        Return the boolean mask of the rows which pass filter_spec
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary
+            columns: the columns to filter (default self.columns())
+            workers: the number of threads to use.  If None (the default), self.workers is used
+        '''
+        columns = self.columns() if columns is None else columns
+        by_name = dict(zip(self.schema.names, columns))
+        workers = self.workers if workers is None else workers
+        num_rows = len(columns[0]) if len(columns) > 0 else 0
+        if workers > 1 and num_rows >= self.parallel_min_rows:
+            ranges = chunk_ranges(num_rows, workers)
+            masks = parallel_map(_chunk_filter_mask, [(filter_spec, by_name, start, end) for (start, end) in ranges], workers, False)
+            return numpy.concatenate(masks)
+        return filter_mask(filter_spec, by_name)
+
+    def get_filtered_rows(self, filter_spec, workers = None):
+        '''
+        Filter the rows according to the specification given by filter_spec.
+        Returns the rows for which the resulting filter returns True.
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary
+            workers: the number of threads used to evaluate the filter.  If None
+                (the default), self.workers is used
+        Returns:
+            The rows which pass the filter
+        '''
+        columns = self.columns()
+        labels = {"table": self.table_label}
+        with metrics.timer('galyleo_filter_seconds', labels):
+            indices = numpy.flatnonzero(self.filter_mask(filter_spec, columns, workers))
+        with metrics.timer('galyleo_get_rows_seconds', labels):
+            return self._rows_at(columns, indices)
+
+    def get_aggregated_rows(self, filter_spec, aggregate_spec):
+        '''
+        Filter the rows according to filter_spec, then group and aggregate them according
+        to aggregate_spec (see galyleo_aggregation).  The groups and aggregates are computed
+        on the column arrays, so only the aggregated rows are converted to Python values.
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary, or None for all rows
+            aggregate_spec: Specification of the aggregation, as a dictionary
+        Returns:
+            {"columns": the schema of the result, "rows": the aggregated rows}
+        '''
+        (group_indices, aggregates) = check_valid_aggregate_spec(aggregate_spec, self.schema)
+        columns = self.columns()
+        labels = {"table": self.table_label}
+        if filter_spec is None:
+            indices = numpy.arange(len(columns[0]) if len(columns) > 0 else 0)
+        else:
+            with metrics.timer('galyleo_filter_seconds', labels):
+                indices = numpy.flatnonzero(self.filter_mask(filter_spec, columns))
+        with metrics.timer('galyleo_aggregate_seconds', labels):
+            rows = aggregate_columns(columns, indices, group_indices, aggregates)
+        return {"columns": result_schema(self.schema, group_indices, aggregates), "rows": rows}
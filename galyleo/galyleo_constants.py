@@ -35,6 +35,13 @@ Constants that are used throughout the module.  These include:
    2. GALYLEO_TYPES: The types in a list
    3. MAXIMUM_DATA_SIZE: Maximum size, in bytes, of a GalyleoTable
    4. MAX_TABLE_ROWS: Maximum number of rows in a GalyleoTable
+   5. FAN_OUT_MAX_WORKERS, FAN_OUT_TIMEOUT: limits for queries which span multiple table servers
+   6. PARALLEL_MIN_ROWS: the smallest table for which parallel filters and aggregations are used
+   7. COLUMNAR_BLOCK_SIZE: rows per zone-map block in the on-disk columnar format
+   8. CSV_BLOCK_ROWS: rows converted at a time by the CSV loader
+   9. JSON_BATCH_ROWS, JSON_READ_SIZE: batch size and read size of the streaming JSON loader
+  10. SKETCH_*, SUMMARY_*: sizes of the approximate column sketches and defaults for /get_column_summary
+  11. FEED_*: the worker pool, jitter and backoff of the feed scheduler
 """
 
 LIBRARY_VERSION = "2021.x.y"
@@ -55,5 +62,66 @@ MAX_DATA_SIZE = 1*2**24
 """Maximum number of rows in a table"""
 MAX_TABLE_ROWS = 1000000  # 1 million rows per table  at most.
 
+"""Maximum number of table servers queried concurrently when a request spans several tables"""
+FAN_OUT_MAX_WORKERS = 8
+
+"""Time, in seconds, to wait for a single table server during a request which spans several tables"""
+FAN_OUT_TIMEOUT = 30
+
+"""Tables with fewer rows than this are filtered and aggregated in a single worker, even when parallelism is requested"""
+PARALLEL_MIN_ROWS = 100000
+
+"""Number of rows in each block of the on-disk columnar format.  Each block has a min/max zone map entry"""
+COLUMNAR_BLOCK_SIZE = 65536
+
+"""Number of rows the CSV loader reads and converts at a time"""
+CSV_BLOCK_ROWS = 65536
+
+"""Number of rows validated at a time by GalyleoTable.from_json_stream"""
+JSON_BATCH_ROWS = 10000
+
+"""Number of characters (or bytes) read from the stream at a time by GalyleoTable.from_json_stream"""
+JSON_READ_SIZE = 1 << 16
+
+"""Maximum time, in seconds, between attempts to refresh a snapshot whose source is failing"""
+SNAPSHOT_MAX_BACKOFF = 600
+
+"""Time, in seconds, between keepalive comments on a /subscribe event stream"""
+SUBSCRIBE_KEEPALIVE = 15
+
+"""Time, in seconds, after which a /subscribe event stream is closed; the dashboard then reconnects"""
+SUBSCRIBE_MAX_DURATION = 300
+
+"""Maximum number of request profiles kept in the profile directory"""
+PROFILE_MAX_FILES = 50
+
+"""Precision of the HyperLogLog cardinality sketch of a column: it has 2 ** SKETCH_HLL_PRECISION registers"""
+SKETCH_HLL_PRECISION = 12
+
+"""Number of values counted by the heavy-hitters sketch of a column"""
+SKETCH_HEAVY_HITTERS = 64
+
+"""Size parameter k of the KLL quantile sketch of a column; at 200 the rank error of a quantile is about 1.3%"""
+SKETCH_KLL_K = 200
+
+"""Number of top values and the quantiles returned by /get_column_summary by default"""
+SUMMARY_TOP_K = 10
+SUMMARY_QUANTILES = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+"""Maximum number of feed refresh jobs run at the same time"""
+FEED_MAX_WORKERS = 4
+
+"""Each wait between runs of a feed refresh job is lengthened by a random fraction, up to FEED_JITTER, of its interval"""
+FEED_JITTER = 0.1
+
+"""Maximum time, in seconds, between runs of a feed refresh job which is failing"""
+FEED_MAX_BACKOFF = 600
+
+"""Number of idle connections an SQLiteDataServer keeps open for later queries"""
+SQLITE_POOL_SIZE = 4
+
+"""Number of times a SharedTableServer reads the manifest when a loader keeps replacing the segments it names"""
+SHARED_ATTACH_ATTEMPTS = 5
+
 # Other constants
 MILLISECONDS_PER_SECOND = 1000
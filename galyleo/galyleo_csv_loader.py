@@ -0,0 +1,258 @@
+'''
+A streaming, typed CSV loader which produces columnar tables.  The file format is the one
+used by galyleo_server_framework.create_server_from_csv: the first row holds the column
+names, the second the Galyleo types of the columns, and the remaining rows the data.  The
+data rows are read in blocks; each block is split into columns and every column is
+converted in one vectorized NumPy operation, so the per-cell cost is paid in C rather than
+in the interpreter.  Large files can also be split into byte ranges which are parsed in
+parallel by worker processes.  Blocks and ranges are only cut between records, so quoted
+fields may contain newlines.  A blank number cell is a missing number.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import csv
+import mmap
+import os
+
+import numpy
+
+from galyleo.galyleo_columns import EncodedColumn
+from galyleo.galyleo_constants import CSV_BLOCK_ROWS, GALYLEO_BOOLEAN, GALYLEO_NUMBER, GALYLEO_SCHEMA_TYPES
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_parallel import parallel_map
+from galyleo.galyleo_temporal import TEMPORAL_DTYPES, is_temporal, parse_temporal
+
+TRUE_STRINGS = ['true', 't', 'yes', 'y', '1']
+'''
+The (lower-case) strings which are read as True in a boolean column; anything else is False
+'''
+
+def _convert_number_column(strings):
+    '''
+    Internal use only.  Convert an array of strings to int64 if every entry is an integer,
+    and to float64 otherwise; empty entries are NaN
+    '''
+    strings = numpy.char.strip(strings)
+    empty = strings == ''
+    if not empty.any():
+        try:
+            return strings.astype(numpy.int64)
+        except ValueError:
+            pass
+    strings = numpy.where(empty, 'nan', strings)
+    return strings.astype(numpy.float64)
+
+def convert_csv_column(galyleo_type, strings):
+    '''
+    Convert an array of CSV strings to a NumPy array for a column of type galyleo_type.
+    Raises an InvalidDataException if an entry can't be converted.
+
+    Arguments:
+        galyleo_type: the Galyleo type of the column
+        strings: a NumPy array of strings
+    Returns:
+        a NumPy array: int64 or float64 for numbers, bool for booleans, datetime64 or
+        timedelta64 for dates, datetimes and times of day, and strings otherwise
+    '''
+    try:
+        if galyleo_type == GALYLEO_NUMBER:
+            return _convert_number_column(strings)
+        if galyleo_type == GALYLEO_BOOLEAN:
+            return numpy.isin(numpy.char.lower(numpy.char.strip(strings)), TRUE_STRINGS)
+        if is_temporal(galyleo_type):
+            return parse_temporal(galyleo_type, strings)
+        return strings
+    except ValueError as original_error:
+        raise InvalidDataException(f'{original_error} raised during conversion to {galyleo_type}') from original_error
+
+def read_csv_header(path):
+    '''
+    Read the two header rows of a CSV file in the Galyleo format, and check them
+
+    Arguments:
+        path: path to the CSV file
+    Returns:
+        a pair (schema, offset), where offset is the byte offset of the first data row
+    '''
+    try:
+        with open(path, 'rb') as csv_file:
+            lines = [csv_file.readline().decode('utf-8'), csv_file.readline().decode('utf-8')]
+            offset = csv_file.tell()
+    except OSError as original_error:
+        raise InvalidDataException(f'Cannot read {path}: {original_error}') from original_error
+    names, types = list(csv.reader(lines))[:2] if all(lines) else ([], [])
+    if len(names) == 0 or len(names) != len(types):
+        raise InvalidDataException(f'{path} must start with a row of column names and a row of column types of the same length')
+    bad_types = [entry for entry in types if entry not in GALYLEO_SCHEMA_TYPES]
+    if len(bad_types) > 0:
+        raise InvalidDataException(f'Invalid column types {bad_types} in {path}')
+    return [{"name": names[i], "type": types[i]} for i in range(len(names))], offset
+
+def _convert_block(types, lines):
+    '''
+    Internal use only.  Parse a block of CSV lines and convert each column
+    '''
+    rows = list(csv.reader(lines))
+    lengths = {len(row) for row in rows}
+    if lengths != {len(types)}:
+        raise InvalidDataException(f'All rows must have {len(types)} columns, found rows of lengths {lengths - {len(types)}}')
+    return [convert_csv_column(types[i], numpy.array(column, dtype = str)) for (i, column) in enumerate(zip(*rows))]
+
+_QUOTE_SCAN_BYTES = 1 << 20
+
+def _ends_in_quotes(data, start, end, in_quotes):
+    '''
+    Internal use only.  Whether a CSV record is inside a quoted field at byte end of data,
+    given whether it was at byte start.  An escaped quote ("") doesn't change this.  data is
+    scanned a piece at a time, so a memory-mapped file is never copied whole
+    '''
+    quotes = sum(data[i:min(end, i + _QUOTE_SCAN_BYTES)].count(b'"') for i in range(start, end, _QUOTE_SCAN_BYTES))
+    return in_quotes != (quotes % 2 == 1)
+
+def parse_csv_range(path, types, start, end, data_start, block_rows = CSV_BLOCK_ROWS):
+    '''
+    Parse the data rows of a CSV file which start at byte offsets in [start, end).  A range
+    which starts in the middle of a line begins at the next line, so start and end should
+    be record boundaries (see record_boundaries) if quoted fields may contain newlines; a
+    record which starts before end is read to its end.  Blocks are only cut between records.
+
+    Arguments:
+        path: path to the CSV file
+        types: the Galyleo types of the columns
+        start: byte offset of the start of the range
+        end: byte offset of the end of the range
+        data_start: byte offset of the first data row of the file
+        block_rows: the number of rows converted at a time
+    Returns:
+        a list of lists of arrays: for each column, the converted arrays of each block
+    '''
+    result = [[] for _ in types]
+    with open(path, 'rb') as csv_file:
+        if start > data_start:
+            # skip to the beginning of the first row which starts at or after start
+            csv_file.seek(start - 1)
+            csv_file.readline()
+        else:
+            csv_file.seek(data_start)
+        lines = []
+        record = []
+        in_quotes = False
+        while csv_file.tell() < end or in_quotes:
+            line = csv_file.readline()
+            if not line:
+                break
+            record.append(line)
+            in_quotes = _ends_in_quotes(line, 0, len(line), in_quotes)
+            if in_quotes:
+                continue
+            text = b''.join(record).decode('utf-8')
+            record = []
+            if text.strip():
+                lines.append(text)
+            if len(lines) == block_rows:
+                for (i, array) in enumerate(_convert_block(types, lines)):
+                    result[i].append(array)
+                lines = []
+        if len(record) > 0:
+            # an unterminated quoted field at the end of the file; the csv module reports it
+            lines.append(b''.join(record).decode('utf-8'))
+        if len(lines) > 0:
+            for (i, array) in enumerate(_convert_block(types, lines)):
+                result[i].append(array)
+    return result
+
+def record_boundaries(path, data_start, parts):
+    '''
+    Split the data rows of a CSV file into at most parts byte ranges of about the same size
+    which start and end at record boundaries, so that no range splits a quoted field which
+    contains a newline.  The quotes before each split point are counted in one pass over the
+    memory-mapped file, without parsing it.
+
+    Arguments:
+        path: path to the CSV file
+        data_start: byte offset of the first data row of the file
+        parts: the number of ranges wanted
+    Returns:
+        the list of pairs (start, end) of byte offsets
+    '''
+    size = os.path.getsize(path)
+    if parts <= 1 or size <= data_start:
+        return [(data_start, size)]
+    step = max(1, (size - data_start + parts - 1) // parts)
+    boundaries = [data_start]
+    with open(path, 'rb') as csv_file, mmap.mmap(csv_file.fileno(), 0, access = mmap.ACCESS_READ) as data:
+        (position, in_quotes) = (data_start, False)
+        for target in range(data_start + step, size, step):
+            if target <= position:
+                continue
+            in_quotes = _ends_in_quotes(data, position, target, in_quotes)
+            position = target
+            # move on to the end of the line, and on past lines inside a quoted field
+            while position < size:
+                newline = data.find(b'\n', position)
+                line_end = size if newline < 0 else newline + 1
+                in_quotes = _ends_in_quotes(data, position, line_end, in_quotes)
+                position = line_end
+                if not in_quotes:
+                    break
+            if position < size:
+                boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def _encode_csv_column(galyleo_type, arrays):
+    '''
+    Internal use only.  Concatenate the converted blocks of a column and encode the result
+    '''
+    if len(arrays) == 0:
+        values = numpy.zeros(0, dtype = TEMPORAL_DTYPES.get(galyleo_type, numpy.int64 if galyleo_type == GALYLEO_NUMBER else str))
+    else:
+        values = numpy.concatenate(arrays)
+    if galyleo_type in {GALYLEO_NUMBER, GALYLEO_BOOLEAN} or is_temporal(galyleo_type):
+        return EncodedColumn(galyleo_type, values)
+    dictionary, codes = numpy.unique(values, return_inverse = True)
+    return EncodedColumn(galyleo_type, codes.astype(numpy.int32).reshape(-1), dictionary)
+
+def load_csv_columns(path, workers = 1, block_rows = CSV_BLOCK_ROWS):
+    '''
+    Load a CSV file in the Galyleo format (names row, types row, data rows) into columns.
+
+    Arguments:
+        path: path to the CSV file
+        workers: the number of worker processes.  If > 1, the file is split into that many
+            byte ranges which are parsed in parallel
+        block_rows: the number of rows converted at a time
+    Returns:
+        a pair (schema, columns), where columns is a list of EncodedColumns
+    '''
+    schema, data_start = read_csv_header(path)
+    types = [column["type"] for column in schema]
+    workers = max(1, workers)
+    ranges = record_boundaries(path, data_start, workers)
+    arguments = [(path, types, start, end, data_start, block_rows) for (start, end) in ranges]
+    parts = parallel_map(parse_csv_range, arguments, workers)
+    columns = [_encode_csv_column(types[i], [array for part in parts for array in part[i]]) for i in range(len(types))]
+    return schema, columns
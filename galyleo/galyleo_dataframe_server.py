@@ -0,0 +1,166 @@
+'''
+A GalyleoDataServer for a pandas DataFrame.  The columns of the DataFrame are converted,
+with vectorized pandas and NumPy operations, to the EncodedColumns of galyleo_columns, so
+filters, all_values and numeric_spec are evaluated as vectorized masks and reductions over
+the columns, and only the rows which are returned are converted to Python values.  The
+conversion is done once, and again when the DataFrame is replaced, rather than on every
+request.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import numpy
+import pandas
+from pandas.api import types as pandas_types
+
+from galyleo.galyleo_columns import ColumnarDataServer, EncodedColumn
+from galyleo.galyleo_constants import GALYLEO_BOOLEAN, GALYLEO_DATETIME, GALYLEO_NUMBER, GALYLEO_STRING
+from galyleo.galyleo_constants import GALYLEO_TIME_OF_DAY, PARALLEL_MIN_ROWS
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_schema import as_schema
+from galyleo.galyleo_temporal import TEMPORAL_DTYPES, is_temporal, parse_temporal
+
+
+def dataframe_schema(dataframe):
+    '''
+    Derive a schema from the names and dtypes of the columns of dataframe: boolean dtypes
+    are boolean, other numeric dtypes number, datetime64 dtypes datetime, timedelta64 dtypes
+    timeofday, and everything else string
+
+    Arguments:
+        dataframe: the pandas DataFrame
+    Returns:
+        the schema, as a list of {"name", "type"} records
+    '''
+    def galyleo_type(dtype):
+        if pandas_types.is_bool_dtype(dtype):
+            return GALYLEO_BOOLEAN
+        if pandas_types.is_numeric_dtype(dtype):
+            return GALYLEO_NUMBER
+        if pandas_types.is_datetime64_any_dtype(dtype):
+            return GALYLEO_DATETIME
+        if pandas_types.is_timedelta64_dtype(dtype):
+            return GALYLEO_TIME_OF_DAY
+        return GALYLEO_STRING
+    return [{"name": name, "type": galyleo_type(dtype)} for (name, dtype) in dataframe.dtypes.items()]
+
+def _temporal_array(galyleo_type, series):
+    '''
+    Internal use only.  Convert series to the array for a temporal column of type galyleo_type
+    '''
+    dtype = TEMPORAL_DTYPES[galyleo_type]
+    if pandas_types.is_datetime64_any_dtype(series.dtype) and galyleo_type != GALYLEO_TIME_OF_DAY:
+        if getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+        return series.to_numpy(dtype = 'datetime64[ns]').astype(dtype)
+    if pandas_types.is_timedelta64_dtype(series.dtype) and galyleo_type == GALYLEO_TIME_OF_DAY:
+        return series.to_numpy(dtype = 'timedelta64[ns]').astype(dtype)
+    return parse_temporal(galyleo_type, series.to_numpy(dtype = object))
+
+def encode_series(galyleo_type, series):
+    '''
+    Convert a pandas Series to an EncodedColumn of type galyleo_type, as
+    galyleo_columns.encode_column does for a list of values.  NaN or NA in a number column
+    is a missing value; a boolean column with NA raises an InvalidDataException
+
+    Arguments:
+        galyleo_type: the Galyleo type of the column
+        series: the Series
+    Returns:
+        an EncodedColumn holding the values
+    '''
+    if galyleo_type == GALYLEO_NUMBER:
+        if pandas_types.is_integer_dtype(series.dtype) and not series.hasnans:
+            return EncodedColumn(galyleo_type, series.to_numpy(dtype = numpy.int64))
+        return EncodedColumn(galyleo_type, series.to_numpy(dtype = numpy.float64, na_value = numpy.nan))
+    if galyleo_type == GALYLEO_BOOLEAN:
+        # a boolean column has no missing value, and NA must not be read as False
+        if series.hasnans:
+            raise InvalidDataException(f'Boolean column {series.name} has missing values')
+        return EncodedColumn(galyleo_type, series.to_numpy(dtype = numpy.bool_))
+    if is_temporal(galyleo_type):
+        return EncodedColumn(galyleo_type, _temporal_array(galyleo_type, series))
+    present = series.notna().to_numpy()
+    codes = numpy.full(len(series), -1, dtype = numpy.int32)
+    if not present.any():
+        return EncodedColumn(galyleo_type, codes, numpy.zeros(0, dtype = '<U1'))
+    (present_codes, uniques) = pandas.factorize(series[present].astype(str), sort = True)
+    codes[present] = present_codes
+    return EncodedColumn(galyleo_type, codes, numpy.asarray(uniques, dtype = str))
+
+def encode_dataframe(dataframe, schema):
+    '''
+    Convert the columns of dataframe named in schema to a list of EncodedColumns, in schema
+    order.  Raises an InvalidDataException if a column is missing or can't be converted
+
+    Arguments:
+        dataframe: the pandas DataFrame
+        schema: the Schema of the table
+    Returns:
+        the list of EncodedColumns
+    '''
+    missing = [name for name in schema.names if name not in dataframe.columns]
+    if len(missing) > 0:
+        raise InvalidDataException(f'Columns {missing} are not in the dataframe')
+    try:
+        return [encode_series(galyleo_type, dataframe[name]) for (name, galyleo_type) in zip(schema.names, schema.types)]
+    except (TypeError, ValueError) as original_error:
+        raise InvalidDataException(f'Bad data in dataframe: {original_error}') from original_error
+
+
+class DataFrameDataServer(ColumnarDataServer):
+    '''
+    A ColumnarDataServer for a pandas DataFrame.  Assigning a new DataFrame to the dataframe
+    attribute converts it, and later requests are served from it; the DataFrame should not
+    be modified in place, since the server would not see the changes.
+
+    Arguments:
+        dataframe: the pandas DataFrame to serve
+        schema: a list of records of the form {"name": <column_name, "type": <column_type>},
+            naming columns of the DataFrame.  If None (the default), every column is served,
+            with a type derived from its dtype (see dataframe_schema)
+        header_variables: as for GalyleoDataServer
+        workers: as for GalyleoDataServer
+        parallel_min_rows: as for GalyleoDataServer
+        sketches: as for GalyleoDataServer
+    '''
+    def __init__(self, dataframe, schema = None, header_variables = None, workers = 1, parallel_min_rows = PARALLEL_MIN_ROWS, sketches = False):
+        schema = as_schema(dataframe_schema(dataframe) if schema is None else schema)
+        super().__init__(schema, encode_dataframe(dataframe, schema), header_variables, workers, parallel_min_rows, sketches)
+        self._dataframe = dataframe
+
+    @property
+    def dataframe(self):
+        '''
+        The DataFrame being served
+        '''
+        return self._dataframe
+
+    @dataframe.setter
+    def dataframe(self, dataframe):
+        columns = encode_dataframe(dataframe, self.schema)
+        # a single assignment, so a request sees either the old columns or the new ones
+        self._columns = columns
+        self._dataframe = dataframe
@@ -0,0 +1,199 @@
+'''
+Downsampling of chart data.  A line chart a thousand pixels wide can't show more than a few
+thousand points, so a long series can be reduced to max_points rows before it is sent,
+with no visible difference.  Three methods are provided, each choosing a subset of the
+rows of a table sorted by an x column:
+    lttb: Largest-Triangle-Three-Buckets, which keeps the points that best preserve the shape
+        of the line of a y column
+    minmax: the minimum and maximum y in each of (max_points - 2) / 2 equal ranges of x, so
+        that the envelope of the series, including spikes, is preserved
+    reservoir: a uniform random sample, for scatter charts.  The sample is seeded, so the
+        same rows give the same sample on every request
+The x column is a number, date, datetime or timeofday column (or, if none is given, the row
+order); the y column is a number column.  Rows whose x or y is missing are dropped.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import numpy
+
+from galyleo.galyleo_constants import GALYLEO_NUMBER
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_temporal import is_temporal, parse_temporal
+
+DOWNSAMPLING_METHODS = ('lttb', 'minmax', 'reservoir')
+
+
+def lttb_indices(x, y, max_points):
+    '''
+    Choose max_points of the points (x, y) by Largest-Triangle-Three-Buckets.  The first
+    and last points are kept; the others are split into max_points - 2 buckets, and from
+    each bucket the point which makes the largest triangle with the point chosen from the
+    previous bucket and the mean of the next bucket is kept.
+
+    Arguments:
+        x: float array, in ascending order
+        y: float array of the same length
+        max_points: the number of points to keep (at least 3)
+    Returns:
+        the array of the indices of the chosen points, in ascending order
+    '''
+    num_points = len(x)
+    if max_points >= num_points:
+        return numpy.arange(num_points)
+    num_buckets = max_points - 2
+    edges = (numpy.arange(num_buckets + 1) * ((num_points - 2) / num_buckets)).astype(numpy.int64) + 1
+    edges[-1] = num_points - 1
+    starts, ends = edges[:-1], edges[1:]
+    sizes = ends - starts
+    # the mean of each bucket, and of the last point standing in for the bucket after the last
+    mean_x = numpy.append(numpy.add.reduceat(x, starts) / sizes, x[-1])
+    mean_y = numpy.append(numpy.add.reduceat(y, starts) / sizes, y[-1])
+    result = numpy.empty(max_points, dtype = numpy.int64)
+    result[0], result[-1] = 0, num_points - 1
+    chosen = 0
+    for bucket in range(num_buckets):
+        start, end = starts[bucket], ends[bucket]
+        areas = numpy.abs((x[chosen] - mean_x[bucket + 1]) * (y[start:end] - y[chosen]) -
+                          (x[chosen] - x[start:end]) * (mean_y[bucket + 1] - y[chosen]))
+        chosen = start + int(numpy.argmax(areas))
+        result[bucket + 1] = chosen
+    return result
+
+def minmax_indices(x, y, max_points):
+    '''
+    Choose at most max_points of the points (x, y): the first and last points, and the
+    points with the minimum and maximum y in each of (max_points - 2) // 2 equal ranges of x.
+
+    Arguments:
+        x: float array, in ascending order
+        y: float array of the same length
+        max_points: the maximum number of points to keep (at least 4)
+    Returns:
+        the array of the indices of the chosen points, in ascending order
+    '''
+    num_points = len(x)
+    if max_points >= num_points:
+        return numpy.arange(num_points)
+    num_buckets = (max_points - 2) // 2
+    span = x[-1] - x[0]
+    if span > 0:
+        buckets = numpy.minimum(((x - x[0]) * (num_buckets / span)).astype(numpy.int64), num_buckets - 1)
+    else:
+        buckets = numpy.zeros(num_points, dtype = numpy.int64)
+    # x is sorted, so each bucket is a contiguous run of points
+    starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(buckets)) + 1))
+    sizes = numpy.diff(numpy.append(starts, num_points))
+    chosen = [numpy.array([0, num_points - 1])]
+    for extreme in (numpy.minimum, numpy.maximum):
+        matches = numpy.flatnonzero(y == numpy.repeat(extreme.reduceat(y, starts), sizes))
+        (_, firsts) = numpy.unique(buckets[matches], return_index = True)
+        chosen.append(matches[firsts])
+    return numpy.unique(numpy.concatenate(chosen))
+
+def reservoir_indices(num_points, max_points, seed = 0):
+    '''
+    Choose a uniform random sample of max_points of num_points points.
+
+    Arguments:
+        num_points: the number of points
+        max_points: the number of points to keep
+        seed: the random seed
+    Returns:
+        the array of the indices of the chosen points, in ascending order
+    '''
+    if max_points >= num_points:
+        return numpy.arange(num_points)
+    return numpy.sort(numpy.random.default_rng(seed).choice(num_points, max_points, replace = False))
+
+def _axis_values(schema, rows, column_name, allow_temporal):
+    '''
+    Internal use only.  Return the values of column column_name of rows as a float array
+    (ticks, for a temporal column), with NaN for a missing value
+    '''
+    try:
+        index = schema.index(column_name)
+    except ValueError as original_error:
+        raise InvalidDataException(f'{column_name} is not a column of this table') from original_error
+    galyleo_type = schema.types[index]
+    values = [row[index] for row in rows]
+    if allow_temporal and is_temporal(galyleo_type):
+        ticks = parse_temporal(galyleo_type, values)
+        return numpy.where(numpy.isnat(ticks), numpy.nan, ticks.view(numpy.int64).astype(numpy.float64))
+    if galyleo_type != GALYLEO_NUMBER:
+        raise InvalidDataException(f'Cannot downsample on {column_name}, a column of type {galyleo_type}')
+    return numpy.array([numpy.nan if value is None else value for value in values], dtype = numpy.float64)
+
+def default_y_column(schema, x_column = None):
+    '''
+    Return the name of the first number column of schema other than x_column, or None
+    '''
+    for (name, galyleo_type) in zip(schema.names, schema.types):
+        if galyleo_type == GALYLEO_NUMBER and name != x_column:
+            return name
+    return None
+
+def downsample_rows(schema, rows, max_points, method = 'lttb', x_column = None, y_column = None):
+    '''
+    Reduce rows to at most max_points rows, sorted by x_column, with method (one of
+    DOWNSAMPLING_METHODS).  If there are no more than max_points rows, they are returned
+    unchanged.  Raises an InvalidDataException for a bad method, max_points or column.
+
+    Arguments:
+        schema: the Schema of the table
+        rows: the rows, as a list of lists
+        max_points: the maximum number of rows to return
+        method: "lttb", "minmax" or "reservoir".  Default "lttb"
+        x_column: the column to sort and bucket by; None (the default) uses the order of the rows
+        y_column: the column whose shape is preserved, for lttb and minmax; None (the
+            default) uses the first number column which isn't x_column
+    Returns:
+        the chosen rows
+    '''
+    if method not in DOWNSAMPLING_METHODS:
+        raise InvalidDataException(f'Unknown downsampling method {method}; the methods are {DOWNSAMPLING_METHODS}')
+    minimum = {"lttb": 3, "minmax": 4, "reservoir": 1}[method]
+    if not isinstance(max_points, int) or max_points < minimum:
+        raise InvalidDataException(f'Max points for {method} must be an integer of at least {minimum}, not {max_points}')
+    if len(rows) <= max_points:
+        return rows
+    x = numpy.arange(len(rows), dtype = numpy.float64) if x_column is None else _axis_values(schema, rows, x_column, True)
+    if method == 'reservoir':
+        y = numpy.zeros(len(rows))
+    else:
+        y_column = default_y_column(schema, x_column) if y_column is None else y_column
+        if y_column is None:
+            raise InvalidDataException(f'{method} downsampling needs a number column for y')
+        y = _axis_values(schema, rows, y_column, False)
+    present = numpy.flatnonzero(~(numpy.isnan(x) | numpy.isnan(y)))
+    order = present[numpy.argsort(x[present], kind = 'stable')]
+    (x, y) = (x[order], y[order])
+    if method == 'lttb':
+        chosen = lttb_indices(x, y, max_points)
+    elif method == 'minmax':
+        chosen = minmax_indices(x, y, max_points)
+    else:
+        chosen = reservoir_indices(len(x), max_points)
+    return [rows[i] for i in order[chosen].tolist()]
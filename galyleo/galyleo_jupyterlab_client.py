@@ -31,8 +31,6 @@
 Define a client -- something that sends data to a Galyleo Dashboard
 '''
 
-from ipykernel.comm import Comm
-
 from galyleo.galyleo_exceptions import DataSizeExceeded
 from galyleo.galyleo_constants import MAX_DATA_SIZE, MAX_TABLE_ROWS
 
@@ -46,6 +44,7 @@ class GalyleoClient:
     """
     def __init__(self):
         """Initialize the client.  No parameters.  This initializes communications with the JupyterLab Galyleo Communications Manager """
+        from ipykernel.comm import Comm  # pylint: disable=import-outside-toplevel
         self._comm_ = Comm(target_name='galyleo_data', data={'foo': 1})
 
 
@@ -0,0 +1,356 @@
+'''
+An append-only GalyleoDataServer for live data, such as telemetry.  Rows are added with
+append_rows(), and held in preallocated columnar ring buffers of a fixed capacity, so an
+append takes time proportional to the size of the batch and memory is bounded however long
+the feed runs.  When the buffers are full, the oldest rows are dropped; if the feed has a
+time column, rows older than time_window seconds before the newest time are also dropped.
+
+Requests are served by the columnar engine of galyleo_columns from a snapshot of the rows
+taken under the feed's lock, so a request sees either all of an appended batch or none of
+it.  The snapshot is reused until the next append.  The counts of the values of each column
+are updated as rows are appended and dropped, so all_values, numeric_spec and
+column_summary are computed from the counts, not the rows.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+from collections import Counter
+
+import numpy
+
+from galyleo.galyleo_columns import ColumnarDataServer, EncodedColumn
+from galyleo.galyleo_constants import GALYLEO_BOOLEAN, GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_NUMBER
+from galyleo.galyleo_constants import PARALLEL_MIN_ROWS, SUMMARY_QUANTILES, SUMMARY_TOP_K
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_schema import as_schema
+from galyleo.galyleo_sketches import counts_summary
+from galyleo.galyleo_temporal import TEMPORAL_DTYPES, format_temporal, is_temporal, parse_temporal
+
+
+class _RingColumn:
+    '''
+    Internal use only.  The preallocated ring buffer of one column of a LiveFeedDataServer.
+    Numbers are held as float64, booleans as bool, and dates, datetimes and times of day as
+    in galyleo_temporal.  Strings are held as codes into a list of strings in order of first
+    appearance, which is compacted to the strings still held when it grows too long.
+
+    Arguments:
+        galyleo_type: the Galyleo type of the column
+        capacity: the number of rows in the buffer
+    '''
+    def __init__(self, galyleo_type, capacity):
+        self.galyleo_type = galyleo_type
+        self.strings = None
+        if galyleo_type == GALYLEO_NUMBER:
+            self.values = numpy.full(capacity, numpy.nan)
+        elif galyleo_type == GALYLEO_BOOLEAN:
+            self.values = numpy.zeros(capacity, dtype = numpy.bool_)
+        elif is_temporal(galyleo_type):
+            self.values = numpy.zeros(capacity, dtype = TEMPORAL_DTYPES[galyleo_type])
+        else:
+            self.values = numpy.full(capacity, -1, dtype = numpy.int32)
+            self.strings = []
+            self._codes = {}
+
+    def convert(self, values):
+        '''
+        Convert a list of values to an array of the buffer's dtype.  Strings are given
+        their codes, so this must be called under the feed's lock
+        '''
+        if self.galyleo_type == GALYLEO_NUMBER:
+            return numpy.array([numpy.nan if value is None else value for value in values], dtype = numpy.float64)
+        if self.galyleo_type == GALYLEO_BOOLEAN:
+            if any(value is None for value in values):
+                raise ValueError('boolean columns cannot have missing values')
+            return numpy.array([bool(value) for value in values], dtype = numpy.bool_)
+        if is_temporal(self.galyleo_type):
+            return parse_temporal(self.galyleo_type, values)
+        codes = numpy.empty(len(values), dtype = numpy.int32)
+        for (i, value) in enumerate(values):
+            if value is None or value != value:
+                codes[i] = -1
+            else:
+                codes[i] = self._codes.setdefault(str(value), len(self._codes))
+                if codes[i] == len(self.strings):
+                    self.strings.append(str(value))
+        return codes
+
+    def python_values(self, array):
+        '''
+        Convert an array of the buffer's dtype to the list of Python values, None for missing
+        '''
+        if self.strings is not None:
+            return [None if code < 0 else self.strings[code] for code in array.tolist()]
+        if is_temporal(self.galyleo_type):
+            return format_temporal(self.galyleo_type, array)
+        values = array.tolist()
+        return [None if value != value else value for value in values] if self.galyleo_type == GALYLEO_NUMBER else values
+
+    def compact(self, live_strings):
+        '''
+        Replace the list of strings by live_strings, the strings still in the buffer
+        '''
+        new_codes = {string: code for (code, string) in enumerate(live_strings)}
+        remap = numpy.array([new_codes.get(string, -1) for string in self.strings] + [-1], dtype = numpy.int32)
+        # code -1 (missing) maps to the final -1
+        self.values = remap[self.values]
+        self.strings = list(live_strings)
+        self._codes = new_codes
+
+    def snapshot(self, positions):
+        '''
+        Return the EncodedColumn of the rows at positions of the buffer, in order
+        '''
+        values = self.values[positions]
+        if self.strings is None:
+            return EncodedColumn(self.galyleo_type, values)
+        if len(self.strings) == 0:
+            return EncodedColumn(self.galyleo_type, values, numpy.zeros(0, dtype = '<U1'))
+        strings = numpy.array(self.strings, dtype = str)
+        order = numpy.argsort(strings, kind = 'stable')
+        rank = numpy.empty(len(order) + 1, dtype = numpy.int32)
+        rank[order] = numpy.arange(len(order), dtype = numpy.int32)
+        rank[-1] = -1
+        return EncodedColumn(self.galyleo_type, rank[values], strings[order])
+
+
+class LiveFeedDataServer(ColumnarDataServer):
+    '''
+    A GalyleoDataServer for an append-only feed (see the module documentation).  Numbers are
+    served as floats.
+
+    Arguments:
+        schema: a list of records of the form {"name": <column_name, "type": <column_type>}.
+        capacity: the maximum number of rows held
+        time_column: the name of a date or datetime column.  If not None, rows whose time is
+            more than time_window seconds before the newest time seen are dropped.  Rows are
+            expected to arrive in order of time: the oldest rows are dropped first
+        time_window: the number of seconds of rows to keep, if time_column is not None
+        header_variables: as for GalyleoDataServer
+        workers: as for GalyleoDataServer
+        parallel_min_rows: as for GalyleoDataServer
+    '''
+    def __init__(self, schema, capacity, time_column = None, time_window = None, header_variables = None, workers = 1, parallel_min_rows = PARALLEL_MIN_ROWS):
+        schema = as_schema(schema)
+        if capacity < 1:
+            raise InvalidDataException(f'The capacity of a feed must be at least 1, not {capacity}')
+        self.capacity = capacity
+        self._ring = [_RingColumn(galyleo_type, capacity) for galyleo_type in schema.types]
+        self._start = 0
+        self._size = 0
+        self._counts = [Counter() for _ in schema.types]
+        self._missing = [0] * len(schema)
+        self._version = 0
+        self._snapshot = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._time_index = None
+        if time_column is not None:
+            if schema.type_of(time_column) not in {GALYLEO_DATE, GALYLEO_DATETIME}:
+                raise InvalidDataException(f'The time column of a feed must be a {GALYLEO_DATE} or {GALYLEO_DATETIME} column, not {time_column}')
+            if time_window is None or time_window <= 0:
+                raise InvalidDataException(f'A feed with a time column needs a positive time_window, not {time_window}')
+            self._time_index = schema.index(time_column)
+            self._time_window = numpy.timedelta64(int(time_window * 1_000_000), 'us')
+            self._newest = None
+        super().__init__(schema, [ring.snapshot(numpy.zeros(0, dtype = numpy.int64)) for ring in self._ring], header_variables, workers, parallel_min_rows)
+
+    def add_change_listener(self, listener):
+        '''
+        Register a function of no arguments, to be called after each append_rows()
+
+        Arguments:
+            listener: the function to call
+        '''
+        with self._lock:
+            self._listeners.append(listener)
+
+    def num_rows(self):
+        '''
+        Return the number of rows held
+        '''
+        return self._size
+
+    def _positions(self, start, count):
+        '''
+        Internal use only.  The buffer positions of the count rows from logical row start
+        '''
+        return (self._start + start + numpy.arange(count)) % self.capacity
+
+    def _count(self, index, values, sign):
+        '''
+        Internal use only.  Add (sign 1) or remove (sign -1) values from the counts of column index
+        '''
+        counts = self._counts[index]
+        for value in values:
+            if value is None:
+                self._missing[index] += sign
+            elif sign > 0:
+                counts[value] += 1
+            else:
+                counts[value] -= 1
+                if counts[value] == 0:
+                    del counts[value]
+
+    def _drop(self, count):
+        '''
+        Internal use only.  Drop the count oldest rows.  Called with the lock held
+        '''
+        if count <= 0:
+            return
+        positions = self._positions(0, count)
+        for (index, ring) in enumerate(self._ring):
+            self._count(index, ring.python_values(ring.values[positions]), -1)
+        self._start = (self._start + count) % self.capacity
+        self._size -= count
+
+    def _expired(self):
+        '''
+        Internal use only.  The number of rows at the start of the feed which are older than
+        the time window.  Called with the lock held
+        '''
+        times = self._ring[self._time_index].values
+        cutoff = self._newest - self._time_window
+        (low, high) = (0, self._size)
+        while low < high:
+            middle = (low + high) // 2
+            if times[(self._start + middle) % self.capacity] < cutoff:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def append_rows(self, rows):
+        '''
+        Append rows to the feed, dropping the oldest rows as needed.  Raises an
+        InvalidDataException if a row is the wrong length or a value can't be converted to
+        its column's type; the feed is then unchanged
+
+        Arguments:
+            rows: list of list of values, in schema order
+        '''
+        num_columns = len(self.schema)
+        if any(len(row) != num_columns for row in rows):
+            raise InvalidDataException(f'All rows must have length {num_columns}')
+        rows = rows[-self.capacity:]
+        if len(rows) == 0:
+            return
+        with self._lock:
+            try:
+                arrays = [ring.convert([row[i] for row in rows]) for (i, ring) in enumerate(self._ring)]
+            except (TypeError, ValueError) as original_error:
+                raise InvalidDataException(f'Bad data in rows: {original_error}') from original_error
+            self._drop(self._size + len(rows) - self.capacity)
+            positions = self._positions(self._size, len(rows))
+            for (index, ring) in enumerate(self._ring):
+                ring.values[positions] = arrays[index]
+                self._count(index, ring.python_values(arrays[index]), 1)
+            self._size += len(rows)
+            if self._time_index is not None:
+                times = arrays[self._time_index]
+                times = times[~numpy.isnat(times)]
+                if len(times) > 0:
+                    newest = times.max()
+                    self._newest = newest if self._newest is None else max(self._newest, newest)
+                    self._drop(self._expired())
+            for (index, ring) in enumerate(self._ring):
+                if ring.strings is not None and len(ring.strings) > 2 * self.capacity:
+                    ring.compact(list(self._counts[index].keys()))
+            self._version += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def columns(self):
+        '''
+        Return the EncodedColumns of a snapshot of the rows held, oldest first
+        '''
+        with self._lock:
+            if self._snapshot is None or self._snapshot[0] != self._version:
+                positions = self._positions(0, self._size)
+                self._snapshot = (self._version, [ring.snapshot(positions) for ring in self._ring])
+            return self._snapshot[1]
+
+    def _column_counts(self, column_name):
+        '''
+        Internal use only.  Return the type, a copy of the counts and the number of missing
+        values of column_name
+        '''
+        try:
+            index = self.schema.index(column_name)
+        except ValueError as original_error:
+            raise InvalidDataException(f'{column_name} is not a column of this table') from original_error
+        with self._lock:
+            return self.schema.types[index], Counter(self._counts[index]), self._missing[index]
+
+    def all_values(self, column_name:str):
+        '''
+        get all the values from column_name
+        Arguments:
+
+            column_name: name of the column to get the values for
+
+        Returns:
+            Sorted list of the distinct values; missing values are omitted
+
+        '''
+        return sorted(self._column_counts(column_name)[1])
+
+    def numeric_spec(self, column_name:str):
+        '''
+        get the dictionary {min_val, max_val, increment} for column_name
+        Arguments:
+
+            column_name: name of the column to get the numeric spec for
+
+        Returns:
+            the minimum, maximum, and increment of the column
+
+        '''
+        (column_type, counts, _) = self._column_counts(column_name)
+        if column_type != GALYLEO_NUMBER:
+            raise InvalidDataException(f'The type of {column_name} must be {GALYLEO_NUMBER}, not {column_type}')
+        values = sorted(counts)
+        if len(values) < 2:
+            raise InvalidDataException(f'Bad data in column {column_name}')
+        return {"max_val": values[-1], "min_val": values[0], "increment": min(b - a for (a, b) in zip(values, values[1:]))}
+
+    def column_summary(self, column_name:str, top_k = SUMMARY_TOP_K, quantiles = SUMMARY_QUANTILES):
+        '''
+        Summarize column_name exactly, from the counts of its values (see galyleo_sketches
+        for the form of the summary)
+        Arguments:
+
+            column_name: name of the column to summarize
+            top_k: the number of most frequent values to return
+            quantiles: the list of quantiles (between 0 and 1) to return
+
+        Returns:
+            the summary, as a dictionary
+
+        '''
+        (column_type, counts, missing) = self._column_counts(column_name)
+        return counts_summary(column_type, counts, missing, top_k, quantiles)
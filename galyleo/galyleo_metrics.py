@@ -0,0 +1,227 @@
+'''
+Low-overhead instrumentation for the Galyleo table server, exported in the Prometheus text
+format by the /metrics route of galyleo_server_framework.  Metrics are counters and
+histograms with fixed buckets, labelled (typically by route and table); recording a value
+is a dictionary lookup, a bisect and an increment under a lock.  The module-level registry
+metrics is the one used by the framework and the table servers.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+'''
+Upper bounds, in seconds, of the buckets of latency histograms
+'''
+SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+'''
+Upper bounds of the buckets of row-count and byte-count histograms
+'''
+
+METRIC_DESCRIPTIONS = {
+    "galyleo_requests_total": ("counter", "Requests received, by route and table"),
+    "galyleo_request_errors_total": ("counter", "Requests which failed, by route and table"),
+    "galyleo_request_seconds": ("histogram", "Time to handle a request, by route and table"),
+    "galyleo_get_rows_seconds": ("histogram", "Time spent in get_rows() (decoding the selected rows, for columnar servers), by table"),
+    "galyleo_filter_seconds": ("histogram", "Time spent evaluating filters, by table"),
+    "galyleo_statistics_seconds": ("histogram", "Time spent computing column statistics, by table and operation"),
+    "galyleo_aggregate_seconds": ("histogram", "Time spent grouping and aggregating rows, by table"),
+    "galyleo_downsample_seconds": ("histogram", "Time spent downsampling rows for requests with a Max-Points header, by table"),
+    "galyleo_serialize_seconds": ("histogram", "Time spent serializing responses to JSON, by route and table"),
+    "galyleo_rows_returned": ("histogram", "Rows returned by a request, by route and table"),
+    "galyleo_response_bytes": ("histogram", "Size of the response body in bytes, by route and table")
+}
+'''
+The type and help text of each metric recorded by the framework
+'''
+
+
+class Histogram:
+    '''
+    A histogram with fixed bucket upper bounds.  Not thread-safe on its own; the
+    MetricsRegistry serializes access
+
+    Arguments:
+        buckets: the increasing upper bounds of the buckets.  A +Inf bucket is added
+    '''
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        '''
+        Record value in the histogram
+        '''
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        '''
+        Return the cumulative count of each bucket, as Prometheus reports them, including +Inf
+        '''
+        result = []
+        total = 0
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+def _format_labels(labels, extra = None):
+    '''
+    Internal use only.  Format a tuple of (name, value) pairs as Prometheus labels
+    '''
+    pairs = list(labels) + ([extra] if extra is not None else [])
+    if len(pairs) == 0:
+        return ''
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for (name, value) in pairs]
+    return '{' + ','.join(f'{name}="{value}"' for (name, value) in escaped) + '}'
+
+def _format_value(value):
+    '''
+    Internal use only.  Format a number for the Prometheus text format
+    '''
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    '''
+    A thread-safe collection of labelled counters and histograms.  Labels are given as
+    dictionaries {label name: value}
+    '''
+    def __init__(self, descriptions = None):
+        self.descriptions = METRIC_DESCRIPTIONS if descriptions is None else descriptions
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, labels, amount = 1):
+        '''
+        Add amount to the counter name with labels labels
+
+        Arguments:
+            name: name of the counter
+            labels: dictionary {label name: value}
+            amount: amount to add (default 1)
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets = LATENCY_BUCKETS):
+        '''
+        Record value in the histogram name with labels labels
+
+        Arguments:
+            name: name of the histogram
+            labels: dictionary {label name: value}
+            value: the value to record
+            buckets: the bucket upper bounds, used if the histogram doesn't exist yet
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, labels):
+        '''
+        A context manager which records the time spent in its body in the histogram name
+
+        Arguments:
+            name: name of the histogram
+            labels: dictionary {label name: value}
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, labels, time.perf_counter() - start)
+
+    def counter_value(self, name, labels):
+        '''
+        Return the value of the counter name with labels labels (0 if it hasn't been incremented)
+        '''
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name, labels):
+        '''
+        Return the Histogram name with labels labels, or None if nothing has been recorded in it
+        '''
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def clear(self):
+        '''
+        Remove all recorded values
+        '''
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def render(self):
+        '''
+        Return the metrics in the Prometheus text exposition format
+        '''
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(((key, (histogram.buckets, histogram.cumulative_counts(), histogram.sum, histogram.count))
+                                 for (key, histogram) in self._histograms.items()), key = lambda entry: entry[0])
+        lines = []
+        described = set()
+        def describe(name, default_type):
+            if name not in described:
+                described.add(name)
+                (metric_type, help_text) = self.descriptions.get(name, (default_type, name))
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+        for ((name, labels), value) in counters:
+            describe(name, 'counter')
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for ((name, labels), (buckets, cumulative, total, count)) in histograms:
+            describe(name, 'histogram')
+            for (bound, bucket_count) in zip(list(buckets) + ['+Inf'], cumulative):
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", bound))} {bucket_count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+'''
+The registry used by galyleo_server_framework and the table servers
+'''
@@ -0,0 +1,92 @@
+'''
+Utilities for chunked parallel evaluation.  Work over a table is split into contiguous
+chunks of rows, each chunk is evaluated by a worker, and the partial results are returned
+in chunk order so that the caller can merge them.  Workers are threads or processes:
+threads are appropriate when the per-chunk work is done in NumPy kernels which release
+the GIL, and processes when the per-chunk work is pure Python (as it is for filters and
+aggregations over lists of rows).  Executors are created on first use and shared.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from concurrent.futures import ThreadPoolExecutor
+
+from galyleo.galyleo_exceptions import InvalidDataException
+
+_executors = {}
+
+def chunk_ranges(num_rows, num_chunks):
+    '''
+    Split range(num_rows) into at most num_chunks contiguous ranges of (nearly) equal size.
+
+    Arguments:
+        num_rows: the number of rows to split
+        num_chunks: the maximum number of chunks
+    Returns:
+        a list of pairs (start, end), one for each chunk
+    '''
+    num_chunks = max(1, min(num_chunks, num_rows))
+    size, extra = divmod(num_rows, num_chunks)
+    result = []
+    start = 0
+    for i in range(num_chunks):
+        end = start + size + (1 if i < extra else 0)
+        result.append((start, end))
+        start = end
+    return result
+
+def _get_executor(workers, use_processes):
+    '''
+    Internal use only.  Get the shared executor for (workers, use_processes), creating it if needed
+    '''
+    key = (workers, use_processes)
+    if key not in _executors:
+        # concurrent.futures.process is slow to import, so wait until a process pool is wanted
+        from concurrent.futures import ProcessPoolExecutor  # pylint: disable=import-outside-toplevel
+        _executors[key] = ProcessPoolExecutor(max_workers = workers) if use_processes else ThreadPoolExecutor(max_workers = workers)
+    return _executors[key]
+
+def parallel_map(function, argument_lists, workers, use_processes = True):
+    '''
+    Call function(*arguments) for each entry in argument_lists on a pool of workers,
+    and return the results in the same order as argument_lists.  When use_processes
+    is True, function and its arguments must be picklable (so function must be
+    defined at module level).
+
+    Arguments:
+        function: the function to call on each chunk
+        argument_lists: a list of argument tuples, one per chunk
+        workers: the number of workers
+        use_processes: if True (the default) use a process pool, otherwise a thread pool
+    Returns:
+        the list of results
+    '''
+    if workers < 1:
+        raise InvalidDataException(f'workers must be at least 1, not {workers}')
+    if workers == 1 or len(argument_lists) <= 1:
+        return [function(*arguments) for arguments in argument_lists]
+    executor = _get_executor(workers, use_processes)
+    futures = [executor.submit(function, *arguments) for arguments in argument_lists]
+    return [future.result() for future in futures]
@@ -0,0 +1,125 @@
+'''
+Storage for the request profiles captured by galyleo_server_framework when a request carries
+the Galyleo-Profile header.  Profiles are kept in a bounded ring directory: each profile is a
+pstats file <name>.prof with a JSON sidecar <name>.json holding the route, table, filter spec
+and timings of the request, and when the directory holds more than max_profiles profiles the
+oldest are deleted.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import itertools
+import os
+import re
+import threading
+import time
+from json import JSONDecodeError, dumps, loads
+
+from galyleo.galyleo_constants import PROFILE_MAX_FILES
+from galyleo.galyleo_exceptions import InvalidDataException
+
+_PROFILE_NAME = re.compile(r'^[0-9]{20}-[0-9]{6}$')
+
+
+class ProfileStore:
+    '''
+    A bounded directory of request profiles
+
+    Arguments:
+        directory: the directory to hold the profiles.  Created if it doesn't exist
+        max_profiles: the maximum number of profiles kept
+    '''
+    def __init__(self, directory, max_profiles = PROFILE_MAX_FILES):
+        if max_profiles < 1:
+            raise InvalidDataException(f'max_profiles must be at least 1, not {max_profiles}')
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok = True)
+
+    def names(self):
+        '''
+        Return the names of the stored profiles, oldest first
+        '''
+        names = [entry[:-len('.json')] for entry in os.listdir(self.directory) if entry.endswith('.json')]
+        return sorted(name for name in names if _PROFILE_NAME.match(name))
+
+    def save(self, profile, metadata):
+        '''
+        Store a profile and its metadata, deleting the oldest profiles if there are now
+        more than max_profiles
+
+        Arguments:
+            profile: a cProfile.Profile which has finished running
+            metadata: a JSON-serializable dictionary describing the request
+        Returns:
+            the name of the stored profile
+        '''
+        name = f'{time.time_ns():020d}-{next(self._sequence) % 1000000:06d}'
+        profile.dump_stats(self.profile_path(name))
+        with open(self._metadata_path(name), 'w', encoding = 'utf-8') as metadata_file:
+            metadata_file.write(dumps(dict(metadata, name = name), default = str))
+        with self._lock:
+            names = self.names()
+            for old_name in names[:max(0, len(names) - self.max_profiles)]:
+                for path in (self._metadata_path(old_name), self.profile_path(old_name)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        return name
+
+    def metadata(self, name):
+        '''
+        Return the metadata of the profile name, or None if there is no such profile
+        '''
+        try:
+            with open(self._metadata_path(name), 'r', encoding = 'utf-8') as metadata_file:
+                return loads(metadata_file.read())
+        except (FileNotFoundError, JSONDecodeError):
+            return None
+
+    def list(self):
+        '''
+        Return the metadata of the stored profiles, newest first
+        '''
+        result = [self.metadata(name) for name in reversed(self.names())]
+        return [entry for entry in result if entry is not None]
+
+    def profile_path(self, name):
+        '''
+        Return the path of the pstats file of the profile name.  Raises an InvalidDataException
+        if name is not a valid profile name
+
+        Arguments:
+            name: name of the profile
+        '''
+        if not _PROFILE_NAME.match(name):
+            raise InvalidDataException(f'{name} is not a valid profile name')
+        return os.path.join(self.directory, name + '.prof')
+
+    def _metadata_path(self, name):
+        return self.profile_path(name)[:-len('.prof')] + '.json'
@@ -0,0 +1,289 @@
+'''
+A scheduler for the jobs which refresh the data of table servers, so that refreshes happen
+in the background rather than in get_rows() on the request path.  Each job is a function of
+no arguments, run every interval seconds on a bounded pool of worker threads.  A job is
+never run while its previous run is still going.  Each wait is lengthened by a random
+fraction (up to jitter) of the interval, so that jobs with the same interval don't all run
+at once.  A run which raises an exception, or takes longer than the job's timeout, is a
+failure, and the job is retried after an exponential backoff.  A thread can't be stopped
+from outside, so a run which times out is left to finish, but the job isn't run again until it does.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from galyleo.galyleo_constants import FEED_JITTER, FEED_MAX_BACKOFF, FEED_MAX_WORKERS
+from galyleo.galyleo_exceptions import InvalidDataException
+
+
+class RefreshJob:
+    '''
+    A job run by a FeedScheduler, and the record of its runs.  Created by FeedScheduler.add_job
+
+    Arguments:
+        name: the name of the job
+        function: the function of no arguments to run
+        interval: time, in seconds, between the end of one run and the start of the next
+        timeout: time, in seconds, after which a run is a failure
+    '''
+    def __init__(self, name, function, interval, timeout):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.timeout = timeout
+        self.next_run = 0.0
+        self.queued = False
+        self.started = None
+        self.timed_out = False
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.replaced_by = None
+
+    def status(self, now):
+        '''
+        Return the status of the job as a dictionary {"interval", "timeout", "running",
+        "last_run" (ISO UTC time the last run started), "last_duration" (seconds), "last_error"
+        (None if the last run succeeded), "runs", "failures", "consecutive_failures",
+        "next_run_in" (seconds; None while running)}
+
+        Arguments:
+            now: the time.monotonic() time
+        '''
+        return {
+            "interval": self.interval,
+            "timeout": self.timeout,
+            "running": self.started is not None,
+            "last_run": None if self.last_run is None else datetime.fromtimestamp(self.last_run, timezone.utc).isoformat(),
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "next_run_in": None if self.queued else max(0.0, self.next_run - now)
+        }
+
+
+class FeedScheduler:
+    '''
+    Runs RefreshJobs (see the module documentation).  Jobs may be added before or after the
+    scheduler is started; a job's first run is due when it is added, or when the scheduler
+    starts, plus jitter.
+
+    Arguments:
+        max_workers: the maximum number of jobs run at the same time; applies from the next start()
+        jitter: the largest fraction of the interval added at random to each wait
+        max_backoff: the longest time, in seconds, between runs of a failing job
+    '''
+    def __init__(self, max_workers = FEED_MAX_WORKERS, jitter = FEED_JITTER, max_backoff = FEED_MAX_BACKOFF):
+        self.max_workers = max_workers
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+        self._executor = None
+        self._stopping = False
+        self._random = random.Random()
+
+    def _jitter(self, interval):
+        '''
+        Internal use only.  A random delay of up to self.jitter * interval
+        '''
+        return self._random.uniform(0, self.jitter * interval)
+
+    def add_job(self, name, function, interval, timeout = None):
+        '''
+        Add a job, replacing any job with the same name.  If the replaced job is queued or
+        running, the new job takes over that run (a queued run calls the new function), so
+        the two never run at the same time.  Raises an InvalidDataException if interval or
+        timeout is not positive
+
+        Arguments:
+            name: the name of the job
+            function: the function of no arguments to run
+            interval: time, in seconds, between the end of one run and the start of the next
+            timeout: time, in seconds, after which a run is a failure.  Default: the interval
+        '''
+        timeout = interval if timeout is None else timeout
+        if interval <= 0 or timeout <= 0:
+            raise InvalidDataException(f'The interval and timeout of job {name} must be positive, not {interval} and {timeout}')
+        job = RefreshJob(name, function, interval, timeout)
+        with self._lock:
+            job.next_run = time.monotonic() + self._jitter(interval)
+            old_job = self._jobs.get(name)
+            if old_job is not None and old_job.queued:
+                (job.queued, job.started, job.timed_out) = (True, old_job.started, old_job.timed_out)
+                old_job.replaced_by = job
+            self._jobs[name] = job
+            self._wake.notify()
+
+    def remove_job(self, name):
+        '''
+        Remove the job name, if there is one.  A run in progress is left to finish
+        '''
+        with self._lock:
+            self._jobs.pop(name, None)
+
+    @property
+    def running(self):
+        '''
+        True if the scheduler has been started and not stopped
+        '''
+        with self._lock:
+            return self._thread is not None and not self._stopping
+
+    def start(self):
+        '''
+        Start the scheduler, if it isn't running.  Returns True if it was started by this call
+        '''
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stopping = False
+            self._executor = ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = 'galyleo_feed')
+            now = time.monotonic()
+            for job in self._jobs.values():
+                if not job.queued:
+                    job.next_run = now + self._jitter(job.interval)
+            self._thread = threading.Thread(target = self._run, name = 'galyleo_feed_scheduler', daemon = True)
+            self._thread.start()
+            return True
+
+    def stop(self, wait = True):
+        '''
+        Stop the scheduler.  If wait is True, wait for the runs in progress to finish
+        '''
+        with self._lock:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._wake.notify()
+            (thread, executor) = (self._thread, self._executor)
+        thread.join()
+        executor.shutdown(wait = wait)
+        with self._lock:
+            self._thread = None
+            self._executor = None
+
+    def status(self):
+        '''
+        Return a dictionary {"running": True if the scheduler is running, "feeds": {name: status
+        of the job (see RefreshJob.status)}}
+        '''
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "running": self._thread is not None and not self._stopping,
+                "feeds": {name: job.status(now) for (name, job) in self._jobs.items()}
+            }
+
+    def _fail(self, job, error):
+        '''
+        Internal use only.  Record a failure of job.  Called with the lock held
+        '''
+        job.last_error = error
+        job.failures += 1
+        job.consecutive_failures += 1
+        logging.warning(f'Feed refresh job {job.name} failed ({error})')
+
+    def _latest(self, job):
+        '''
+        Internal use only.  The job which has taken over the runs of job (see add_job).  Called
+        with the lock held
+        '''
+        while job.replaced_by is not None:
+            job = job.replaced_by
+        return job
+
+    def _run(self):
+        '''
+        Internal use only.  The scheduling loop run by the scheduler thread
+        '''
+        with self._lock:
+            while not self._stopping:
+                now = time.monotonic()
+                wakes = []
+                for job in self._jobs.values():
+                    if job.queued:
+                        if job.started is not None and not job.timed_out:
+                            if now >= job.started + job.timeout:
+                                job.timed_out = True
+                                self._fail(job, f'timed out after {job.timeout} seconds')
+                            else:
+                                wakes.append(job.started + job.timeout)
+                    elif now >= job.next_run:
+                        job.queued = True
+                        self._executor.submit(self._execute, job)
+                    else:
+                        wakes.append(job.next_run)
+                self._wake.wait(None if len(wakes) == 0 else max(0.0, min(wakes) - now))
+
+    def _execute(self, job):
+        '''
+        Internal use only.  Run job on a worker thread, and record the result on the job
+        which has taken over from it, if it was replaced in the meantime
+        '''
+        with self._lock:
+            job = self._latest(job)
+            job.started = time.monotonic()
+            job.timed_out = False
+            function = job.function
+            self._wake.notify()
+        wall_time = time.time()
+        error = None
+        try:
+            function()
+        except Exception as function_error: # pylint: disable=broad-except
+            error = f'{type(function_error).__name__}: {function_error}'
+        finished = time.monotonic()
+        with self._lock:
+            job = self._latest(job)
+            job.runs += 1
+            job.last_run = wall_time
+            job.last_duration = finished - job.started
+            if job.timed_out:
+                pass # the failure was recorded when the run timed out
+            elif error is not None:
+                self._fail(job, error)
+            else:
+                job.last_error = None
+                job.consecutive_failures = 0
+            wait = job.interval
+            if job.consecutive_failures > 0:
+                wait = min(self.max_backoff, job.interval * 2 ** (job.consecutive_failures - 1))
+            job.next_run = finished + wait + self._jitter(job.interval)
+            job.queued = False
+            job.started = None
+            self._wake.notify()
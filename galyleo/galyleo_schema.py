@@ -0,0 +1,146 @@
+'''
+The Schema of a Galyleo table.  A schema is conventionally a list of records of the form
+{"name": <column_name>, "type": <column_type>}; a Schema holds the same information in an
+immutable, hashable form, with the maps from column name to index and column name to type
+computed once, when the Schema is built.  A Schema behaves like the list of records it was
+built from: it has a length, can be iterated and indexed (yielding fresh {"name", "type"}
+records), and compares equal to the equivalent list.  to_list() returns the list form, for
+serialization.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from galyleo.galyleo_exceptions import InvalidDataException
+
+
+class Schema:
+    '''
+    An immutable table schema.  Construct it from a list of records of the form
+    {"name": <column_name>, "type": <column_type>}, or from another Schema.  If a name
+    appears more than once, lookups by name find the first column with that name.
+
+    Arguments:
+        columns: a list of records of the form {"name": <column_name>, "type": <column_type>}
+    '''
+    __slots__ = ('names', 'types', '_indices', '_types_by_name', '_hash')
+
+    def __init__(self, columns = ()):
+        if isinstance(columns, Schema):
+            names, types = columns.names, columns.types
+        else:
+            try:
+                names = tuple(column["name"] for column in columns)
+                types = tuple(column["type"] for column in columns)
+            except (KeyError, TypeError) as original_error:
+                raise InvalidDataException(f'Schema entries must be records {{"name", "type"}}, not {columns}') from original_error
+        indices = {}
+        for (i, name) in enumerate(names):
+            indices.setdefault(name, i)
+        object.__setattr__(self, 'names', names)
+        object.__setattr__(self, 'types', types)
+        object.__setattr__(self, '_indices', indices)
+        object.__setattr__(self, '_types_by_name', {name: types[i] for (name, i) in indices.items()})
+        object.__setattr__(self, '_hash', hash((names, types)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Schema objects are immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('Schema objects are immutable')
+
+    # __setattr__ blocks the default slot-restoring protocols, so pickle rebuilds the
+    # Schema from its records, and copies share the (immutable) original
+    def __reduce__(self):
+        return (Schema, (self.to_list(),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return ({"name": name, "type": column_type} for (name, column_type) in zip(self.names, self.types))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [{"name": name, "type": column_type} for (name, column_type) in zip(self.names[index], self.types[index])]
+        return {"name": self.names[index], "type": self.types[index]}
+
+    def __eq__(self, other):
+        if isinstance(other, Schema):
+            return self._hash == other._hash and self.names == other.names and self.types == other.types
+        if isinstance(other, (list, tuple)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return f'Schema({self.to_list()})'
+
+    def index(self, column_name):
+        '''
+        Return the index of the column named column_name.  Like list.index, raises
+        a ValueError if there is no such column
+
+        Arguments:
+            column_name: name of the column
+        '''
+        try:
+            return self._indices[column_name]
+        except KeyError:
+            raise ValueError(f'{column_name} is not a column of this schema') from None
+
+    def type_of(self, column_name):
+        '''
+        Return the type of the column named column_name, or None if there is no such column
+
+        Arguments:
+            column_name: name of the column
+        '''
+        return self._types_by_name.get(column_name)
+
+    def to_list(self):
+        '''
+        Return the schema as a list of records {"name": <column_name>, "type": <column_type>},
+        for serialization
+        '''
+        return list(self)
+
+
+def as_schema(schema):
+    '''
+    Return schema as a Schema: schema itself if it is already a Schema, and otherwise
+    a Schema built from the list of {"name", "type"} records
+
+    Arguments:
+        schema: a Schema or a list of records of the form {"name": <column_name>, "type": <column_type>}
+    '''
+    return schema if isinstance(schema, Schema) else Schema(schema)
@@ -12,6 +12,9 @@ The way to use this is very simple:
 1. For each Table to be served, create an instance of galyleo_table_server.GalyleoDataServer
 2. Call add_table_server(table_name, data_server, dashboard_name)
 After that, requests for the named table will be served by the created data server.
+3. Optionally, call add_refresh_job(table_name, function, interval) for each table whose data
+are refreshed periodically, and start_feeds() (or request /start) to run the refreshes in
+the background.
 
 '''
 
@@ -46,112 +49,90 @@ After that, requests for the named table will be served by the created data serv
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
+import copy
+import cProfile
+import hmac
 import logging
-import csv
-import datetime
-from json import JSONDecodeError, loads
-
-from flask import Blueprint, abort, jsonify, request
-
-from galyleo.galyleo_constants import GALYLEO_NUMBER, GALYLEO_SCHEMA_TYPES, GALYLEO_BOOLEAN, GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache, wraps
+from json import JSONDecodeError, dumps, loads
+
+from flask import Blueprint, Response, abort, g, jsonify, request, send_file
+
+from galyleo.galyleo_change_notifier import ChangeNotifier
+from galyleo.galyleo_constants import GALYLEO_NUMBER
+from galyleo.galyleo_constants import FAN_OUT_MAX_WORKERS, FAN_OUT_TIMEOUT
+from galyleo.galyleo_constants import SUBSCRIBE_KEEPALIVE, SUBSCRIBE_MAX_DURATION, PROFILE_MAX_FILES
+from galyleo.galyleo_constants import SUMMARY_QUANTILES, SUMMARY_TOP_K
 from galyleo.galyleo_exceptions import InvalidDataException
-from galyleo.galyleo_table_server import GalyleoDataServer, check_valid_spec, RowDataServer
+from galyleo.galyleo_metrics import SIZE_BUCKETS, metrics
+from galyleo.galyleo_profiling import ProfileStore
+from galyleo.galyleo_scheduler import FeedScheduler
+from galyleo.galyleo_table_registry import TableRegistry, get_table_key
+from galyleo.galyleo_table_server import GalyleoDataServer, check_valid_spec
 
 
 galyleo_server_blueprint = Blueprint('galyleo_server', __name__)
 
-table_servers = {}
+table_servers = TableRegistry()
+
+table_versions = ChangeNotifier()
+
+_subscribe_options = {"keepalive": SUBSCRIBE_KEEPALIVE, "max_duration": SUBSCRIBE_MAX_DURATION}
 
+_profile_options = {"store": None, "token": None}
 
-def _convert_type(type, value):
-    if type == GALYLEO_NUMBER:
-        return float(value)
-    if type == GALYLEO_DATE:
-        # return a parsed datetime
-        return datetime.datetime.fromisoformat(value)
-    if type == GALYLEO_DATETIME:
-        # return a parsed datetime
-        return datetime.datetime.fromisoformat(value)
-    if type == GALYLEO_TIME_OF_DAY:
-        # return a parsed datetime
-        return datetime.datetime.fromisoformat(value)
-    if type == GALYLEO_BOOLEAN:
-        return True if value else False
-    return value
+_fan_out_options = {"max_workers": FAN_OUT_MAX_WORKERS, "timeout": FAN_OUT_TIMEOUT}
+_fan_out_executor = None
 
-def _convert_row(types, row):
-    return [_convert_type(types[i], row[i]) for i in range(len(types))]
-    
+feed_scheduler = FeedScheduler()
 
-def create_server_from_csv(table_name, path_to_csv_file):
+# The servers which have a change listener; each has exactly one, whatever its registrations
+_listened_servers = weakref.WeakSet()
+_listened_servers_lock = threading.Lock()
+
+
+def create_server_from_csv(table_name, path_to_csv_file, dashboard_name = None, workers = 1):
     '''
-    Create a server from a CSV file.The file must meet the format for a GalyleoTableServer:
+    Create a server from a CSV file, and register it for table_name (and, optionally,
+    dashboard_name).  The file must meet the format for a GalyleoTableServer:
     1. Each row must contain the same number of columns;
     2. The first row (row 0) are the names of the columns
     3. The second row (row 1)  has the types of the columns
     4. The type of each entry in rows 2-n must match the declared type of the column
-    '''
-    try:
-        with open(path_to_csv_file, 'r') as f:
-            r = csv.reader(f)
-            rows = r.readrows()
-        assert len(rows) > 2
-        num_columns = len(rows[0])
-        for row in rows[1:]: assert len(row) == num_columns
-        for entry in rows[1]: assert entry in GALYLEO_SCHEMA_TYPES
-    except Exception as error:
-        raise InvalidDataException(error)
-    
-    schema = [{"name": rows[0][i], "type": rows[1][i]} for i in range(num_columns)]
-    try:
-        final_rows = [_convert_row(rows[1], row) for row in rows[2:]]
-        server = RowDataServer(schema, final_rows)
-        add_table_server(table_name, server)
-
-    except ValueError as error:
-        raise InvalidDataException(f'{error} raised during type conversion')
+    The file is read in blocks and converted a column at a time (see galyleo_csv_loader),
+    and the table is served from columnar storage.  Raises an InvalidDataException if the
+    file is not in this format.
 
-
-
-def _get_table_key(table_name, dashboard_name = None):
-    '''
-    The table key for a server (the dictionary key that finds the server) is either the
-    pair (dashboard_name, table_name) if dashboard_name is not None, or table_name if
-    dashboard_name is None.
-    This method just computes and returns that.  Internal use only
-    Parameters:
-        table_name: name of the table
-        dashboard_name: name of the dashboard
+    Arguments:
+        table_name: name to register the server for
+        path_to_csv_file: path to the CSV file
+        dashboard_name: name of the dashboard (optional, None if not supplied)
+        workers: number of worker processes used to parse the file.  Default 1
     Returns:
-        (dashboard_name, table_name) if dashboard_name is not None, table_name otherwise
-    Raises:
-        InvalidDataException if table_name is None
+        the ColumnarDataServer serving the table
     '''
-    if table_name is None:
-        raise  InvalidDataException('table_name must be supplied')
-    return table_name if dashboard_name is None else (dashboard_name, table_name)
+    # numpy and the CSV loader are only needed here, so don't import them with the blueprint
+    from galyleo.galyleo_columns import ColumnarDataServer  # pylint: disable=import-outside-toplevel
+    from galyleo.galyleo_csv_loader import load_csv_columns  # pylint: disable=import-outside-toplevel
+    schema, columns = load_csv_columns(path_to_csv_file, workers)
+    server = ColumnarDataServer(schema, columns)
+    add_table_server(table_name, server, dashboard_name)
+    return server
 
-def _get_all_tables(dashboard_name = None):
-    '''
-    Get all the tables for a dashboard, or, if dashboard_name is None, all the tables.  This
-    is to support a request for a numeric_spec or all_values for a column name when the
-    table_name is not specified. In this case, all tables will be searched for this column name.
-    Parameters:
-        dashboard_name: name of the dashboard
-    Returns:
-        a list of all tables in the dashboard
-    '''
-    if dashboard_name is not None:
-        keys = [key for key in table_servers if key[0] == dashboard_name]
-        return [table_servers[key] for key in keys]
-    else:
-        return table_servers.values()
 
 def add_table_server(table_name, galyleo_data_server, dashboard_name = None):
     '''
     Register a GalyleoDataServer to serve data for a specific table name, and, optionally,
     dashboard_name if it is supplied.   Raises an InvalidDataException if table_name is
     None or galyleo_data_server is None or is not an instance of GalyleoDataServer.
+    Subscribers to the table are notified that its data has changed; they are also notified
+    whenever the server reports a change (see GalyleoDataServer.add_change_listener), e.g.
+    when a refresh changes its snapshot or rows are appended to a live feed.
 
     Arguments:
         table_name: name to register the server for
@@ -165,7 +146,167 @@ def add_table_server(table_name, galyleo_data_server, dashboard_name = None):
         assert isinstance(galyleo_data_server, GalyleoDataServer), msg
     except AssertionError as assertion_error:
         raise InvalidDataException from assertion_error
-    table_servers[_get_table_key(table_name, dashboard_name)] = galyleo_data_server
+    galyleo_data_server.table_label = table_name if dashboard_name is None else f'{dashboard_name}/{table_name}'
+    table_servers.add(table_name, galyleo_data_server, dashboard_name)
+    with _listened_servers_lock:
+        if galyleo_data_server not in _listened_servers:
+            _listened_servers.add(galyleo_data_server)
+            galyleo_data_server.add_change_listener(lambda: _notify_server_changed(galyleo_data_server))
+    notify_table_changed(table_name, dashboard_name)
+
+def _notify_server_changed(galyleo_data_server):
+    '''
+    Internal use only.  The change listener of galyleo_data_server: notify each table for which
+    it is currently registered, so a server which has been replaced notifies nothing
+
+    Arguments:
+        galyleo_data_server: the server whose data changed
+    '''
+    for key in table_servers.keys_of(galyleo_data_server):
+        table_versions.notify(key)
+
+def notify_table_changed(table_name, dashboard_name = None):
+    '''
+    Notify the dashboards subscribed to table_name (and dashboard_name, if not None) that
+    its data has changed.  Call this whenever the rows returned by the table's server change.
+
+    Arguments:
+        table_name: name of the table
+        dashboard_name: name of the dashboard (optional, None if not supplied)
+    Returns:
+        the new data version of the table
+    '''
+    return table_versions.notify(get_table_key(table_name, dashboard_name))
+
+def add_refresh_job(table_name, function, interval, dashboard_name = None, timeout = None, notify = True):
+    '''
+    Run function, which refreshes the data served for table_name (and, optionally,
+    dashboard_name), every interval seconds on the feed scheduler (see galyleo_scheduler),
+    once the scheduler is started by start_feeds() or the /start route.  Replaces any
+    refresh job for the same table.
+
+    Arguments:
+        table_name: name of the table
+        function: function of no arguments which refreshes the table's data
+        interval: time, in seconds, between the end of one refresh and the start of the next
+        dashboard_name: name of the dashboard (optional, None if not supplied)
+        timeout: time, in seconds, after which a refresh is a failure.  Default: the interval
+        notify: if True (the default), subscribers to the table are notified after each
+            successful refresh.  Pass False if the server notifies them itself (e.g. a
+            LiveFeedDataServer registered with add_table_server)
+    '''
+    def refresh():
+        function()
+        if notify:
+            notify_table_changed(table_name, dashboard_name)
+    name = table_name if dashboard_name is None else f'{dashboard_name}/{table_name}'
+    feed_scheduler.add_job(name, refresh, interval, timeout)
+
+def start_feeds():
+    '''
+    Start the feed scheduler, if it isn't running.  Returns True if it was started by this call
+    '''
+    return feed_scheduler.start()
+
+def configure_subscriptions(keepalive = None, max_duration = None):
+    '''
+    Configure the /subscribe event streams.  Either argument may be omitted, in which
+    case the current setting is kept.
+
+    Arguments:
+        keepalive: time, in seconds, between keepalive comments on an idle stream
+        max_duration: time, in seconds, after which a stream is closed (the dashboard then reconnects)
+    '''
+    for (name, value) in [("keepalive", keepalive), ("max_duration", max_duration)]:
+        if value is not None:
+            if value <= 0:
+                raise InvalidDataException(f'{name} must be positive, not {value}')
+            _subscribe_options[name] = value
+
+def configure_profiling(directory = None, token = None, max_profiles = PROFILE_MAX_FILES):
+    '''
+    Enable or disable per-request profiling.  When profiling is enabled, a request to a data
+    route with the header Galyleo-Profile: 1 and the header Galyleo-Profile-Token: <token> is
+    run under cProfile (any other value of Galyleo-Profile is ignored), and the profile is stored, with the request's route, table, filter spec
+    and timings, in directory (see galyleo_profiling.ProfileStore).  The name of the profile is
+    returned in the Galyleo-Profile-Name header, and the profiles can be listed and downloaded
+    from /profiles.  Profiling is disabled by default; call with directory = None to disable it.
+
+    Arguments:
+        directory: the directory to store profiles in, or None to disable profiling
+        token: the secret which requests must send to be profiled, or to list profiles.  Required if directory is not None
+        max_profiles: the maximum number of profiles kept
+    '''
+    if directory is None:
+        _profile_options["store"] = None
+        _profile_options["token"] = None
+        return
+    if not token:
+        raise InvalidDataException('A token is required to enable profiling')
+    _profile_options["store"] = ProfileStore(directory, max_profiles)
+    _profile_options["token"] = token
+
+def configure_fan_out(max_workers = None, timeout = None):
+    '''
+    Configure the thread pool used when a request spans several table servers (a
+    /get_numeric_spec or /get_all_values request with no Table-Name).  Either argument
+    may be omitted, in which case the current setting is kept.
+
+    Arguments:
+        max_workers: maximum number of table servers queried at the same time
+        timeout: time, in seconds, to wait for any single table server before its result is dropped
+    '''
+    global _fan_out_executor
+    if max_workers is not None:
+        if max_workers < 1:
+            raise InvalidDataException(f'max_workers must be at least 1, not {max_workers}')
+        _fan_out_options["max_workers"] = max_workers
+        if _fan_out_executor is not None:
+            _fan_out_executor.shutdown(wait = False)
+            _fan_out_executor = None
+    if timeout is not None:
+        if timeout <= 0:
+            raise InvalidDataException(f'timeout must be positive, not {timeout}')
+        _fan_out_options["timeout"] = timeout
+
+def _get_fan_out_executor():
+    '''
+    Internal use only.  Get the shared thread pool for fan-out requests, creating it on first use
+    '''
+    global _fan_out_executor
+    if _fan_out_executor is None:
+        _fan_out_executor = ThreadPoolExecutor(max_workers = _fan_out_options["max_workers"], thread_name_prefix = 'galyleo_fan_out')
+    return _fan_out_executor
+
+def _fan_out(request_api, function, servers):
+    '''
+    Internal use only.  Call function(server) for each server in servers on the fan-out thread
+    pool, and return the results of the calls which finished.  A call which has not finished
+    within the configured timeout of the request is dropped and logged, whether it was running
+    or still queued behind other requests' calls, so the latency of the request is bounded by
+    the timeout rather than by the sum of the sources.  An exception raised by any call is
+    re-raised here.
+
+    Arguments:
+        request_api: api of the request, for logging
+        function: function of a single argument, a GalyleoDataServer
+        servers: the servers to call function on
+    Returns:
+        the list of results, in no particular order
+    '''
+    servers = list(servers)
+    if len(servers) == 1:
+        return [function(servers[0])]
+    timeout = _fan_out_options["timeout"]
+    deadline = time.monotonic() + timeout
+    executor = _get_fan_out_executor()
+    futures = {executor.submit(function, server): i for (i, server) in enumerate(servers)}
+    done, pending = wait(futures, timeout = max(0, deadline - time.monotonic()))
+    for future in pending:
+        logging.warning(f'{request_api}: table server {futures[future]} did not respond within {timeout} seconds; its result was dropped')
+        # a call which is still queued never runs; one which is running finishes unobserved
+        future.cancel()
+    return [future.result() for future in done]
 
 def _log_and_abort(message):
     '''
@@ -188,9 +329,11 @@ def _get_table_server(request_api):
     table_name = request.headers.get('Table-Name')
     dashboard_name = request.headers.get('Dashboard-Name')
     try:
-        table_signature = _get_table_key(table_name, dashboard_name)
+        table_signature = get_table_key(table_name, dashboard_name)
         try:
-            return table_servers[table_signature]
+            server = table_servers[table_signature]
+            _note_snapshot_ages([server])
+            return server
         except KeyError:
             msg = f'No handler defined for table {table_signature} for request {request_api}'
             _log_and_abort(msg)
@@ -209,21 +352,197 @@ def _get_table_servers(request_api):
     table_name = request.headers.get('Table-Name')
     dashboard_name = request.headers.get('Dashboard-Name')
     if table_name is not None:
-        table_signature = _get_table_key(table_name, dashboard_name)
+        table_signature = get_table_key(table_name, dashboard_name)
         try:
-            return [table_servers[table_signature]]
+            servers = [table_servers[table_signature]]
+            _note_snapshot_ages(servers)
+            return servers
         except KeyError:
             msg = f'No handler defined for table {table_signature} for request {request_api}'
             _log_and_abort(msg)
     else:
-        tables = _get_all_tables(dashboard_name)
+        tables = table_servers.tables(dashboard_name)
         if len(tables) == 0:
-            message_tail = f' for {dashboard_name}' if dashboard_name is not None else ''
-            message = 'No tables found' +  message_tail  +  f' for request {request_api}'
-            _log_and_abort(message)
+            _abort_no_tables(dashboard_name, request_api)
         else:
+            _note_snapshot_ages(tables)
             return tables
 
+def _abort_no_tables(dashboard_name, request_api):
+    '''
+    Internal use.  Abort a request because no tables are registered (for dashboard_name, if not None)
+    '''
+    message_tail = f' for {dashboard_name}' if dashboard_name is not None else ''
+    message = 'No tables found' +  message_tail  +  f' for request {request_api}'
+    _log_and_abort(message)
+
+def _get_column_servers(request_api, column_name):
+    '''
+    Internal use.  Get the servers with a column named column_name: the server for the
+    Table-Name header if there is one, and otherwise every server (for the Dashboard-Name
+    header, if present) found through the registry's column index.  Aborts the request
+    with a 400 if the named table isn't found or there are no tables at all.
+
+    Arguments:
+        request_api: api  of the request
+        column_name: the name of the column
+    Returns:
+        a list of pairs (server, type of column_name in that server)
+    '''
+    table_name = request.headers.get('Table-Name')
+    dashboard_name = request.headers.get('Dashboard-Name')
+    if table_name is not None:
+        server = _get_table_servers(request_api)[0]
+        column_type = server.get_column_type(column_name)
+        return [] if column_type is None else [(server, column_type)]
+    if table_servers.num_tables(dashboard_name) == 0:
+        _abort_no_tables(dashboard_name, request_api)
+    column_servers = table_servers.servers_with_column(column_name, dashboard_name)
+    _note_snapshot_ages([server for (server, _) in column_servers])
+    return column_servers
+
+def _note_snapshot_ages(servers):
+    '''
+    Internal use only.  Record that servers are used by this request, so that the age of the
+    oldest snapshot they serve is sent in the Snapshot-Age header (see add_snapshot_age)
+    '''
+    if 'galyleo_servers' not in g:
+        g.galyleo_servers = []
+    g.galyleo_servers.extend(servers)
+
+@galyleo_server_blueprint.after_request
+def add_snapshot_age(response):
+    '''
+    If the request was served from a table snapshot (see GalyleoDataServer's refresh_interval),
+    send the age of the oldest snapshot used, in seconds, in the Snapshot-Age header
+
+    Arguments:
+        response: the response to the request
+    '''
+    ages = [server.snapshot_age() for server in g.get('galyleo_servers', [])]
+    ages = [age for age in ages if age is not None]
+    if len(ages) > 0:
+        response.headers['Snapshot-Age'] = f'{max(ages):.3f}'
+    return response
+
+
+def _request_table_label():
+    '''
+    Internal use only.  The table label for the metrics of this request: the label of the
+    server named by the Table-Name and Dashboard-Name headers, "*" (or "<dashboard>/*") if
+    there is no Table-Name, and "unknown" if the table isn't registered.  Labels are only
+    taken from registered servers, so clients can't create arbitrarily many metrics.
+    '''
+    table_name = request.headers.get('Table-Name')
+    dashboard_name = request.headers.get('Dashboard-Name')
+    if table_name is None:
+        return '*' if dashboard_name is None or table_servers.num_tables(dashboard_name) == 0 else f'{dashboard_name}/*'
+    key = get_table_key(table_name, dashboard_name)
+    return table_servers[key].table_label if key in table_servers else 'unknown'
+
+def _instrumented(route):
+    '''
+    Internal use only.  A decorator for route handlers which records the request count,
+    errors, latency and response size of each request, labelled by route and table
+
+    Arguments:
+        route: the route, for the metric labels
+    '''
+    def decorate(handler):
+        @wraps(handler)
+        def instrumented_handler(*args, **kwargs):
+            labels = {"route": route, "table": _request_table_label()}
+            g.galyleo_metric_labels = labels
+            metrics.increment('galyleo_requests_total', labels)
+            start = time.perf_counter()
+            try:
+                if _profile_options["store"] is not None and request.headers.get('Galyleo-Profile') == '1':
+                    response = _profiled_call(labels, handler, args, kwargs)
+                else:
+                    response = handler(*args, **kwargs)
+            except Exception:
+                metrics.increment('galyleo_request_errors_total', labels)
+                raise
+            finally:
+                metrics.observe('galyleo_request_seconds', labels, time.perf_counter() - start)
+            size = response.calculate_content_length() if isinstance(response, Response) else None
+            if size is not None:
+                metrics.observe('galyleo_response_bytes', labels, size, SIZE_BUCKETS)
+            return response
+        return instrumented_handler
+    return decorate
+
+def _check_profile_token():
+    '''
+    Internal use only.  Abort with a 404 if profiling is disabled, and a 403 if the request's
+    Galyleo-Profile-Token header doesn't match the configured token
+    '''
+    token = _profile_options["token"]
+    if token is None:
+        abort(404)
+    sent = request.headers.get('Galyleo-Profile-Token', '')
+    if not hmac.compare_digest(sent.encode(), token.encode()):
+        logging.error(f'Bad or missing Galyleo-Profile-Token for {request.path}')
+        abort(403, 'Bad or missing Galyleo-Profile-Token')
+
+def _profiled_call(labels, handler, args, kwargs):
+    '''
+    Internal use only.  Run handler under cProfile and store the profile (see configure_profiling)
+
+    Arguments:
+        labels: the metric labels of the request, {"route", "table"}
+        handler: the route handler
+        args, kwargs: the arguments to the handler
+    '''
+    _check_profile_token()
+    store = _profile_options["store"]
+    profile = cProfile.Profile()
+    metadata = {"route": labels["route"], "table": labels["table"], "filter_spec": request.headers.get('Filter-Spec'),
+                "args": request.args.to_dict(), "body": request.get_json(silent = True), "start_time": time.time()}
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = profile.runcall(handler, *args, **kwargs)
+        status = getattr(response, 'status_code', 200)
+    except Exception as error:
+        status = getattr(error, 'code', 500)
+        raise
+    finally:
+        metadata["elapsed_seconds"] = time.perf_counter() - start
+        metadata["status"] = status
+        name = store.save(profile, metadata)
+        logging.info(f'Stored profile {name} of {labels["route"]} for table {labels["table"]}')
+    response.headers['Galyleo-Profile-Name'] = name
+    return response
+
+def _json_response(result, rows = False):
+    '''
+    Internal use only.  jsonify result, recording the serialization time and, if rows is
+    True, the number of rows, under the metric labels of the request (see _instrumented)
+
+    Arguments:
+        result: the result of the request
+        rows: True if result is a list of rows
+    '''
+    labels = g.get('galyleo_metric_labels', {"route": request.path, "table": 'unknown'})
+    if rows:
+        metrics.observe('galyleo_rows_returned', labels, len(result), SIZE_BUCKETS)
+    with metrics.timer('galyleo_serialize_seconds', labels):
+        return jsonify(result)
+
+def _column_statistic(server, operation, column_name, *arguments):
+    '''
+    Internal use only.  Return server.<operation>(column_name, *arguments), where operation
+    is "all_values", "numeric_spec" or "column_summary", recording the time taken
+
+    Arguments:
+        server: the table server
+        operation: "all_values", "numeric_spec" or "column_summary"
+        column_name: the name of the column
+        arguments: any further arguments of the operation
+    '''
+    with metrics.timer('galyleo_statistics_seconds', {"table": server.table_label, "operation": operation}):
+        return getattr(server, operation)(column_name, *arguments)
 
 def _check_required_parameters(handle, parameter_set):
     '''
@@ -274,13 +593,16 @@ def echo_headers():
 
 
 @galyleo_server_blueprint.route('/get_filtered_rows', methods=['GET'])
+@_instrumented('/get_filtered_rows')
 def get_filtered_rows():
     '''
     Get the filtered rows from a request.  In the initializer, this
     was registered for the /get_filtered_rows route.  Gets the filter_spec
     from the Filter-Spec header variable If there is no filter_spec, returns
-    all rows using server.get_rows().  Aborts with a 400 if there is no
-    table_name, or if check_valid_spec or get_filtered_rows throws an
+    all rows using server.get_rows().  If there is a Row-Offset or Row-Limit header, only
+    that page of the rows is returned (see _page_bounds).  If there is a Max-Points header, the
+    rows are downsampled before they are sent (see _downsample).  Aborts with a 400 if there is no
+    table_name, or if check_valid_spec, get_filtered_rows or the downsampling throws an
     InvalidDataException, or if the filter_spec is not valid JSON.
 
     Arguments:
@@ -298,29 +620,105 @@ def get_filtered_rows():
 
 
     server = _get_table_server('get_filtered_rows')
-    if filter_spec is not None:
-        try:
+    try:
+        page = _page_bounds()
+        if filter_spec is not None:
             check_valid_spec(filter_spec)
-            return jsonify(server.get_filtered_rows(filter_spec))
-        except InvalidDataException as invalid_error:
-            _log_and_abort(invalid_error)
-    else:
-        return jsonify(server.get_rows())
+        if page is not None:
+            rows = server.get_rows_page(filter_spec, *page)
+        elif filter_spec is not None:
+            rows = server.get_filtered_rows(filter_spec)
+        else:
+            with metrics.timer('galyleo_get_rows_seconds', {"table": server.table_label}):
+                rows = server.get_rows()
+        return _json_response(_downsample(server, rows), rows = True)
+    except InvalidDataException as invalid_error:
+        _log_and_abort(invalid_error)
 
-def _is_numeric_column(table_server, column_name):
+def _page_bounds():
+    '''
+    Internal use only.  Return the pair (offset, limit) given by the Row-Offset (default 0)
+    and Row-Limit (default None, all rows) headers, or None if neither was sent.  Raises an
+    InvalidDataException if they are not non-negative integers
+    '''
+    offset = request.headers.get('Row-Offset')
+    limit = request.headers.get('Row-Limit')
+    if offset is None and limit is None:
+        return None
+    try:
+        bounds = (int(0 if offset is None else offset), None if limit is None else int(limit))
+    except ValueError as original_error:
+        raise InvalidDataException(f'Row-Offset and Row-Limit must be integers, not {offset} and {limit}') from original_error
+    if bounds[0] < 0 or (bounds[1] is not None and bounds[1] < 0):
+        raise InvalidDataException(f'Row-Offset and Row-Limit must not be negative, not {offset} and {limit}')
+    return bounds
+
+def _downsample(server, rows):
     '''
-    Internal use only.  Returns True iff the table_server has a column with name column_name,
-     and if the type is GALYLEO_NUMBER
+    Internal use only.  If the request has a Max-Points header, reduce rows to at most that
+    many rows with the method in the Downsample-Method header (lttb, the default, minmax or
+    reservoir), sorted by the column in the Downsample-X header and preserving the shape of
+    the column in the Downsample-Y header (see galyleo_downsampling.downsample_rows).
+    Raises an InvalidDataException for bad headers
 
     Arguments:
-        table_server: the table server to check
-        column_name: the name of the column_name
+        server: the table server the rows came from
+        rows: the rows
+    Returns:
+        the rows to send
+    '''
+    max_points = request.headers.get('Max-Points')
+    if max_points is None:
+        return rows
+    # galyleo_downsampling needs numpy, so only import it when a request downsamples
+    from galyleo.galyleo_downsampling import downsample_rows  # pylint: disable=import-outside-toplevel
+    try:
+        max_points = int(max_points)
+    except ValueError as original_error:
+        raise InvalidDataException(f'Max-Points must be an integer, not {max_points}') from original_error
+    method = request.headers.get('Downsample-Method', 'lttb')
+    with metrics.timer('galyleo_downsample_seconds', {"table": server.table_label}):
+        return downsample_rows(server.schema, rows, max_points, method, request.headers.get('Downsample-X'), request.headers.get('Downsample-Y'))
+
+@galyleo_server_blueprint.route('/get_aggregated_rows', methods=['GET'])
+@_instrumented('/get_aggregated_rows')
+def get_aggregated_rows():
     '''
-    column_type = table_server.get_column_type(column_name)
-    return column_type is not None and column_type == GALYLEO_NUMBER
+    Target for the /get_aggregated_rows route.  Filters the rows of the table named in the
+    Table-Name (and, optionally, Dashboard-Name) headers by the Filter-Spec header (all rows
+    if there is none), then groups and aggregates them by the Aggregate-Spec header (see
+    galyleo_aggregation).  Aborts with a 400 if there is no Aggregate-Spec, if either spec
+    is not valid JSON or is invalid, or for a bad table name.
 
+    Arguments:
+        None
+    Returns:
+        A JSONified dictionary {"columns": schema of the result, "rows": aggregated rows}
+    '''
+    specs = {}
+    for header in ['Filter-Spec', 'Aggregate-Spec']:
+        spec_as_json = request.headers.get(header)
+        if spec_as_json is not None:
+            try:
+                specs[header] = loads(spec_as_json)
+            except JSONDecodeError as error:
+                _log_and_abort(f'Bad {header}: {spec_as_json}.  Error {error.msg}')
+    if 'Aggregate-Spec' not in specs:
+        _log_and_abort('/get_aggregated_rows requires an Aggregate-Spec header')
+    server = _get_table_server('get_aggregated_rows')
+    filter_spec = specs.get('Filter-Spec')
+    try:
+        if filter_spec is not None:
+            check_valid_spec(filter_spec)
+        result = server.get_aggregated_rows(filter_spec, specs['Aggregate-Spec'])
+        labels = g.get('galyleo_metric_labels', {"route": request.path, "table": 'unknown'})
+        metrics.observe('galyleo_rows_returned', labels, len(result["rows"]), SIZE_BUCKETS)
+        return _json_response(result)
+    except InvalidDataException as invalid_error:
+        _log_and_abort(invalid_error)
 
 @galyleo_server_blueprint.route('/get_numeric_spec')
+@_instrumented('/get_numeric_spec')
 def get_numeric_spec():
     '''
     Target for the /get_numeric_spec route.  Makes sure that column_name is specified
@@ -333,23 +731,44 @@ def get_numeric_spec():
             None
     '''
 
-    servers = _get_table_servers('/get_numeric_spec')
     column_name = request.args.get('column_name')
     if column_name is not None:
-        matching_servers = [server for server in servers if _is_numeric_column(server, column_name)]
-        if len(matching_servers) == 0:
-            _log_and_abort(f'/get_numeric_spec found no numeric columns of name {column_name}')
-        spec = matching_servers[0].numeric_spec(column_name)
-        for server in matching_servers[1:]:
-            serv_spec = server.numeric_spec(column_name)
-            spec["max_val"] = max(spec["max_val"], serv_spec["max_val"])
-            spec["min_val"] = min(spec["min_val"], serv_spec["min_val"])
-            spec["increment"] = min(spec["increment"], serv_spec["increment"])
-        return jsonify(spec)
+        column_servers = _get_column_servers('/get_numeric_spec', column_name)
+        try:
+            return _json_response(_numeric_spec_for_servers(column_servers, column_name))
+        except InvalidDataException as error:
+            _log_and_abort(f'Error in get_numeric_spec for column {column_name}: {error}')
     else:
         _log_and_abort('/get_numeric_spec requires a parameter "column_name"')
 
+def _numeric_spec_for_servers(column_servers, column_name):
+    '''
+    Internal use only.  Compute the numeric spec for column_name across all of the servers
+    which have a numeric column of that name, merging the specs from the individual servers.
+    Raises an InvalidDataException if no server has such a column.
+
+    Arguments:
+        column_servers: pairs (server, column type) for the servers with a column named column_name
+        column_name: the name of the column
+    Returns:
+        the merged spec {"min_val", "max_val", "increment"}
+    '''
+    matching_servers = [server for (server, column_type) in column_servers if column_type == GALYLEO_NUMBER]
+    if len(matching_servers) == 0:
+        raise InvalidDataException(f'/get_numeric_spec found no numeric columns of name {column_name}')
+    specs = _fan_out('/get_numeric_spec', lambda server: _column_statistic(server, 'numeric_spec', column_name), matching_servers)
+    if len(specs) == 0:
+        raise InvalidDataException(f'/get_numeric_spec: no table server responded for column {column_name}')
+    # copy, since a server's spec may be cached (see _BatchContext) and must not be changed
+    spec = dict(specs[0])
+    for serv_spec in specs[1:]:
+        spec["max_val"] = max(spec["max_val"], serv_spec["max_val"])
+        spec["min_val"] = min(spec["min_val"], serv_spec["min_val"])
+        spec["increment"] = min(spec["increment"], serv_spec["increment"])
+    return spec
+
 @galyleo_server_blueprint.route('/get_all_values')
+@_instrumented('/get_all_values')
 def get_all_values():
     '''
     Target for the /get_all_values route.  Makes sure that column_name is specified in the call,
@@ -361,25 +780,217 @@ def get_all_values():
         None
     '''
 
-    servers = _get_table_servers('/get_numeric_spec')
     column_name = request.args.get('column_name')
     if column_name is not None:
+        column_servers = _get_column_servers('/get_all_values', column_name)
         try:
-            matching_servers = [server for server in servers if server.get_column_type(column_name) is not None]
-            if len(matching_servers) == 0:
-                _log_and_abort(f'/get_all_values found no  columns of name {column_name}')
-            values_set = set(matching_servers[0].all_values(column_name))
-            for server in matching_servers[1:]:
-                values_set = values_set.union(set(server.all_values(column_name)))
-            result = list(values_set)
-            result.sort()
-            return jsonify(result)
+            return _json_response(_all_values_for_servers(column_servers, column_name))
         except InvalidDataException as error:
             _log_and_abort(f'Error in get_all_values for column {column_name}: {error}')
     else:
         _log_and_abort('/get_all_values requires a parameter "column_name"')
 
+def _all_values_for_servers(column_servers, column_name):
+    '''
+    Internal use only.  Compute the sorted list of distinct values of column_name across all
+    of the servers which have a column of that name.  Raises an InvalidDataException if no
+    server has such a column.
+
+    Arguments:
+        column_servers: pairs (server, column type) for the servers with a column named column_name
+        column_name: the name of the column
+    Returns:
+        the sorted union of the values of column_name on each server
+    '''
+    matching_servers = [server for (server, _) in column_servers]
+    if len(matching_servers) == 0:
+        raise InvalidDataException(f'/get_all_values found no  columns of name {column_name}')
+    value_lists = _fan_out('/get_all_values', lambda server: _column_statistic(server, 'all_values', column_name), matching_servers)
+    values_set = set()
+    for value_list in value_lists:
+        values_set = values_set.union(set(value_list))
+    result = list(values_set)
+    result.sort()
+    return result
+
+class _BatchContext:
+    '''
+    Internal use only.  The state shared by the sub-requests of one /batch request.  Each
+    table server used by the batch is replaced by a shallow copy whose get_rows(),
+    all_values() and numeric_spec() are memoized, so a table's rows are fetched at most
+    once and each column's statistics are computed at most once per batch, however many
+    sub-requests use them.  Results of identical sub-requests are also shared.
+    '''
+    def __init__(self):
+        self.views = {}
+        self.results = {}
+
+    def view(self, server):
+        '''
+        Return the memoized view of server for this batch
+        '''
+        key = id(server)
+        if key not in self.views:
+            _note_snapshot_ages([server])
+            view = copy.copy(server)
+            view.get_rows = lru_cache(maxsize = None)(server.get_rows)
+            view.all_values = lru_cache(maxsize = None)(view.all_values)
+            view.numeric_spec = lru_cache(maxsize = None)(view.numeric_spec)
+            self.views[key] = (server, view)
+        return self.views[key][1]
+
+    def table_view(self, table_name, dashboard_name):
+        '''
+        Return the view of the server for table_name (and dashboard_name, if not None),
+        raising an InvalidDataException if there is no such table
+        '''
+        table_signature = get_table_key(table_name, dashboard_name)
+        try:
+            return self.view(table_servers[table_signature])
+        except KeyError as original_error:
+            raise InvalidDataException(f'No handler defined for table {table_signature}') from original_error
+
+    def column_views(self, column_name, table_name, dashboard_name):
+        '''
+        Return the pairs (view, column type) for the servers with a column named column_name,
+        as _get_column_servers does for a single request
+        '''
+        if table_name is not None:
+            view = self.table_view(table_name, dashboard_name)
+            column_type = view.get_column_type(column_name)
+            return [] if column_type is None else [(view, column_type)]
+        if table_servers.num_tables(dashboard_name) == 0:
+            message_tail = f' for {dashboard_name}' if dashboard_name is not None else ''
+            raise InvalidDataException('No tables found' + message_tail)
+        return [(self.view(server), column_type) for (server, column_type) in table_servers.servers_with_column(column_name, dashboard_name)]
+
+    def evaluate(self, sub_request):
+        '''
+        Evaluate a single sub-request, returning its result or raising an InvalidDataException
+        '''
+        if not isinstance(sub_request, dict):
+            raise InvalidDataException(f'A batch request must be a dictionary, not {sub_request}')
+        route = sub_request.get("route")
+        table_name = sub_request.get("table_name")
+        dashboard_name = sub_request.get("dashboard_name")
+        column_name = sub_request.get("column_name")
+        filter_spec = sub_request.get("filter_spec")
+        if route == '/get_filtered_rows':
+            view = self.table_view(table_name, dashboard_name)
+            if filter_spec is None:
+                return view.get_rows()
+            check_valid_spec(filter_spec)
+            return view.get_filtered_rows(filter_spec)
+        if route == '/get_table_spec':
+            view = self.table_view(table_name, dashboard_name)
+            return {"header_variables": view.header_variables, "schema": view.schema.to_list()}
+        if route in ('/get_numeric_spec', '/get_all_values'):
+            if column_name is None:
+                raise InvalidDataException(f'{route} requires a parameter "column_name"')
+            column_views = self.column_views(column_name, table_name, dashboard_name)
+            if route == '/get_numeric_spec':
+                return _numeric_spec_for_servers(column_views, column_name)
+            return _all_values_for_servers(column_views, column_name)
+        raise InvalidDataException(f'Unsupported route {route} in batch request')
+
+    def response(self, sub_request):
+        '''
+        Return the response record for sub_request: {"status": 200, "result": <result>} or
+        {"status": 400, "message": <error message>}.  Identical sub-requests share a response
+        '''
+        try:
+            key = dumps(sub_request, sort_keys = True)
+        except TypeError:
+            key = None
+        if key is not None and key in self.results:
+            return self.results[key]
+        try:
+            result = {"status": 200, "result": self.evaluate(sub_request)}
+        except InvalidDataException as error:
+            logging.error(f'Error in /batch request {sub_request}: {error}')
+            result = {"status": 400, "message": str(error)}
+        if key is not None:
+            self.results[key] = result
+        return result
+
+@galyleo_server_blueprint.route('/batch', methods=['POST'])
+@_instrumented('/batch')
+def batch():
+    '''
+    Target for the /batch route.  The body is a JSON list of sub-requests, each a dictionary
+    {"route": <route>, "table_name": <string>, "dashboard_name": <string>, "column_name": <string>,
+    "filter_spec": <filter spec>}, where route is one of /get_filtered_rows, /get_table_spec,
+    /get_numeric_spec and /get_all_values, and the other fields are the header variables and
+    arguments of that route (all optional, as for the route).  Returns a JSONified list with one
+    record per sub-request, in order: {"status": 200, "result": <result>} or
+    {"status": 400, "message": <error message>}.  The sub-requests share one get_rows() call
+    per table and one statistics computation per column.  Aborts with a 400 if the body is not
+    a JSON list.
+
+    Arguments:
+        None
+    '''
+    sub_requests = request.get_json(silent = True)
+    if not isinstance(sub_requests, list):
+        _log_and_abort('/batch requires a JSON list of requests as its body')
+    context = _BatchContext()
+    return _json_response([context.response(sub_request) for sub_request in sub_requests])
+
+def _change_event(table_name, dashboard_name, version):
+    '''
+    Internal use only.  Format a change notification as a server-sent event
+    '''
+    data = dumps({"table_name": table_name, "dashboard_name": dashboard_name, "version": version})
+    return f'event: change\ndata: {data}\n\n'
+
+@galyleo_server_blueprint.route('/subscribe')
+def subscribe():
+    '''
+    Target for the /subscribe route: a server-sent event stream of data changes for the tables
+    named by the (repeated) table_name arguments, optionally in the dashboard named by the
+    dashboard_name argument.  (The arguments are in the URL rather than headers because
+    EventSource can't send headers).  The stream starts with a change event giving the current
+    data version of each table, and then sends a change event
+    {"table_name", "dashboard_name", "version"} each time a table's data changes.  Idle streams
+    get a keepalive comment every SUBSCRIBE_KEEPALIVE seconds, and are closed after
+    SUBSCRIBE_MAX_DURATION seconds, when the dashboard reconnects.  Aborts with a 400 if no
+    table is named or a table isn't registered.  Note that each open stream occupies a
+    request thread.
+
+    Arguments:
+        None
+    '''
+    table_names = request.args.getlist('table_name')
+    dashboard_name = request.args.get('dashboard_name')
+    if len(table_names) == 0:
+        _log_and_abort('/subscribe requires at least one parameter "table_name"')
+    names = {get_table_key(table_name, dashboard_name): table_name for table_name in table_names}
+    unknown = [str(key) for key in names if key not in table_servers]
+    if len(unknown) > 0:
+        _log_and_abort(f'No handler defined for tables {unknown} for request /subscribe')
+    keepalive = _subscribe_options["keepalive"]
+    max_duration = _subscribe_options["max_duration"]
+
+    def events():
+        known_versions = {key: table_versions.version(key) for key in names}
+        for (key, version) in known_versions.items():
+            yield _change_event(names[key], dashboard_name, version)
+        deadline = time.monotonic() + max_duration
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            changes = table_versions.wait_for_changes(known_versions, min(keepalive, remaining))
+            if len(changes) == 0:
+                yield ': keepalive\n\n'
+            for (key, version) in changes.items():
+                known_versions[key] = version
+                yield _change_event(names[key], dashboard_name, version)
+
+    return Response(events(), mimetype = 'text/event-stream', headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @galyleo_server_blueprint.route('/get_tables')
+@_instrumented('/get_tables')
 def get_tables():
     '''
     Target for the /get_tables route.  Dumps a JSONIfied dictionary of the form:
@@ -392,10 +1003,63 @@ def get_tables():
     result = {}
     items = table_servers.items()
     for item in items:
-        result[item[0]] = item[1].schema
+        result[item[0]] = item[1].schema.to_list()
     return jsonify(result)
 
+@galyleo_server_blueprint.route('/get_column_summary')
+@_instrumented('/get_column_summary')
+def get_column_summary():
+    '''
+    Target for the /get_column_summary route.  Returns the summary of column column_name of
+    the table named in the Table-Name (and, optionally, Dashboard-Name) headers: its number
+    of distinct values, its top_k most frequent values and the values at the comma-separated
+    quantiles, with error bounds (see galyleo_sketches).  The summary is approximate only if
+    the table server was created with sketches = True.  Aborts with a 400 for a missing
+    column_name, a bad table name or column name, or bad top_k or quantiles.
+
+    Arguments:
+        None
+    '''
+    _check_required_parameters('/get_column_summary', {'column_name'})
+    server = _get_table_server('/get_column_summary')
+    column_name = request.args.get('column_name')
+    try:
+        top_k = int(request.args.get('top_k', SUMMARY_TOP_K))
+        quantiles = SUMMARY_QUANTILES
+        if 'quantiles' in request.args:
+            quantiles = [float(q) for q in request.args.get('quantiles').split(',')]
+    except ValueError:
+        _log_and_abort(f'/get_column_summary requires an integer top_k and comma-separated numeric quantiles, not {dict(request.args)}')
+    try:
+        return _json_response(_column_statistic(server, 'column_summary', column_name, top_k, quantiles))
+    except InvalidDataException as error:
+        _log_and_abort(f'Error in get_column_summary for column {column_name}: {error}')
+
+@galyleo_server_blueprint.route('/start')
+def start():
+    '''
+    Target for the /start route.  Ensure that the feed scheduler is running, so that all
+    feeds are being updated, and return its status (see FeedScheduler.status)
+
+    Arguments:
+        None
+    '''
+    start_feeds()
+    return jsonify(feed_scheduler.status())
+
+@galyleo_server_blueprint.route('/get_feed_status')
+def get_feed_status():
+    '''
+    Target for the /get_feed_status route.  Return the status of the feed scheduler and of
+    each refresh job: its last run time, duration and error (see FeedScheduler.status)
+
+    Arguments:
+        None
+    '''
+    return jsonify(feed_scheduler.status())
+
 @galyleo_server_blueprint.route('/get_table_spec')
+@_instrumented('/get_table_spec')
 def get_table_spec():
     '''
     Target for the /get_table_spec route.  Dumps a table_spec, which is a dictionary of the form:
@@ -410,7 +1074,51 @@ def get_table_spec():
 
     '''
     servers = _get_table_servers('/get_numeric_spec')
-    return jsonify({"header_variables": servers[0].header_variables, "schema": servers[0].schema})
+    return _json_response({"header_variables": servers[0].header_variables, "schema": servers[0].schema.to_list()})
+
+@galyleo_server_blueprint.route('/metrics')
+def get_metrics():
+    '''
+    Target for the /metrics route.  Returns the request counts, errors, latencies, row counts and
+    response sizes recorded by the framework and the table servers, in the Prometheus text format
+
+    Arguments:
+        None
+    '''
+    return Response(metrics.render(), content_type = 'text/plain; version=0.0.4; charset=utf-8')
+
+@galyleo_server_blueprint.route('/profiles')
+def list_profiles():
+    '''
+    Target for the /profiles route.  Returns a JSONified list of the metadata of the stored
+    request profiles, newest first (see configure_profiling).  Requires the
+    Galyleo-Profile-Token header; aborts with a 404 if profiling is disabled.
+
+    Arguments:
+        None
+    '''
+    _check_profile_token()
+    return jsonify(_profile_options["store"].list())
+
+@galyleo_server_blueprint.route('/profiles/<name>')
+def get_profile(name):
+    '''
+    Target for the /profiles/<name> route.  Downloads the pstats file of the profile name.
+    Requires the Galyleo-Profile-Token header; aborts with a 404 if profiling is disabled or
+    there is no such profile.
+
+    Arguments:
+        name: name of the profile
+    '''
+    _check_profile_token()
+    store = _profile_options["store"]
+    try:
+        path = store.profile_path(name)
+    except InvalidDataException:
+        abort(404)
+    if store.metadata(name) is None or not os.path.exists(path):
+        abort(404)
+    return send_file(os.path.abspath(path), mimetype = 'application/octet-stream', as_attachment = True, download_name = f'{name}.prof')
 
 @galyleo_server_blueprint.route('/help', methods=['POST', 'GET'])
 @galyleo_server_blueprint.route('/', methods=['POST', 'GET'])
@@ -422,10 +1130,18 @@ def show_routes():
     pages = [
             {"url": "/, /help", "headers": "", "method": "GET", "description": "print this message"},
             {"url": "/get_tables", "method": "GET", "headers": "", "description": 'Dumps a JSONIfied dictionary of the form:{table_name: <table_schema>}, where <table_schema> is a dictionary{"name": name, "type": type}'},
-            {"url": "/get_filtered_rows", "method": "GET", "headers": "Filter-Spec <i>Type Filter Spec, required</i>, Table-Name <i>string, required</i>, Dashboard-Name <i>string, optional</i>", "description": "Get the rows from table Table-Name (and, optionally, Dashboard-Name) which match filter Filter-Spec"},
+            {"url": "/get_filtered_rows", "method": "GET", "headers": "Filter-Spec <i>Type Filter Spec, required</i>, Table-Name <i>string, required</i>, Dashboard-Name <i>string, optional</i>", "description": "Get the rows from table Table-Name (and, optionally, Dashboard-Name) which match filter Filter-Spec.  With the optional headers Max-Points <i>int</i>, Downsample-Method <i>lttb, minmax or reservoir</i>, Downsample-X <i>column name</i> and Downsample-Y <i>column name</i>, at most Max-Points rows, sorted by Downsample-X, are returned.  With the optional headers Row-Offset <i>int</i> and Row-Limit <i>int</i>, only that page of the rows is returned"},
+            {"url": "/get_aggregated_rows", "method": "GET", "headers": "Aggregate-Spec <i>Type Aggregate Spec, required</i>, Filter-Spec <i>Type Filter Spec, optional</i>, Table-Name <i>string, required</i>, Dashboard-Name <i>string, optional</i>", "description": 'Get the rows from table Table-Name (and, optionally, Dashboard-Name) which match filter Filter-Spec, grouped by the columns in the "group_by" list of Aggregate-Spec, with the count, sum, mean, min or max in its "aggregates" list, as a dictionary {"columns", "rows"}'},
             {"url": "/get_numeric_spec?column_name<i>string, required</i>", "method": "GET", "headers": "Table-Name <i>string, optional</i>, Dashboard-Name <i>string, optional</i>", "description": "Get the  minimum, maximum, and increment values for column <i>column_name</i>, returned as a dictionary {min_val, max_val, increment}.  If Table-Name and/or Dashboard-Name is specified, restrict to that Table/Dashboard"},
             {"url": "/get_all_values?column_name<i>string, required</i>", "method": "GET", "headers": "Table-Name <i>string, optional</i>, Dashboard-Name <i>string, optional</i>", "description": "Get all the distinct values for column <i>column_name</i>, returned as a sorted list.  If Table-Name and/or Dashboard-Name is specified, restrict to that Table/Dashboard"},
-            {"url": "/start", "method": "GET", "description": "ensure that all feeds are being updated"},
+            {"url": "/get_column_summary?column_name<i>string, required</i>&top_k<i>int, optional</i>&quantiles<i>comma-separated numbers, optional</i>", "method": "GET", "headers": "Table-Name <i>string, required</i>, Dashboard-Name <i>string, optional</i>", "description": 'Get the number of distinct values, the top_k most frequent values and the quantiles of column <i>column_name</i>, with error bounds, as a dictionary {"exact", "count", "missing", "cardinality", "top_values", "quantiles", "quantile_rank_error"}'},
+            {"url": "/batch", "method": "POST", "headers": "", "description": 'Evaluate a JSON list of requests {"route", "table_name", "dashboard_name", "column_name", "filter_spec"} for the routes /get_filtered_rows, /get_table_spec, /get_numeric_spec and /get_all_values, and return a list of results {"status", "result"} or {"status", "message"}'},
+            {"url": "/subscribe?table_name<i>string, required, repeatable</i>&dashboard_name<i>string, optional</i>", "method": "GET", "headers": "", "description": 'A server-sent event stream with an event {"table_name", "dashboard_name", "version"} each time the data of one of the tables changes'},
+            {"url": "/metrics", "method": "GET", "headers": "", "description": "request counts, errors, latencies, row counts and response sizes, by route and table, in the Prometheus text format"},
+            {"url": "/profiles", "method": "GET", "headers": "Galyleo-Profile-Token <i>string, required</i>", "description": "List the captured request profiles (requests sent with the headers Galyleo-Profile: 1 and Galyleo-Profile-Token), newest first"},
+            {"url": "/profiles/<name>", "method": "GET", "headers": "Galyleo-Profile-Token <i>string, required</i>", "description": "Download the captured profile <i>name</i> as a pstats file"},
+            {"url": "/start", "method": "GET", "headers": "", "description": 'ensure that all feeds are being updated, and return the status of the feeds as for /get_feed_status'},
+            {"url": "/get_feed_status", "method": "GET", "headers": "", "description": 'Get the status of the feed scheduler and its refresh jobs, as a dictionary {"running", "feeds": {name: {"interval", "timeout", "running", "last_run", "last_duration", "last_error", "runs", "failures", "consecutive_failures", "next_run_in"}}}'},
 
         ]
     page_strings = [f'<li>{page}</li>' for page in pages]
@@ -0,0 +1,333 @@
+'''
+A table store in shared memory, so that every worker process of a server can serve the
+same tables without holding its own copy.  A loader process publishes a table with
+SharedTableStore.publish(); each column (and each string dictionary) is placed in its own
+multiprocessing.shared_memory segment, and a small JSON manifest naming the segments is
+written atomically to a directory shared by the processes.  Worker processes create a
+SharedTableServer for the store, which attaches to the segments read-only and serves the
+table from zero-copy NumPy views.  Publishing again creates a new generation of segments
+and swaps the manifest; readers pick up the new generation on their next request, and the
+old generation is unlinked by the publisher (its memory is released when the last reader
+lets go of it).
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import os
+import tempfile
+import threading
+from json import dumps, loads
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy
+
+from galyleo.galyleo_columns import ColumnarDataServer, EncodedColumn, encode_rows
+from galyleo.galyleo_constants import SHARED_ATTACH_ATTEMPTS
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_schema import Schema
+
+
+def _manifest_path(store_name, manifest_directory):
+    '''
+    Internal use only.  The path of the manifest file for store_name
+    '''
+    directory = tempfile.gettempdir() if manifest_directory is None else manifest_directory
+    return os.path.join(directory, f'galyleo_store_{store_name}.json')
+
+def _segment_prefix(store_name):
+    '''
+    Internal use only.  A short prefix for the segment names of store_name.  Some platforms
+    limit shared memory names to 31 characters, so the store name is hashed.
+    '''
+    return 'gy' + hashlib.md5(store_name.encode('utf-8')).hexdigest()[:10]
+
+def _untrack(segment):
+    '''
+    Internal use only.  Stop the multiprocessing resource tracker from unlinking segment when
+    this process exits: the lifetime of a segment is managed by the SharedTableStore
+    '''
+    try:
+        resource_tracker.unregister(segment._name, 'shared_memory')  # pylint: disable=protected-access
+    except (AttributeError, KeyError):
+        pass
+
+def _unlink(segment):
+    '''
+    Internal use only.  Close and unlink segment.  SharedMemory.unlink() unregisters a tracked
+    segment from the resource tracker, so it is registered again first to keep the tracker
+    balanced (see _untrack)
+    '''
+    segment.close()
+    if getattr(segment, '_track', True):
+        resource_tracker.register(segment._name, 'shared_memory')  # pylint: disable=protected-access
+    segment.unlink()
+
+def _attach(name):
+    '''
+    Internal use only.  Attach to an existing shared memory segment
+    '''
+    try:
+        return shared_memory.SharedMemory(name = name, track = False)
+    except TypeError:
+        # Python < 3.13 has no track argument
+        segment = shared_memory.SharedMemory(name = name)
+        _untrack(segment)
+        return segment
+
+def _create(name, size):
+    '''
+    Internal use only.  Create a segment of at least size bytes, replacing a stale segment
+    of the same name left behind by an earlier loader
+    '''
+    try:
+        segment = shared_memory.SharedMemory(name = name, create = True, size = max(1, size))
+    except FileExistsError:
+        _unlink(_attach(name))
+        segment = shared_memory.SharedMemory(name = name, create = True, size = max(1, size))
+    _untrack(segment)
+    return segment
+
+def _manifest_stamp(path):
+    '''
+    Internal use only.  Identify the version of the manifest at path.  The manifest is
+    replaced by renaming a new file over it, so the inode changes on every publish even
+    when the modification times of two publishes are equal
+    '''
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_mtime_ns)
+
+def _read_manifest(path):
+    '''
+    Internal use only.  Read the manifest at path, or return None if there isn't one
+    '''
+    try:
+        with open(path, 'r', encoding = 'utf-8') as manifest_file:
+            return loads(manifest_file.read())
+    except FileNotFoundError:
+        return None
+
+
+class SharedTableStore:
+    '''
+    The publishing side of a shared-memory table.  Create one of these in the loader
+    process and call publish() with the table; call publish() again to refresh the data.
+    The segments stay in shared memory until close() is called, even if the loader exits.
+
+    Arguments:
+        store_name: name of the store; SharedTableServers attach to the store by this name
+        manifest_directory: directory for the manifest, which must be visible to every
+            worker.  Defaults to the system temporary directory
+    '''
+    def __init__(self, store_name, manifest_directory = None):
+        self.store_name = store_name
+        self.manifest_path = _manifest_path(store_name, manifest_directory)
+        self._prefix = _segment_prefix(store_name)
+        self._segments = []
+        self._lock = threading.Lock()
+
+    def _write_segment(self, name, array):
+        '''
+        Internal use only.  Copy array into a new segment and return its manifest entry
+        '''
+        array = numpy.ascontiguousarray(array)
+        segment = _create(name, array.nbytes)
+        view = numpy.ndarray(array.shape, dtype = array.dtype, buffer = segment.buf)
+        view[:] = array
+        del view
+        self._segments.append(segment)
+        return {"segment": name, "dtype": array.dtype.str, "length": len(array)}
+
+    def publish(self, schema, rows):
+        '''
+        Publish a new generation of the table.  The columns are encoded and copied into
+        new segments, the manifest is atomically replaced, and the previous generation's
+        segments are unlinked.
+
+        Arguments:
+            schema: a list of records of the form {"name": <column_name, "type": <column_type>}.
+            rows: list of list of values
+        Returns:
+            the generation number of the published table
+        '''
+        columns = encode_rows(schema, rows)
+        with self._lock:
+            manifest = _read_manifest(self.manifest_path)
+            generation = 0 if manifest is None else manifest["generation"] + 1
+            old_segments = self._segments
+            self._segments = []
+            column_entries = []
+            for i, column in enumerate(columns):
+                entry = {"values": self._write_segment(f'{self._prefix}_{generation}_{i}', column.values)}
+                if column.dictionary is not None:
+                    entry["dictionary"] = self._write_segment(f'{self._prefix}_{generation}_{i}d', column.dictionary)
+                column_entries.append(entry)
+            new_manifest = {"generation": generation, "schema": list(schema), "columns": column_entries}
+            temporary_path = f'{self.manifest_path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'w', encoding = 'utf-8') as manifest_file:
+                manifest_file.write(dumps(new_manifest))
+            os.replace(temporary_path, self.manifest_path)
+            if manifest is not None and len(old_segments) == 0:
+                # The previous generation was published by another loader; unlink it by name
+                old_segments = self._attach_manifest_segments(manifest)
+            for segment in old_segments:
+                _unlink(segment)
+        return generation
+
+    def _attach_manifest_segments(self, manifest):
+        '''
+        Internal use only.  Attach to every segment named in manifest, skipping missing ones
+        '''
+        result = []
+        for entry in manifest["columns"]:
+            for part in entry.values():
+                try:
+                    result.append(_attach(part["segment"]))
+                except FileNotFoundError:
+                    pass
+        return result
+
+    def close(self):
+        '''
+        Remove the table: unlink the current generation's segments and delete the manifest.
+        SharedTableServers which are attached keep their view until they next refresh.
+        '''
+        with self._lock:
+            if os.path.exists(self.manifest_path):
+                os.remove(self.manifest_path)
+            for segment in self._segments:
+                _unlink(segment)
+            self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _Generation:
+    '''
+    Internal use only.  The segments and column views of one generation of a shared table.
+    The views are dropped before the segments are closed, so a generation must outlive any
+    request which uses its columns.
+    '''
+    def __init__(self, manifest, stamp):
+        self.generation = manifest["generation"]
+        self.schema = Schema(manifest["schema"])
+        self.stamp = stamp
+        self.segments = []
+        self.columns = []
+        for i, entry in enumerate(manifest["columns"]):
+            values = self._view(entry["values"])
+            dictionary = self._view(entry["dictionary"]) if "dictionary" in entry else None
+            self.columns.append(EncodedColumn(self.schema.types[i], values, dictionary))
+
+    def _view(self, part):
+        segment = _attach(part["segment"])
+        self.segments.append(segment)
+        view = numpy.ndarray((part["length"],), dtype = numpy.dtype(part["dtype"]), buffer = segment.buf)
+        view.flags.writeable = False
+        return view
+
+    def __del__(self):
+        self.columns = None
+        for segment in self.segments:
+            try:
+                segment.close()
+            except BufferError:
+                # a caller still holds a view; the segment is released when it is collected
+                pass
+
+
+class SharedTableServer(ColumnarDataServer):
+    '''
+    A GalyleoDataServer for a table published to a SharedTableStore.  Each request checks
+    whether a new generation has been published (a single stat of the manifest) and if so
+    attaches to it; the table data itself is never copied into the worker.
+
+    Arguments:
+        store_name: name of the SharedTableStore
+        manifest_directory: directory of the manifest, as given to the SharedTableStore
+        header_variables: as for GalyleoDataServer
+    '''
+    def __init__(self, store_name, manifest_directory = None, header_variables = None):
+        self.manifest_path = _manifest_path(store_name, manifest_directory)
+        self._lock = threading.Lock()
+        self._generation = None
+        generation = self._current_generation()
+        super().__init__(generation.schema, generation.columns, header_variables)
+
+    def _current_generation(self):
+        '''
+        Internal use only.  Return the current generation, attaching to a new one if the
+        manifest has been replaced since the last request
+        '''
+        try:
+            stamp = _manifest_stamp(self.manifest_path)
+        except FileNotFoundError as original_error:
+            if self._generation is not None:
+                return self._generation
+            raise InvalidDataException(f'No shared table has been published at {self.manifest_path}') from original_error
+        generation = self._generation
+        if generation is not None and generation.stamp == stamp:
+            return generation
+        with self._lock:
+            for _ in range(SHARED_ATTACH_ATTEMPTS):
+                if self._generation is not None and self._generation.stamp == stamp:
+                    return self._generation
+                manifest = _read_manifest(self.manifest_path)
+                if manifest is None:
+                    break
+                try:
+                    self._generation = _Generation(manifest, stamp)
+                    self.schema = self._generation.schema
+                    return self._generation
+                except FileNotFoundError:
+                    # A loader published again between reading the manifest and attaching,
+                    # and unlinked the segments it names: read the new manifest
+                    try:
+                        stamp = _manifest_stamp(self.manifest_path)
+                    except FileNotFoundError:
+                        break
+            else:
+                if self._generation is not None:
+                    return self._generation
+                raise InvalidDataException(f'The shared table at {self.manifest_path} was republished while attaching to it {SHARED_ATTACH_ATTEMPTS} times')
+            if self._generation is not None:
+                return self._generation
+            raise InvalidDataException(f'No shared table has been published at {self.manifest_path}')
+
+    def generation(self):
+        '''
+        Return the number of the generation currently being served
+        '''
+        return self._current_generation().generation
+
+    def columns(self):
+        '''
+        Return the EncodedColumns of the current generation
+        '''
+        return self._current_generation().columns
@@ -0,0 +1,373 @@
+'''
+Approximate column sketches.  A TableSketch keeps, for each column of a table, a HyperLogLog
+sketch of the number of distinct values, a SpaceSaving sketch of the most frequent values
+and, for number, date, datetime and timeofday columns, a KLL sketch of the quantiles.  Each
+sketch is updated one value at a time in constant memory, so it can be maintained as rows
+arrive and summarized in time independent of the number of rows.  column_summary computes
+the same summary exactly, from all of the values; it is the default.  counts_summary computes
+it exactly from a Counter of the values, for callers which maintain one.
+
+A summary is a dictionary:
+    {
+        "exact": True if the summary was computed from all of the values,
+        "count": number of values which are not missing (None or NaN),
+        "missing": number of missing values,
+        "cardinality": {"estimate": number of distinct values, "relative_error": standard error of the estimate},
+        "top_values": list of {"value", "count", "max_error"}, most frequent first; the true count is
+            between count - max_error and count,
+        "quantiles": list of {"q", "value"}; empty for string and boolean columns,
+        "quantile_rank_error": bound on |true rank of value - q| as a fraction of count
+    }
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import math
+import random
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+
+from galyleo.galyleo_constants import GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_NUMBER, GALYLEO_TIME_OF_DAY
+from galyleo.galyleo_constants import SKETCH_HEAVY_HITTERS, SKETCH_HLL_PRECISION, SKETCH_KLL_K
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_schema import as_schema
+
+QUANTILE_TYPES = {GALYLEO_NUMBER, GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY}
+'''
+The column types which have quantiles
+'''
+
+
+def _is_missing(value):
+    '''
+    Internal use only.  True if value is None or NaN
+    '''
+    return value is None or (isinstance(value, float) and value != value)
+
+def _hash64(value):
+    '''
+    Internal use only.  A 64-bit hash of value which is the same in every process
+    '''
+    return int.from_bytes(hashlib.blake2b(repr(value).encode('utf-8'), digest_size = 8).digest(), 'big')
+
+
+class HyperLogLog:
+    '''
+    A HyperLogLog sketch of the number of distinct values added to it.  The standard error
+    of the estimate is 1.04 / sqrt(2 ** precision); the sketch holds 2 ** precision bytes.
+
+    Arguments:
+        precision: the number of bits of the hash which select a register (4 to 16)
+    '''
+    def __init__(self, precision = SKETCH_HLL_PRECISION):
+        if not 4 <= precision <= 16:
+            raise InvalidDataException(f'HyperLogLog precision must be between 4 and 16, not {precision}')
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        '''
+        Add value to the sketch
+        '''
+        hashed = _hash64(value)
+        remaining_bits = 64 - self.precision
+        index = hashed >> remaining_bits
+        rank = remaining_bits - (hashed & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        '''
+        Merge other, a HyperLogLog of the same precision, into this sketch
+        '''
+        if other.precision != self.precision:
+            raise InvalidDataException(f'Cannot merge HyperLogLogs of precision {self.precision} and {other.precision}')
+        self.registers = bytearray(max(pair) for pair in zip(self.registers, other.registers))
+
+    @property
+    def relative_error(self):
+        '''
+        The standard error of estimate(), as a fraction of the true count
+        '''
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self):
+        '''
+        Return the estimated number of distinct values added
+        '''
+        num_registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / num_registers)
+        raw = alpha * num_registers * num_registers / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * num_registers and zeros > 0:
+            return int(round(num_registers * math.log(num_registers / zeros)))
+        return int(round(raw))
+
+
+class SpaceSaving:
+    '''
+    A SpaceSaving sketch of the most frequent values added to it.  It counts at most capacity
+    values; every value which makes up more than 1 / capacity of the values added is counted.
+    A reported count overestimates the true count by at most the entry's max_error.
+
+    Arguments:
+        capacity: the number of values counted
+    '''
+    def __init__(self, capacity = SKETCH_HEAVY_HITTERS):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, value, count = 1):
+        '''
+        Add count occurrences of value to the sketch
+        '''
+        if value in self.counts:
+            self.counts[value] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = count
+            self.errors[value] = 0
+        else:
+            # replace the least frequent value, which value may have been all along
+            evicted = min(self.counts, key = self.counts.get)
+            floor = self.counts.pop(evicted)
+            del self.errors[evicted]
+            self.counts[value] = floor + count
+            self.errors[value] = floor
+
+    def top(self, k):
+        '''
+        Return the k most frequent values, as a list of (value, count, max_error), most frequent first
+        '''
+        ranked = sorted(self.counts.items(), key = lambda item: -item[1])[:k]
+        return [(value, count, self.errors[value]) for (value, count) in ranked]
+
+
+class KLLSketch:
+    '''
+    A KLL sketch of the distribution of the values added to it, which must be mutually
+    comparable.  The sketch keeps O(k) values: a hierarchy of compactors, where a value in
+    compactor h stands for 2 ** h values.  When a compactor is full it is sorted and every
+    other value (from a random offset) is promoted to the next compactor.  The rank of a
+    quantile is within about rank_error of q, with high probability.
+
+    Arguments:
+        k: the size of the largest compactor
+        seed: seed for the choice of offsets, so that results are repeatable
+    '''
+    def __init__(self, k = SKETCH_KLL_K, seed = 0):
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self._random = random.Random(seed)
+
+    @property
+    def rank_error(self):
+        '''
+        The bound on the normalized rank error of quantile(), for a single quantile at
+        99% confidence
+        '''
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level):
+        '''
+        Internal use only.  The capacity of compactor level; lower compactors are smaller
+        '''
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def add(self, value):
+        '''
+        Add value to the sketch
+        '''
+        self.compactors[0].append(value)
+        self.count += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self):
+        '''
+        Internal use only.  Compact each full compactor, from the bottom up
+        '''
+        level = 0
+        while level < len(self.compactors):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items = sorted(self.compactors[level])
+                kept = [items.pop()] if len(items) % 2 == 1 else []
+                self.compactors[level + 1].extend(items[self._random.randint(0, 1)::2])
+                self.compactors[level] = kept
+            level += 1
+
+    def quantile(self, q):
+        '''
+        Return the approximate q-quantile (0 <= q <= 1) of the values added: the value whose
+        rank is q * count.  Returns None if no values have been added
+        '''
+        weighted = sorted((value, 1 << level) for (level, compactor) in enumerate(self.compactors) for value in compactor)
+        if len(weighted) == 0:
+            return None
+        total = sum(weight for (_, weight) in weighted)
+        target = q * total
+        cumulative = 0
+        for (value, weight) in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+
+def _quantile_list(quantiles, function):
+    '''
+    Internal use only.  [{"q", "value"}] for each q in quantiles
+    '''
+    return [{"q": q, "value": function(q)} for q in quantiles]
+
+def _check_quantiles(quantiles):
+    '''
+    Internal use only.  Raise an InvalidDataException unless every q in quantiles is in [0, 1]
+    '''
+    bad = [q for q in quantiles if not (isinstance(q, (int, float)) and 0 <= q <= 1)]
+    if len(bad) > 0:
+        raise InvalidDataException(f'Quantiles must be numbers between 0 and 1, not {bad}')
+
+def column_summary(galyleo_type, values, top_k, quantiles):
+    '''
+    Compute the summary (see the module documentation) of a column exactly
+
+    Arguments:
+        galyleo_type: the type of the column
+        values: the list of the values of the column
+        top_k: the number of top values to return
+        quantiles: the list of quantiles to return
+    Returns:
+        the summary
+    '''
+    present = [value for value in values if not _is_missing(value)]
+    return counts_summary(galyleo_type, Counter(present), len(values) - len(present), top_k, quantiles)
+
+def counts_summary(galyleo_type, counts, missing, top_k, quantiles):
+    '''
+    Compute the summary (see the module documentation) of a column exactly, from the counts
+    of its values
+
+    Arguments:
+        galyleo_type: the type of the column
+        counts: a Counter of the values of the column which are not missing
+        missing: the number of missing values
+        top_k: the number of top values to return
+        quantiles: the list of quantiles to return
+    Returns:
+        the summary
+    '''
+    _check_quantiles(quantiles)
+    total = sum(counts.values())
+    result = {
+        "exact": True,
+        "count": total,
+        "missing": missing,
+        "cardinality": {"estimate": len(counts), "relative_error": 0.0},
+        "top_values": [{"value": value, "count": count, "max_error": 0} for (value, count) in counts.most_common(top_k)],
+        "quantiles": [],
+        "quantile_rank_error": 0.0
+    }
+    if galyleo_type in QUANTILE_TYPES and total > 0:
+        ordered = sorted(counts)
+        cumulative = list(accumulate(counts[value] for value in ordered))
+        def rank(q):
+            return ordered[bisect_left(cumulative, max(1, int(math.ceil(q * total))))]
+        result["quantiles"] = _quantile_list(quantiles, rank)
+    return result
+
+
+class TableSketch:
+    '''
+    Sketches of each column of a table, maintained as rows are added with update().
+
+    Arguments:
+        schema: the schema of the table
+        heavy_hitters: the capacity of each SpaceSaving sketch
+        precision: the precision of each HyperLogLog sketch
+        k: the k of each KLL sketch
+    '''
+    def __init__(self, schema, heavy_hitters = SKETCH_HEAVY_HITTERS, precision = SKETCH_HLL_PRECISION, k = SKETCH_KLL_K):
+        self.schema = as_schema(schema)
+        self.rows = 0
+        self._missing = [0] * len(self.schema)
+        self._distinct = [HyperLogLog(precision) for _ in self.schema.types]
+        self._frequent = [SpaceSaving(heavy_hitters) for _ in self.schema.types]
+        self._quantiles = [KLLSketch(k, seed = i) if galyleo_type in QUANTILE_TYPES else None for (i, galyleo_type) in enumerate(self.schema.types)]
+
+    def update(self, rows):
+        '''
+        Add rows, a list of lists of values in schema order, to the sketches
+        '''
+        for i in range(len(self.schema)):
+            self.update_column(i, [row[i] for row in rows])
+        self.rows += len(rows)
+
+    def update_column(self, index, values):
+        '''
+        Add the values of the column at index to its sketches.  Used by update(); callers
+        which add columns directly must also add the number of rows to self.rows
+        '''
+        (distinct, frequent, quantiles) = (self._distinct[index], self._frequent[index], self._quantiles[index])
+        for value in values:
+            if _is_missing(value):
+                self._missing[index] += 1
+                continue
+            distinct.add(value)
+            frequent.add(value)
+            if quantiles is not None:
+                quantiles.add(value)
+
+    def summary(self, column_name, top_k, quantiles):
+        '''
+        Return the approximate summary (see the module documentation) of column_name
+
+        Arguments:
+            column_name: the name of the column
+            top_k: the number of top values to return (at most the heavy_hitters capacity are known)
+            quantiles: the list of quantiles to return
+        '''
+        _check_quantiles(quantiles)
+        try:
+            index = self.schema.index(column_name)
+        except ValueError as original_error:
+            raise InvalidDataException(f'{column_name} is not a column of this table') from original_error
+        distinct = self._distinct[index]
+        sketch = self._quantiles[index]
+        return {
+            "exact": False,
+            "count": self.rows - self._missing[index],
+            "missing": self._missing[index],
+            "cardinality": {"estimate": distinct.estimate(), "relative_error": distinct.relative_error},
+            "top_values": [{"value": value, "count": count, "max_error": error} for (value, count, error) in self._frequent[index].top(top_k)],
+            "quantiles": [] if sketch is None or sketch.count == 0 else _quantile_list(quantiles, sketch.quantile),
+            "quantile_rank_error": 0.0 if sketch is None else sketch.rank_error
+        }
@@ -0,0 +1,447 @@
+'''
+A GalyleoDataServer for a table held in an SQLite database (through the standard library
+sqlite3 module).  Filter specs are compiled into parameterized SQL WHERE clauses (see
+filter_to_sql), and all_values, numeric_spec, aggregation and paging are also done by the
+database, so only the rows which are returned ever enter Python and a table need not fit
+in memory.
+
+Values are stored with these column types:
+    number: NUMERIC (NaN is stored as NULL)
+    string: TEXT
+    boolean: INTEGER (0 or 1)
+    date, datetime, timeofday: TEXT, as the ISO string datetime.isoformat() gives, so that
+        the strings sort in time order.  Datetimes with a time zone are stored in UTC.
+
+SQLiteDataServer.from_rows creates a table of this form, with an index on each column.  An
+existing table can be served if its values have these forms.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time as time_of_day, timezone
+from galyleo.galyleo_aggregation import check_valid_aggregate_spec, result_schema
+from galyleo.galyleo_constants import GALYLEO_BOOLEAN, GALYLEO_NUMBER, GALYLEO_STRING
+from galyleo.galyleo_constants import GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY, SQLITE_POOL_SIZE
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_metrics import metrics
+from galyleo.galyleo_table_server import GalyleoDataServer, check_range_bounds
+
+SQL_TYPES = {
+    GALYLEO_NUMBER: 'NUMERIC',
+    GALYLEO_STRING: 'TEXT',
+    GALYLEO_BOOLEAN: 'INTEGER',
+    GALYLEO_DATE: 'TEXT',
+    GALYLEO_DATETIME: 'TEXT',
+    GALYLEO_TIME_OF_DAY: 'TEXT'
+}
+
+_TEMPORAL_TYPES = {GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY}
+
+_SQL_AGGREGATES = {'count': 'COUNT(*)', 'sum': 'COALESCE(SUM({column}), 0)', 'mean': 'AVG({column})', 'min': 'MIN({column})', 'max': 'MAX({column})'}
+
+
+def quote_identifier(name):
+    '''
+    Quote name for use as an SQL table or column name
+    '''
+    return '"' + name.replace('"', '""') + '"'
+
+def _canonical_temporal(galyleo_type, value):
+    '''
+    Internal use only.  Convert value (an ISO string, or a date, datetime or time) to the
+    ISO string stored for a column of type galyleo_type; None, NaN, '' and 'NaT' are None.
+    Raises an InvalidDataException if value can't be parsed
+    '''
+    if value is None or (isinstance(value, float) and value != value) or value in {'', 'NaT'}:
+        return None
+    try:
+        if galyleo_type == GALYLEO_TIME_OF_DAY:
+            parsed = value if isinstance(value, time_of_day) else time_of_day.fromisoformat(str(value).strip())
+            return parsed.replace(tzinfo = None).isoformat()
+        if isinstance(value, datetime):
+            parsed = value
+        elif isinstance(value, date):
+            parsed = datetime(value.year, value.month, value.day)
+        else:
+            parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError as original_error:
+        raise InvalidDataException(f'Bad {galyleo_type} value: {value}') from original_error
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo = None)
+    return parsed.date().isoformat() if galyleo_type == GALYLEO_DATE else parsed.isoformat()
+
+def _to_sql_value(galyleo_type, value):
+    '''
+    Internal use only.  Convert value, from a row of a table, to the value stored for a
+    column of type galyleo_type
+    '''
+    if galyleo_type in _TEMPORAL_TYPES:
+        return _canonical_temporal(galyleo_type, value)
+    if galyleo_type == GALYLEO_BOOLEAN and value is not None:
+        return int(bool(value))
+    return value
+
+def _list_values(galyleo_type, value_list):
+    '''
+    Internal use only.  The values of an IN_LIST filter on a column of type galyleo_type
+    which can match a value of the column, as stored.  As in Filter, a string never matches
+    a number, and the values for a temporal column are ISO strings
+    '''
+    if galyleo_type in _TEMPORAL_TYPES:
+        return [_canonical_temporal(galyleo_type, value) for value in value_list if isinstance(value, str)]
+    if galyleo_type == GALYLEO_STRING:
+        return [value for value in value_list if isinstance(value, str)]
+    return [value for value in value_list if isinstance(value, (int, float))]
+
+def filter_to_sql(filter_spec, schema):
+    '''
+    Compile a filter spec to the condition of an SQL WHERE clause, with the semantics of
+    galyleo_table_server.Filter: a NULL never passes IN_LIST or IN_RANGE, and is
+    excluded by NONE.  Every condition evaluates to 0 or 1, never NULL.  The filter spec
+    should have been checked by check_valid_spec.  Raises an InvalidDataException for a
+    column which isn't in schema.
+
+    Arguments:
+        filter_spec: Specification of the filter, as a dictionary
+        schema: the Schema of the table
+    Returns:
+        a pair (condition, parameters), where parameters is the list of values for the ?
+        placeholders in condition
+    '''
+    operator = filter_spec["operator"]
+    if operator in {'ALL', 'ANY', 'NONE'}:
+        compiled = [filter_to_sql(argument, schema) for argument in filter_spec["arguments"]]
+        parameters = [parameter for (_, argument_parameters) in compiled for parameter in argument_parameters]
+        conditions = [f'({condition})' for (condition, _) in compiled]
+        if operator == 'ALL':
+            return (' AND '.join(conditions) if len(conditions) > 0 else '1'), parameters
+        any_condition = ' OR '.join(conditions) if len(conditions) > 0 else '0'
+        return (any_condition if operator == 'ANY' else f'NOT ({any_condition})'), parameters
+    column = filter_spec["column"]
+    galyleo_type = schema.type_of(column)
+    if galyleo_type is None:
+        raise InvalidDataException(f'{column} is not a valid column')
+    name = quote_identifier(column)
+    if operator == 'IN_LIST':
+        values = _list_values(galyleo_type, filter_spec["values"])
+        if len(values) == 0:
+            return '0', []
+        placeholders = ', '.join(['?'] * len(values))
+        return f'{name} IS NOT NULL AND {name} IN ({placeholders})', values
+    bounds = [filter_spec["min_val"], filter_spec["max_val"]]
+    check_range_bounds(galyleo_type, *bounds)
+    if galyleo_type in _TEMPORAL_TYPES:
+        bounds = [_canonical_temporal(galyleo_type, bound) for bound in bounds]
+    return f'{name} IS NOT NULL AND {name} >= ? AND {name} <= ?', bounds
+
+
+class SQLiteDataServer(GalyleoDataServer):
+    '''
+    A GalyleoDataServer for table table_name of the SQLite database database (see the module
+    documentation).  Each query checks a connection out of a small pool and returns it when
+    done; at most pool_size idle connections are kept open, and close() closes them all.
+    Rows are returned in rowid order.
+
+    Arguments:
+        schema: a list of records of the form {"name": <column_name, "type": <column_type>}.
+            The names are the names of the columns of the SQL table
+        database: the path to the database file, or ':memory:' for a database held in
+            memory (shared by the connections of this server, and dropped by close())
+        table_name: the name of the SQL table
+        header_variables: as for GalyleoDataServer
+        sketches: as for GalyleoDataServer; the sketches are rebuilt after insert_rows()
+        pool_size: the number of idle connections kept for later queries.  Default SQLITE_POOL_SIZE
+    '''
+    def __init__(self, schema, database, table_name, header_variables = None, sketches = False, pool_size = SQLITE_POOL_SIZE):
+        super().__init__(schema, self._all_rows, header_variables, sketches = sketches)
+        if database == ':memory:':
+            # a named shared-cache memory database, kept alive by _keeper until close()
+            self.database = f'file:galyleo_{id(self)}?mode=memory&cache=shared'
+            self._uri = True
+        else:
+            self.database = database
+            self._uri = False
+        self.table_name = table_name
+        self.pool_size = pool_size
+        self._idle = []
+        self._pool_lock = threading.Lock()
+        self._closed = False
+        self._generation = object()
+        # the memory database lives as long as one connection to it is open; _keeper is
+        # that connection, held outside the pool so that it is never closed before close()
+        self._keeper = self._open() if self._uri else None
+
+    @classmethod
+    def from_rows(cls, schema, rows, database = ':memory:', table_name = 'galyleo_table', header_variables = None):
+        '''
+        Create table table_name of database, with an index on each column, insert rows, and
+        return a SQLiteDataServer for it.  Raises an InvalidDataException if the table exists
+
+        Arguments:
+            schema: a list of records of the form {"name": <column_name, "type": <column_type>}.
+            rows: list of list of values
+            database: as for SQLiteDataServer.  Default ':memory:'
+            table_name: as for SQLiteDataServer.  Default 'galyleo_table'
+            header_variables: as for GalyleoDataServer
+        '''
+        server = cls(schema, database, table_name, header_variables)
+        columns = [f'{quote_identifier(name)} {SQL_TYPES[galyleo_type]}' for (name, galyleo_type) in zip(server.schema.names, server.schema.types)]
+        try:
+            with server._connection() as connection, connection:
+                connection.execute(f'CREATE TABLE {quote_identifier(table_name)} ({", ".join(columns)})')
+        except sqlite3.OperationalError as original_error:
+            server.close()
+            raise InvalidDataException(f'Cannot create table {table_name}: {original_error}') from original_error
+        server.create_indexes()
+        server.insert_rows(rows)
+        return server
+
+    def _open(self):
+        '''
+        Internal use only.  Open a new connection to the database
+        '''
+        return sqlite3.connect(self.database, uri = self._uri, check_same_thread = False)
+
+    @contextmanager
+    def _connection(self):
+        '''
+        Internal use only.  Check an idle connection out of the pool (opening one if there is
+        none) for the body of a with statement, then return it to the pool, or close it if the
+        pool already holds pool_size connections or the server has been closed
+        '''
+        with self._pool_lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._open()
+        try:
+            yield connection
+        finally:
+            with self._pool_lock:
+                keep = not self._closed and len(self._idle) < self.pool_size
+                if keep:
+                    self._idle.append(connection)
+            if not keep:
+                connection.close()
+
+    def _query(self, sql, parameters = ()):
+        '''
+        Internal use only.  Run the query sql with parameters and return the list of result rows
+        '''
+        try:
+            with self._connection() as connection:
+                return connection.execute(sql, parameters).fetchall()
+        except sqlite3.Error as original_error:
+            raise InvalidDataException(f'Error querying {self.table_name}: {original_error}') from original_error
+
+    def close(self):
+        '''
+        Close all the connections.  A server held in memory loses its data
+        '''
+        with self._pool_lock:
+            self._closed = True
+            connections = self._idle
+            self._idle = []
+        if self._keeper is not None:
+            connections.append(self._keeper)
+            self._keeper = None
+        for connection in connections:
+            connection.close()
+
+    def create_indexes(self, column_names = None):
+        '''
+        Create an index (if there isn't one) on each of the columns column_names
+
+        Arguments:
+            column_names: the columns to index.  If None (the default), every column
+        '''
+        column_names = self.schema.names if column_names is None else column_names
+        with self._connection() as connection, connection:
+            for name in column_names:
+                index_name = quote_identifier(f'galyleo_{self.table_name}_{name}')
+                connection.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {quote_identifier(self.table_name)} ({quote_identifier(name)})')
+
+    def insert_rows(self, rows):
+        '''
+        Append rows to the table
+
+        Arguments:
+            rows: list of list of values, in schema order
+        '''
+        types = self.schema.types
+        placeholders = ', '.join(['?'] * len(types))
+        with self._connection() as connection, connection:
+            connection.executemany(f'INSERT INTO {quote_identifier(self.table_name)} VALUES ({placeholders})',
+                                   ([_to_sql_value(galyleo_type, value) for (galyleo_type, value) in zip(types, row)] for row in rows))
+        self._generation = object()
+
+    def _select(self, columns = None):
+        '''
+        Internal use only.  The SELECT ... FROM clause for columns (default all the columns)
+        '''
+        columns = self.schema.names if columns is None else columns
+        return f'SELECT {", ".join(quote_identifier(name) for name in columns)} FROM {quote_identifier(self.table_name)}'
+
+    def _from_sql(self, rows, types = None):
+        '''
+        Internal use only.  Convert rows read from the database to Galyleo values
+        '''
+        types = self.schema.types if types is None else types
+        booleans = [i for i in range(len(types)) if types[i] == GALYLEO_BOOLEAN]
+        result = [list(row) for row in rows]
+        if len(booleans) > 0:
+            for row in result:
+                for i in booleans:
+                    row[i] = None if row[i] is None else bool(row[i])
+        return result
+
+    def _all_rows(self):
+        return self._from_sql(self._query(f'{self._select()} ORDER BY rowid'))
+
+    def _source_version(self):
+        return self._generation
+
+    def _column_source(self):
+        # _source_column queries the database, so there is no data to pass it
+        return None
+
+    def _source_column(self, source, index):
+        values = self._query(f'{self._select([self.schema.names[index]])} ORDER BY rowid')
+        return [row[0] for row in self._from_sql(values, [self.schema.types[index]])]
+
+    def _column_type(self, column_name):
+        '''
+        Internal use only.  Return the type of column_name, raising an InvalidDataException
+        if there is no such column
+        '''
+        column_type = self.schema.type_of(column_name)
+        if column_type is None:
+            raise InvalidDataException(f'{column_name} is not a column of this table')
+        return column_type
+
+    def all_values(self, column_name:str):
+        '''
+        get all the values from column_name
+        Arguments:
+
+            column_name: name of the column to get the values for
+
+        Returns:
+            Sorted list of the distinct values; missing (NULL) values are omitted
+
+        '''
+        column_type = self._column_type(column_name)
+        name = quote_identifier(column_name)
+        values = self._query(f'SELECT DISTINCT {name} FROM {quote_identifier(self.table_name)} WHERE {name} IS NOT NULL ORDER BY {name}')
+        return [row[0] for row in self._from_sql(values, [column_type])]
+
+    def numeric_spec(self, column_name:str):
+        '''
+        get the dictionary {min_val, max_val, increment} for column_name
+        Arguments:
+
+            column_name: name of the column to get the numeric spec for
+
+        Returns:
+            the minimum, maximum, and increment of the column
+
+        '''
+        column_type = self._column_type(column_name)
+        if column_type != GALYLEO_NUMBER:
+            raise InvalidDataException(f'The type of {column_name} must be {GALYLEO_NUMBER}, not {column_type}')
+        name = quote_identifier(column_name)
+        distinct = f'SELECT DISTINCT {name} AS value FROM {quote_identifier(self.table_name)} WHERE {name} IS NOT NULL'
+        steps = f'SELECT value, value - LAG(value) OVER (ORDER BY value) AS step FROM ({distinct})'
+        (min_val, max_val, increment) = self._query(f'SELECT MIN(value), MAX(value), MIN(step) FROM ({steps})')[0]
+        if increment is None:
+            raise InvalidDataException(f'Bad data in column {column_name}')
+        return {"max_val": max_val, "min_val": min_val, "increment": increment}
+
+    def _where(self, filter_spec):
+        '''
+        Internal use only.  The WHERE clause and its parameters for filter_spec (None for all rows)
+        '''
+        if filter_spec is None:
+            return '', []
+        (condition, parameters) = filter_to_sql(filter_spec, self.schema)
+        return f' WHERE {condition}', parameters
+
+    def get_filtered_rows(self, filter_spec, workers = None):
+        '''
+        Filter the rows according to the specification given by filter_spec.
+        Returns the rows for which the resulting filter returns True.
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary
+            workers: ignored; the database evaluates the filter
+        Returns:
+            The rows which pass the filter
+        '''
+        return self.get_rows_page(filter_spec)
+
+    def get_rows_page(self, filter_spec, offset = 0, limit = None):
+        '''
+        Return the rows which pass filter_spec (all rows if filter_spec is None), skipping
+        the first offset and returning at most limit (all, if limit is None)
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary, or None
+            offset: the number of rows to skip.  Default 0
+            limit: the maximum number of rows to return.  Default None (no limit)
+        Returns:
+            The rows
+        '''
+        (where, parameters) = self._where(filter_spec)
+        page = ''
+        if limit is not None or offset > 0:
+            page = ' LIMIT ? OFFSET ?'
+            parameters = parameters + [-1 if limit is None else limit, offset]
+        with metrics.timer('galyleo_filter_seconds', {"table": self.table_label}):
+            return self._from_sql(self._query(f'{self._select()}{where} ORDER BY rowid{page}', parameters))
+
+    def get_aggregated_rows(self, filter_spec, aggregate_spec):
+        '''
+        Filter the rows according to filter_spec, then group and aggregate them according
+        to aggregate_spec (see galyleo_aggregation), in a single GROUP BY query.
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary, or None for all rows
+            aggregate_spec: Specification of the aggregation, as a dictionary
+        Returns:
+            {"columns": the schema of the result, "rows": the aggregated rows}
+        '''
+        (group_indices, aggregates) = check_valid_aggregate_spec(aggregate_spec, self.schema)
+        groups = [quote_identifier(self.schema.names[i]) for i in group_indices]
+        selected = groups + [_SQL_AGGREGATES[operator].format(column = None if index is None else quote_identifier(self.schema.names[index])) for (_, operator, index) in aggregates]
+        (where, parameters) = self._where(filter_spec)
+        sql = f'SELECT {", ".join(selected)} FROM {quote_identifier(self.table_name)}{where}'
+        if len(groups) > 0:
+            sql += f' GROUP BY {", ".join(groups)} ORDER BY MIN(rowid)'
+        with metrics.timer('galyleo_aggregate_seconds', {"table": self.table_label}):
+            rows = self._query(sql, parameters)
+        columns = result_schema(self.schema, group_indices, aggregates)
+        return {"columns": columns, "rows": self._from_sql(rows, [column["type"] for column in columns])}
@@ -32,14 +32,17 @@
 The GalyleoTable and RemoteGalyleoTable classes
 '''
 
-from json import JSONDecodeError, dumps, loads
-
-import gviz_api
-import numpy
+import codecs
+from collections import Counter
+from json import JSONDecodeError, JSONDecoder, dumps, loads
 
 from galyleo.galyleo_constants import (GALYLEO_BOOLEAN, GALYLEO_NUMBER,
-                                       GALYLEO_STRING)
+                                       GALYLEO_STRING, PARALLEL_MIN_ROWS,
+                                       COLUMNAR_BLOCK_SIZE, JSON_BATCH_ROWS,
+                                       JSON_READ_SIZE)
 from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_parallel import chunk_ranges, parallel_map
+from galyleo.galyleo_schema import as_schema
 
 # import pandas as pd
 
@@ -67,6 +70,18 @@ class GalyleoTable:
         self.schema = []
         self.data = []
 
+    @property
+    def schema(self):
+        """
+        The Schema of the table.  May be set from a Schema or from a list of records of the
+        form {"name": <column name>, "type": <column type>}
+        """
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema):
+        self._schema = as_schema(schema)
+
     def equal(self, table, names_must_match = False):
         """
         Test to see if this table is equal to another table, passed as
@@ -83,13 +98,10 @@ class GalyleoTable:
            True if equal, False otherwise
 
         """
-        if len(self.schema) != len(table.schema):
+        if self.schema != table.schema:
             return False
         if len(self.data) != len(table.data):
             return False
-        for i, column in enumerate(self.schema):
-            if column != table.schema[i]:
-                return False
         for i, element in enumerate(self.data):
             if element != table.data[i]:
                 return False
@@ -135,6 +147,7 @@ class GalyleoTable:
 
         '''
 
+        import gviz_api  # pylint: disable=import-outside-toplevel
         for row in data:
             if len(row) != len(schema):
                 raise InvalidDataException(f"All rows must have length {len(schema)}")
@@ -182,6 +195,7 @@ class GalyleoTable:
     #
 
     def _match_type(self, dtype):
+        import numpy  # pylint: disable=import-outside-toplevel
         type_map = {
             GALYLEO_BOOLEAN: [numpy.bool_],
             GALYLEO_NUMBER:[ numpy.byte, numpy.ubyte, numpy.short, numpy.ushort, numpy.intc, numpy.uintc, numpy.int_,
@@ -240,7 +254,7 @@ class GalyleoTable:
             {"name": <table_name>, "table": {"columns": <list of schema records], "rows": [<list of rows of the table>]}}
 
         """
-        return {"name": self.name, "table": {"columns": self.schema, "rows": self.data}}
+        return {"name": self.name, "table": {"columns": self.schema.to_list(), "rows": self.data}}
 
 
     def load_from_dictionary(self, table_as_dictionary):
@@ -328,7 +342,127 @@ class GalyleoTable:
         if overwrite_name:
             self.name = record["name"]
 
-    def aggregate_by(self, aggregate_column_names, new_column_name = "count", new_table_name = None):
+    def from_json_stream(self, stream, overwrite_name = True, batch_rows = JSON_BATCH_ROWS):
+        """
+        Load the table from a file or stream holding the JSON form produced by to_json(),
+        without reading the whole text into memory.  The rows are parsed incrementally and
+        validated against the columns batch_rows at a time, so the memory used is about
+        the size of the table plus one batch.  (If the rows come before the columns in
+        the JSON, they are held until the columns are seen.)  Note that if the
+        overwrite_name parameter = True (the default), this will also overwrite the table
+        name.  The table is unchanged if an exception is thrown.
+
+        Args:
+            stream: a path, or a text or binary file-like object (UTF-8 if binary)
+            overwrite_name: if True (the default), set the name of this table to the name in the JSON
+            batch_rows: the number of rows validated at a time
+
+        Throws:
+            InvalidDataException if the JSON is malformed or the rows don't match the columns
+
+        """
+        if isinstance(stream, str):
+            with open(stream, 'rb') as json_file:
+                self.from_json_stream(json_file, overwrite_name, batch_rows)
+            return
+        reader = _JSONStreamReader(stream)
+        name = None
+        columns = None
+        rows = []
+        pending = []
+        found = set()
+
+        def check_batch(batch):
+            schema = [(record["name"], record["type"]) for record in columns]
+            self.check_schema_match(schema, batch)
+            rows.extend(batch)
+
+        for key in reader.object_keys('JSON form of table'):
+            found.add(key)
+            if key == 'name':
+                name = reader.read_value()
+            elif key != 'table':
+                reader.read_value()
+            else:
+                table_fields = set()
+                for table_key in reader.object_keys('JSON  table descriptor'):
+                    table_fields.add(table_key)
+                    if table_key == 'columns':
+                        columns = reader.read_value()
+                        if not isinstance(columns, list):
+                            raise InvalidDataException(f'columns must be a list, not {type(columns)}')
+                        for column in columns:
+                            self._check_fields(column, {"name", "type"}, "Column description")
+                        if len(pending) > 0:
+                            check_batch(pending)
+                            pending = []
+                    elif table_key == 'rows':
+                        batch = []
+                        for row in reader.array_values('rows'):
+                            batch.append(row)
+                            if len(batch) == batch_rows:
+                                if columns is None:
+                                    pending.extend(batch)
+                                else:
+                                    check_batch(batch)
+                                batch = []
+                        if columns is None:
+                            pending.extend(batch)
+                        elif len(batch) > 0:
+                            check_batch(batch)
+                    else:
+                        reader.read_value()
+                missing = {"columns", "rows"} - table_fields
+                if len(missing) > 0:
+                    raise InvalidDataException(f'JSON  table descriptor is missing fields {missing}')
+        reader.expect_end()
+        missing = {"name", "table"} - found
+        if len(missing) > 0:
+            raise InvalidDataException(f'JSON form of table is missing fields {missing}')
+        self.schema = columns
+        self.data = rows
+        if overwrite_name:
+            self.name = name
+
+    def to_columnar(self, path, block_size = COLUMNAR_BLOCK_SIZE):
+        """
+        Save the table in the on-disk columnar format (see galyleo_columnar_file) in the
+        directory path.  The saved table can be served without loading it with a
+        galyleo_columnar_file.ColumnarFileDataServer, or read back with from_columnar.
+
+        Args:
+            path: the directory to save the table in
+            block_size: the number of rows in each zone-map block
+
+        """
+        from galyleo.galyleo_columnar_file import write_columnar_table  # pylint: disable=import-outside-toplevel
+        write_columnar_table(path, self.name, self.schema, self.data, block_size)
+
+    def from_columnar(self, path, overwrite_name = True):
+        """
+        Load the table from a directory written by to_columnar.  Note
+        that if the overwrite_name parameter = True (the default), this will also
+        overwrite the table name.
+
+        Args:
+            path: the directory holding the table
+            overwrite_name: if True (the default), set the name of this table to the saved name
+
+        Throws:
+            InvalidDataException if the directory does not hold a valid columnar table
+
+        """
+        from galyleo.galyleo_columnar_file import ColumnarFileDataServer  # pylint: disable=import-outside-toplevel
+        from galyleo.galyleo_temporal import is_temporal, temporal_objects  # pylint: disable=import-outside-toplevel
+        server = ColumnarFileDataServer(path)
+        # the server serves temporal values as ISO strings; the table holds date, datetime and time objects
+        values = [temporal_objects(column.galyleo_type, column.values) if is_temporal(column.galyleo_type) else column.decode() for column in server.columns()]
+        self.schema = server.schema
+        self.data = [list(row) for row in zip(*values)]
+        if overwrite_name:
+            self.name = server.name
+
+    def aggregate_by(self, aggregate_column_names, new_column_name = "count", new_table_name = None, workers = 1, min_rows = PARALLEL_MIN_ROWS):
         """
         Create a new table by aggregating over multiple columns.  The resulting table
         contains the aggregate column names and the new column name, and for each
@@ -341,6 +475,8 @@ class GalyleoTable:
             aggregate_column_names: names of the  columns to aggregate over
             new_column_name: name of the column for the aggregate count.  Defaults to count
             new_table_name: name of the new table.  If omitted, defaults to None, in which case a name will be generated
+            workers: number of worker processes used to compute the counts.  Defaults to 1 (no parallelism)
+            min_rows: minimum number of rows for which the counts are computed in parallel
 
         Returns:
             A new table with name new_table_name, or a generated name if new_table_name == None
@@ -362,28 +498,24 @@ class GalyleoTable:
         if new_table_name is  None:
             new_table_name = 'aggregate_' + ''.join([name[0] for name in aggregate_column_names])
         # Collect the indices of the requested columns
-        indices = [i  for i in range(len(self.schema)) if self.schema[i]["name"] in column_names]
-        # Collect the columns for each row, making each short_row a tuple so they can be
-        # indexed in a set
+        indices = [i  for i in range(len(self.schema)) if self.schema.names[i] in column_names]
+        # Count the number of instances of each unique combination of values.  For a
+        # large table with workers > 1, each worker counts a chunk of rows and the
+        # partial counts are summed
         simple_keys = len(indices) == 1
-        if simple_keys:
-            short_rows = [row[indices[0]] for row in self.data]
+        if workers > 1 and len(self.data) >= min_rows:
+            ranges = chunk_ranges(len(self.data), workers)
+            arguments = [(self.data[start:end], indices) for (start, end) in ranges]
+            count = Counter()
+            for partial_count in parallel_map(_count_keys, arguments, workers):
+                count.update(partial_count)
         else:
-            short_rows = [tuple([row[i] for i in indices]) for row in self.data]
-        keys = set(short_rows)
-        # Now that we have the unique keys, count the number of instances of each
-        count = {}
-        for key in keys:
-            count[key] = 0
-        for key in short_rows:
-            count[key] = count[key] + 1
-        # convert the keys from tuples to lists, add the count for each one, and
-        # filter out the 0's
+            count = _count_keys(self.data, indices)
+        # convert the keys from tuples to lists and add the count for each one
         data = []
-        for key in keys:
+        for key, key_count in count.items():
             key_as_list = [key] if simple_keys else list(key)
-            data.append(key_as_list + [count[key]])
-        data = [row for row in data if row[-1] > 0]
+            data.append(key_as_list + [key_count])
         # The schema is just the requested columns + new_column_name, and the type
         # of new_column_name is a number.  Then create the result table, load in the
         # schema and data, and quit.
@@ -421,13 +553,13 @@ class GalyleoTable:
             raise InvalidDataException('new_table_name cannot be empty')
         if not column_name:
             raise InvalidDataException('column_name cannot be empty')
-        indices = [i for i in range(len(self.schema)) if self.schema[i]["name"] == column_name]
-        if len(indices) == 0:
-            raise InvalidDataException(f'Column {column_name} not found in schema')
-        index = indices[0]
+        try:
+            index = self.schema.index(column_name)
+        except ValueError as original_error:
+            raise InvalidDataException(f'Column {column_name} not found in schema') from original_error
         if column_types:
-            if not self.schema[index]["type"] in column_types:
-                raise InvalidDataException(f'Type {self.schema[index]["type"]} not found in {column_types}')
+            if not self.schema.types[index] in column_types:
+                raise InvalidDataException(f'Type {self.schema.types[index]} not found in {column_types}')
         data = [row[:index] + row[index+1:] for row in self.data if function(row[index])]
         schema = self.schema[:index] + self.schema[index+1:]
         result = GalyleoTable(new_table_name)
@@ -494,10 +626,10 @@ class GalyleoTable:
     #
 
     def _get_column_index(self, column_name):
-        indices = [i for i in range(len(self.schema)) if self.schema[i]["name"] == column_name]
-        if len(indices) == 0:
-            raise InvalidDataException(f'Column {column_name} is not in the schema')
-        return indices[0]
+        try:
+            return self.schema.index(column_name)
+        except ValueError as original_error:
+            raise InvalidDataException(f'Column {column_name} is not in the schema') from original_error
 
     def pivot_on_column(self, pivot_column_name, value_column_name, new_table_name, pivot_column_values = None, other_column = False):
         '''
@@ -573,7 +705,7 @@ class GalyleoTable:
 
         pivot_value_set = pivot_value_set.intersection(pivot_column_values)
 
-        value_column_type = self.schema[value_column_index]["type"]
+        value_column_type = self.schema.types[value_column_index]
 
         def new_pivot_record():
             initial_value = 0 if value_column_type == GALYLEO_NUMBER else None
@@ -618,13 +750,139 @@ class GalyleoTable:
 
 
 
+class _JSONStreamReader:
+    '''
+    Internal use only.  An incremental reader for JSON text from a stream, used by
+    GalyleoTable.from_json_stream.  It walks the outer structure of a document (objects
+    and arrays) token by token, and decodes the values inside with json.JSONDecoder, so
+    that only a small window of the text is held in memory at a time.
+    '''
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = ''
+        self.position = 0
+        self.at_end = False
+        self.decoder = JSONDecoder()
+        self.byte_decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def _fill(self):
+        '''
+        Read more text into the buffer, discarding what has been consumed.  Returns False at end of stream
+        '''
+        if self.at_end:
+            return False
+        chunk = self.stream.read(JSON_READ_SIZE)
+        if isinstance(chunk, bytes):
+            chunk = self.byte_decoder.decode(chunk, final = len(chunk) == 0)
+        if len(chunk) == 0:
+            self.at_end = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def _peek(self):
+        '''
+        Skip whitespace and return the next character, or '' at end of stream
+        '''
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\n\r':
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ''
+
+    def _expect(self, characters, context):
+        character = self._peek()
+        if character == '' or character not in characters:
+            raise InvalidDataException(f'Error found in JSON Decode: expected one of {characters!r} in {context}, found {character!r}')
+        self.position += 1
+        return character
+
+    def read_value(self):
+        '''
+        Read and return the next complete JSON value
+        '''
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or not self._fill():
+                    self.position = end
+                    return value
+            except JSONDecodeError as error:
+                if not self._fill():
+                    raise InvalidDataException('Error found in JSON Decode') from error
+
+    def object_keys(self, context):
+        '''
+        Iterate over the keys of the object which comes next.  The caller must read
+        the value of each key before asking for the next one
+        '''
+        self._expect('{', context)
+        if self._peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise InvalidDataException(f'Error found in JSON Decode: {context} has a key which is not a string')
+            self._expect(':', context)
+            yield key
+            if self._expect(',}', context) == '}':
+                return
+
+    def array_values(self, context):
+        '''
+        Iterate over the values of the array which comes next
+        '''
+        if self._peek() != '[':
+            raise InvalidDataException(f'{context} must be a list')
+        self.position += 1
+        if self._peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            if self._expect(',]', context) == ']':
+                return
+
+    def expect_end(self):
+        '''
+        Check that there is nothing but whitespace left in the stream
+        '''
+        if self._peek() != '':
+            raise InvalidDataException('Error found in JSON Decode: extra data after the table')
+
+
+def _count_keys(rows, indices):
+    '''
+    Internal use only.  Count the number of rows with each unique combination of values
+    in the columns at indices.  The key is the value itself for a single column, and a
+    tuple of values otherwise.  This is a module-level function so that it can be sent
+    to worker processes by GalyleoTable.aggregate_by
+
+    Arguments:
+        rows: the rows to count
+        indices: the indices of the aggregate columns
+    Returns:
+        a Counter from key to the number of rows with that key
+    '''
+    if len(indices) == 1:
+        index = indices[0]
+        return Counter(row[index] for row in rows)
+    return Counter(tuple([row[i] for i in indices]) for row in rows)
+
+
 class RemoteGalyleoTable:
     '''
     A Remote Galyleo Table: This is instantiated with an URL which tells the
     dashboard where to get the data.  Note that this is much simpler than an explicit
     GalyleoTable, since the data manipulation is all done by the remote server.
     '''
-    def __init__(self, name:str, schema, base_url:str, interval:int = -1, header_variables = None):
+    def __init__(self, name:str, schema, base_url:str, interval:int = -1, header_variables = None, push:bool = False):
         '''
         Initialize with the name, the schema (same as for an explicit table, above),
         the base_url, and the header_variables which are used for authemtication
@@ -636,15 +894,18 @@ class RemoteGalyleoTable:
             interval: a positive integer, indicating how often (in seconds) to query the table.  If omitted or <= 0, the table is only queried when
                     a refresh is requested through a UI action
             header_variables: a list of strings: header variables which are to be transmitted to the data server for authentication
+            push: if True, the server supports the /subscribe route, and the dashboard should refresh the table when
+                    the server announces a change rather than (or, if interval > 0, as well as) polling
 
         '''
         if header_variables is None:
             header_variables = []
         self.name = name
-        self.schema = schema
+        self.schema = as_schema(schema)
         self.base_url = base_url
         self.interval = interval
         self.header_variables = header_variables
+        self.push = push
         self.data = [] # for compatibility with GalyleoTable -- so that client checks for data will be OK
 
     def as_dictionary(self):
@@ -653,7 +914,11 @@ class RemoteGalyleoTable:
         of the form:
         {"name": <table_name>,"table": <table_struct>}
         where table_struct is of the form:
-        {"columns": [<list of schema records], "base_url": base_url, "header_variables": list of header variables}
+        {"columns": [<list of schema records], "connector": <connector>}
+        where connector is of the form:
+        {"url": base_url, "header_variables": list of header variables, "interval": interval,
+         "push": {"protocol": "sse", "url": <subscription url>}}
+        and header_variables, interval and push are present only if used
 
         A schema record is a record of the form:
         {"name": < column_name>, "type": <column_type}, where type is one of the
@@ -665,7 +930,7 @@ class RemoteGalyleoTable:
             None
 
         Returns:
-            {"name": <table_name>, "table": {"columns": <list of schema records], "base_url": base_url, "header_variables": list of header variables}}
+            {"name": <table_name>, "table": {"columns": <list of schema records], "connector": <connector>}}
 
         """
         connector = {"url": self.base_url}
@@ -673,10 +938,12 @@ class RemoteGalyleoTable:
             connector['header_variables'] = self.header_variables
         if self.interval > 0:
             connector["interval"] = self.interval
+        if self.push:
+            connector["push"] = {"protocol": "sse", "url": self.base_url.rstrip('/') + '/subscribe'}
         return {
             "name": self.name,
             "table": {
-                "columns": self.schema,
+                "columns": self.schema.to_list(),
                 "connector": connector
             }
         }
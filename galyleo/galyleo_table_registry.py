@@ -0,0 +1,218 @@
+'''
+The registry of table servers used by galyleo_server_framework.  Servers are registered
+under a table name and, optionally, a dashboard name.  Besides the map from table key to
+server, the registry maintains a dashboard index (dashboard name -> servers for that
+dashboard) and an inverted column index ((dashboard name or None, column name) ->
+[(server, column type)]), both updated when a server is added, so that requests which
+search many tables for a column don't scan every registered table or every schema.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+
+from galyleo.galyleo_exceptions import InvalidDataException
+
+
+def get_table_key(table_name, dashboard_name = None):
+    '''
+    The table key for a server (the dictionary key that finds the server) is either the
+    pair (dashboard_name, table_name) if dashboard_name is not None, or table_name if
+    dashboard_name is None.
+    Parameters:
+        table_name: name of the table
+        dashboard_name: name of the dashboard
+    Returns:
+        (dashboard_name, table_name) if dashboard_name is not None, table_name otherwise
+    Raises:
+        InvalidDataException if table_name is None
+    '''
+    if table_name is None:
+        raise  InvalidDataException('table_name must be supplied')
+    return table_name if dashboard_name is None else (dashboard_name, table_name)
+
+
+class TableRegistry:
+    '''
+    A registry of table servers, indexed by table key, by dashboard and by column name.
+    The column index is built from each server's schema when it is added; a server whose
+    schema changes should be added again.  Like the dictionary it replaces, it can also be
+    indexed by table key (see get_table_key): registry[key] = server adds the server, and
+    del registry[key] removes it.  All methods are thread-safe.
+    '''
+    def __init__(self):
+        self._servers = {}
+        self._dashboards = {}
+        self._columns = {}
+        # id(server) -> the keys of server, in the order it was registered at them (as dict
+        # keys).  The registry holds each server, so its id is not reused while it is indexed
+        self._keys_by_server = {}
+        self._lock = threading.Lock()
+
+    def _index_entries(self, key, server):
+        '''
+        Internal use only.  The (scope, column_name) column-index keys for server at key.  Every
+        server is in scope None (all tables); a dashboard's server is also in its dashboard's scope
+        '''
+        scopes = [None] if not isinstance(key, tuple) else [None, key[0]]
+        return [((scope, column["name"]), column["type"]) for scope in scopes for column in server.schema]
+
+    def _remove(self, key):
+        '''
+        Internal use only.  Remove the server at key from the indices.  Caller holds the lock
+        '''
+        server = self._servers.pop(key, None)
+        if server is None:
+            return
+        keys = self._keys_by_server[id(server)]
+        keys.pop(key, None)
+        if len(keys) == 0:
+            del self._keys_by_server[id(server)]
+        if isinstance(key, tuple):
+            dashboard = self._dashboards.get(key[0], {})
+            dashboard.pop(key[1], None)
+            if len(dashboard) == 0:
+                self._dashboards.pop(key[0], None)
+        for (index_key, _) in self._index_entries(key, server):
+            entries = self._columns.get(index_key)
+            if entries is not None:
+                entries.pop(key, None)
+                if len(entries) == 0:
+                    del self._columns[index_key]
+
+    def add(self, table_name, server, dashboard_name = None):
+        '''
+        Register server for table_name (and dashboard_name, if not None), replacing
+        any server already registered there
+
+        Arguments:
+            table_name: name of the table
+            server: the GalyleoDataServer
+            dashboard_name: name of the dashboard (optional)
+        '''
+        key = get_table_key(table_name, dashboard_name)
+        with self._lock:
+            self._remove(key)
+            self._servers[key] = server
+            self._keys_by_server.setdefault(id(server), {})[key] = None
+            if dashboard_name is not None:
+                self._dashboards.setdefault(dashboard_name, {})[table_name] = server
+            for (index_key, column_type) in self._index_entries(key, server):
+                self._columns.setdefault(index_key, {})[key] = (server, column_type)
+
+    def remove(self, table_name, dashboard_name = None):
+        '''
+        Remove the server for table_name (and dashboard_name, if not None), if there is one
+
+        Arguments:
+            table_name: name of the table
+            dashboard_name: name of the dashboard (optional)
+        '''
+        with self._lock:
+            self._remove(get_table_key(table_name, dashboard_name))
+
+    def get(self, table_name, dashboard_name = None):
+        '''
+        Return the server for table_name (and dashboard_name, if not None).  Raises a
+        KeyError if there is none
+
+        Arguments:
+            table_name: name of the table
+            dashboard_name: name of the dashboard (optional)
+        '''
+        return self._servers[get_table_key(table_name, dashboard_name)]
+
+    def tables(self, dashboard_name = None):
+        '''
+        Return the servers for dashboard_name, or every server if dashboard_name is None
+
+        Arguments:
+            dashboard_name: name of the dashboard (optional)
+        '''
+        with self._lock:
+            if dashboard_name is None:
+                return list(self._servers.values())
+            return list(self._dashboards.get(dashboard_name, {}).values())
+
+    def num_tables(self, dashboard_name = None):
+        '''
+        Return the number of servers for dashboard_name, or of all servers if dashboard_name is None
+
+        Arguments:
+            dashboard_name: name of the dashboard (optional)
+        '''
+        if dashboard_name is None:
+            return len(self._servers)
+        return len(self._dashboards.get(dashboard_name, {}))
+
+    def servers_with_column(self, column_name, dashboard_name = None):
+        '''
+        Return the servers which have a column named column_name, restricted to the tables
+        of dashboard_name if it is not None
+
+        Arguments:
+            column_name: name of the column
+            dashboard_name: name of the dashboard (optional)
+        Returns:
+            a list of pairs (server, type of the column in that server)
+        '''
+        with self._lock:
+            return list(self._columns.get((dashboard_name, column_name), {}).values())
+
+    def items(self):
+        '''
+        Return a list of the pairs (table key, server)
+        '''
+        with self._lock:
+            return list(self._servers.items())
+
+    def keys_of(self, server):
+        '''
+        Return the table keys at which server is currently registered
+
+        Arguments:
+            server: the GalyleoDataServer
+        '''
+        with self._lock:
+            return list(self._keys_by_server.get(id(server), ()))
+
+    def __getitem__(self, key):
+        return self._servers[key]
+
+    def __setitem__(self, key, server):
+        (dashboard_name, table_name) = key if isinstance(key, tuple) else (None, key)
+        self.add(table_name, server, dashboard_name)
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self._servers:
+                raise KeyError(key)
+            self._remove(key)
+
+    def __contains__(self, key):
+        return key in self._servers
+
+    def __len__(self):
+        return len(self._servers)
@@ -31,10 +31,22 @@ the tables automatically using the instantiated GalyleoDataServer.
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date, time as time_of_day
 from functools import reduce
 from math import nan
-from galyleo.galyleo_constants import GALYLEO_NUMBER, GALYLEO_STRING, GALYLEO_BOOLEAN
+from galyleo.galyleo_aggregation import aggregate_rows, check_valid_aggregate_spec, result_schema
+from galyleo.galyleo_constants import GALYLEO_NUMBER, GALYLEO_STRING, GALYLEO_BOOLEAN, PARALLEL_MIN_ROWS
+from galyleo.galyleo_constants import GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY
+from galyleo.galyleo_constants import SNAPSHOT_MAX_BACKOFF, SUMMARY_QUANTILES, SUMMARY_TOP_K
 from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_metrics import metrics
+from galyleo.galyleo_parallel import chunk_ranges, parallel_map
+from galyleo.galyleo_schema import Schema, as_schema
+from galyleo.galyleo_sketches import TableSketch, column_summary
 
 def check_valid_spec(filter_spec):
     '''
@@ -100,12 +112,36 @@ def check_valid_spec(filter_spec):
             msg = f'The Values argument to IN_LIST must be a list, not {values_type}'
             raise InvalidDataException(msg)
     else:
-        # For IN_RANGE, make sure max_val and min_val are numbers
+        # For IN_RANGE, make sure max_val and min_val are both numbers or both ISO strings
+        # (for date, datetime and timeofday columns)
         for field in ['max_val', 'min_val']:
-            if (not type(filter_spec[field]) in {int, float} ):
+            if isinstance(filter_spec[field], str):
+                from galyleo.galyleo_temporal import is_iso_temporal  # pylint: disable=import-outside-toplevel
+                if not is_iso_temporal(filter_spec[field]):
+                    msg = f'The {field} for IN_RANGE must be a number or an ISO date, datetime or time, not {filter_spec[field]}'
+                    raise InvalidDataException(msg)
+            elif (not type(filter_spec[field]) in {int, float} ):
                 bad_type = type(filter_spec[field])
                 msg = f'The type of {field} for IN_RANGE must be a number, not {bad_type}'
                 raise InvalidDataException(msg)
+        if isinstance(filter_spec['max_val'], str) != isinstance(filter_spec['min_val'], str):
+            raise InvalidDataException('The max_val and min_val for IN_RANGE must both be numbers or both be ISO strings')
+
+def check_range_bounds(galyleo_type, min_val, max_val):
+    '''
+    Check that the IN_RANGE bounds min_val and max_val can be compared with the values of a
+    column of type galyleo_type: string, date, datetime and timeofday columns need string
+    bounds (ISO strings, for the temporal types; see check_valid_spec), and number and
+    boolean columns need numeric bounds.  Raises an InvalidDataException if they can't
+
+    Arguments:
+        galyleo_type: the type of the column
+        min_val: the lower bound
+        max_val: the upper bound
+    '''
+    string_type = galyleo_type in {GALYLEO_STRING, GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY}
+    if not all(isinstance(bound, str) == string_type for bound in (min_val, max_val)):
+        raise InvalidDataException(f'IN_RANGE bounds {min_val} and {max_val} cannot be compared with a {galyleo_type} column')
 
 
 class Filter:
@@ -119,12 +155,17 @@ class Filter:
     This is designed to be instantiated from VirtualGalyleoTable.get_filtered_rows()
     and in no other place -- error checking, if any, should be done there.
 
+    When columns is a Schema, values in date, datetime and timeofday columns are compared
+    as times (see galyleo_temporal) rather than as strings, and IN_RANGE bounds for them are
+    ISO strings.
+
     Arguments:
         filter_spec: a Specification of the filter as a dictionary.
-        columns: the names of the columns (names alone, not types)
+        columns: the Schema of the table, or the names of the columns (names alone, not types)
     '''
     def __init__(self, filter_spec, columns):
         self.operator = filter_spec["operator"]
+        self.temporal_type = None
         if (self.operator == 'ALL' or self.operator == 'ANY' or self.operator == 'NONE'):
             self.arguments = [Filter(argument, columns) for argument in filter_spec["arguments"]]
         elif self.operator == 'IN_LIST':
@@ -133,6 +174,9 @@ class Filter:
             except ValueError as original_error:
                 raise InvalidDataException(f'{filter_spec["column"]} is not a valid column')  from original_error
             self.value_list = filter_spec['values']
+            self._set_temporal_type(columns)
+            if self.temporal_type is not None:
+                self.value_list = self._parse_temporal([value for value in self.value_list if isinstance(value, str)])
         else: # operator is IN_RANGE
             try:
                 self.column = columns.index(filter_spec["column"])
@@ -140,22 +184,71 @@ class Filter:
                 raise InvalidDataException(f'{filter_spec["column"]} is not a valid column') from  original_error
             self.max_val = filter_spec['max_val']
             self.min_val = filter_spec['min_val']
+            if isinstance(columns, Schema):
+                check_range_bounds(columns.types[self.column], self.min_val, self.max_val)
+            self._set_temporal_type(columns)
+            if self.temporal_type is not None:
+                (self.min_val, self.max_val) = self._parse_temporal([self.min_val, self.max_val])
 
-    def filter(self, rows):
+    def _set_temporal_type(self, columns):
+        '''
+        Internal use only.  If columns is a Schema and the type of self.column is a temporal
+        type, set self.temporal_type to it
+        '''
+        if isinstance(columns, Schema) and columns.types[self.column] in {GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY}:
+            self.temporal_type = columns.types[self.column]
+
+    def _parse_temporal(self, values):
+        '''
+        Internal use only.  Parse values to an array of self.temporal_type
+        '''
+        # galyleo_temporal needs numpy, which tables without temporal columns never import
+        from galyleo.galyleo_temporal import parse_temporal  # pylint: disable=import-outside-toplevel
+        return parse_temporal(self.temporal_type, values)
+
+    def filter(self, rows, workers = 1, min_rows = PARALLEL_MIN_ROWS):
         '''
         Filter the rows according to the specification given to the constructor.
-        Returns the rows for which the filter returns True.
+        Returns the rows for which the filter returns True.  If workers > 1 and there
+        are at least min_rows rows, the rows are split into chunks which are filtered
+        in parallel (see parallel_filter_index)
 
         Arguments:
             rows: list of list of values, in the same order as the columns
+            workers: number of worker processes to use.  Default 1 (no parallelism)
+            min_rows: minimum number of rows for which parallel evaluation is used
         Returns:
             subset of the rows, which pass the filter
         '''
         # Just an overlay on filter_index, which returns the INDICES of the rows
         # which pass the filter.  This is the top-level call, filter_index is recursive
-        indices = self.filter_index(rows)
+        if workers > 1 and len(rows) >= min_rows:
+            indices = self.parallel_filter_index(rows, workers)
+        else:
+            indices = self.filter_index(rows)
         return [rows[i] for i in range(len(rows)) if i in indices]
 
+    def parallel_filter_index(self, rows, workers, use_processes = True):
+        '''
+        Not designed for external call.
+        Split the rows into one contiguous chunk per worker, compute filter_index
+        on each chunk in parallel, and merge the results.  Since the filter is
+        evaluated row by row in Python, processes are used by default.
+
+        Arguments:
+            rows: list of list of values, in the same order as the columns
+            workers: number of workers
+            use_processes: if True (the default) use worker processes, otherwise threads
+        Returns:
+            INDICES of the rows which pass the filter, AS A SET
+        '''
+        ranges = chunk_ranges(len(rows), workers)
+        arguments = [(self, rows[start:end], start) for (start, end) in ranges]
+        result = set()
+        for indices in parallel_map(_filter_chunk_index, arguments, workers, use_processes):
+            result |= indices
+        return result
+
     def filter_index(self, rows):
         '''
         Not designed for external call.
@@ -179,6 +272,15 @@ class Filter:
         elif self.operator == 'NONE':
             argument_indices = [argument.filter_index(rows) for argument in self.arguments]
             return reduce(lambda x, y: x - y, argument_indices, set(all_indices))
+        elif self.temporal_type is not None:
+            # parse the whole column at once and compare the arrays
+            import numpy  # pylint: disable=import-outside-toplevel
+            values = self._parse_temporal([row[self.column] for row in rows])
+            if self.operator == 'IN_LIST':
+                mask = numpy.isin(values, self.value_list)
+            else:
+                mask = (values >= self.min_val) & (values <= self.max_val)
+            return set(numpy.flatnonzero(mask).tolist())
         elif self.operator == 'IN_LIST':
             values = [row[self.column] for row in rows]
             return set([i for i in all_indices if values[i] in self.value_list])
@@ -186,10 +288,25 @@ class Filter:
             values = [row[self.column] for row in rows]
             return set([i for i in all_indices if values[i] <= self.max_val and values[i] >= self.min_val])
 
+def _filter_chunk_index(row_filter, rows, offset):
+    '''
+    Compute row_filter.filter_index on a chunk of rows which starts at row offset
+    of the table, and return the indices relative to the start of the table.  This
+    is a module-level function so that it can be sent to worker processes.
+
+    Arguments:
+        row_filter: the Filter to apply
+        rows: the chunk of rows
+        offset: the index of the first row of the chunk in the table
+    Returns:
+        the set of table indices of the rows in the chunk which pass the filter
+    '''
+    return {i + offset for i in row_filter.filter_index(rows)}
+
 def _convert_to_type(galyleo_type, value):
     '''
-    Convert value to galyleo_type, so that comparisons can be done.  Currently only works for string, number, and boolean.
-    We will add date and time later.
+    Convert value to galyleo_type, so that comparisons can be done.  Dates, datetimes and times
+    of day are converted to ISO strings.
     Returns a default value if value can't be converted
     Note that it's the responsibility of the object which provides the rows to always provide the correct types,
     so this really should always just return value
@@ -219,12 +336,15 @@ def _convert_to_type(galyleo_type, value):
         if isinstance(value, str):
             return value == 'True'
         return False
+    if galyleo_type in {GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY}:
+        if isinstance(value, (date, time_of_day)):
+            return value.isoformat()
+        return value if value is None or isinstance(value, str) else str(value)
     return value
 
 def _convert_list_to_type(galyleo_type, value_list):
     '''
-    Convert value_list to galyleo_type, so that comparisons can be done.  Currently only works for lists of string, number, and boolean.
-    We will add date and time later.
+    Convert value_list to galyleo_type, so that comparisons can be done (see _convert_to_type).
     Returns a default value if value can't be converted
     Note that it's the responsibility of the object which provides the rows to always provide the correct types,
     so this really should always just return a new copy of value_list
@@ -236,6 +356,194 @@ def _convert_list_to_type(galyleo_type, value_list):
     '''
     return [_convert_to_type(galyleo_type, elem) for elem in value_list]
 
+class SingleFlight:
+    '''
+    A wrapper around a function of no arguments (typically a get_rows() function) which
+    coalesces concurrent calls: while one call is running, other callers wait for it and
+    share its result (or its exception) rather than calling the function again.  If
+    reuse_window > 0, a result is also returned to callers for reuse_window seconds after
+    it was computed.  Callers share the result, so they must not modify it.
+
+    Arguments:
+        function: the function to wrap
+        reuse_window: time, in seconds, for which a result is reused.  Default 0 (no reuse)
+    '''
+    def __init__(self, function, reuse_window = 0):
+        self.function = function
+        self.reuse_window = reuse_window
+        self._lock = threading.Lock()
+        self._in_flight = None
+        self._result = None
+        self._result_time = None
+        self._version = object()
+
+    def __call__(self):
+        with self._lock:
+            if self._result_time is not None and time.monotonic() - self._result_time < self.reuse_window:
+                return self._result
+            future = self._in_flight
+            leader = future is None
+            if leader:
+                future = self._in_flight = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = self.function()
+        except BaseException as error:
+            with self._lock:
+                self._in_flight = None
+            future.set_exception(error)
+            raise
+        with self._lock:
+            self._in_flight = None
+            if self.reuse_window > 0:
+                self._result = result
+                self._result_time = time.monotonic()
+                self._version = object()
+        future.set_result(result)
+        return result
+
+    def version(self):
+        '''
+        Return a token which is replaced each time a new result is kept for reuse, or None if
+        there is no result to reuse (it has expired, or reuse_window is 0): the next call may
+        then return new data
+        '''
+        with self._lock:
+            if self._result_time is not None and time.monotonic() - self._result_time < self.reuse_window:
+                return self._version
+            return None
+
+    def clear(self):
+        '''
+        Drop the reusable result, so that the next call runs the function.  A call already
+        in flight is not affected
+        '''
+        with self._lock:
+            self._result = None
+            self._result_time = None
+
+
+class SnapshotRows:
+    '''
+    A stale-while-revalidate wrapper around a slow get_rows() function.  Calls return the
+    last snapshot of the rows immediately; a background thread replaces the snapshot every
+    refresh_interval seconds (typically the interval of the RemoteGalyleoTable which shows the
+    table).  Only the first call, which has no snapshot to return, waits for the function.
+    If a refresh fails, the old snapshot is kept and the refresh is retried after
+    refresh_interval seconds, doubling on each consecutive failure up to max_backoff seconds.
+    Callers share the snapshot, so they must not modify it.  Functions registered with
+    add_listener are called when a refresh returns rows different from the old snapshot.
+
+    Arguments:
+        function: the function to wrap
+        refresh_interval: time, in seconds, between refreshes of the snapshot
+        max_backoff: maximum time, in seconds, between refresh attempts after failures
+    '''
+    def __init__(self, function, refresh_interval, max_backoff = SNAPSHOT_MAX_BACKOFF):
+        if refresh_interval <= 0:
+            raise InvalidDataException(f'refresh_interval must be positive, not {refresh_interval}')
+        self.function = function
+        self.refresh_interval = refresh_interval
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self._fetch = SingleFlight(function)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._rows = None
+        self._snapshot_time = None
+        self._retry_time = 0
+        self._listeners = []
+        self._version = object()
+
+    def __call__(self):
+        if self._snapshot_time is None:
+            rows = self._refresh()
+            self._start()
+            return rows
+        return self._rows
+
+    def age(self):
+        '''
+        Return the age of the snapshot in seconds, or None if no snapshot has been taken
+        '''
+        snapshot_time = self._snapshot_time
+        return None if snapshot_time is None else time.monotonic() - snapshot_time
+
+    def version(self):
+        '''
+        Return a token which is replaced each time a refresh may have changed the snapshot
+        '''
+        return self._version
+
+    def add_listener(self, listener):
+        '''
+        Register a function of no arguments, to be called (from the refresh thread) each time
+        a refresh changes the rows
+
+        Arguments:
+            listener: the function to call
+        '''
+        with self._lock:
+            self._listeners.append(listener)
+
+    def stop(self):
+        '''
+        Stop the background refresh.  Calls continue to return the last snapshot
+        '''
+        self._stopped = True
+        self._wake.set()
+
+    def _refresh(self):
+        '''
+        Internal use only.  Call the function and make its result the snapshot
+        '''
+        rows = self._fetch()
+        with self._lock:
+            changed = self._snapshot_time is not None and rows != self._rows
+            if rows is self._rows or rows != self._rows:
+                # the same list may have been modified in place, so it is a new version too
+                self._version = object()
+            self._rows = rows
+            self._snapshot_time = time.monotonic()
+            self.failures = 0
+            self._retry_time = 0
+            listeners = self._listeners[:] if changed else []
+        for listener in listeners:
+            listener()
+        return rows
+
+    def _start(self):
+        '''
+        Internal use only.  Start the refresh thread, if it isn't running
+        '''
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target = self._run, name = 'galyleo_snapshot', daemon = True)
+                self._thread.start()
+
+    def _run(self):
+        '''
+        Internal use only.  The refresh loop run by the background thread
+        '''
+        while not self._stopped:
+            with self._lock:
+                due = max(self._snapshot_time + self.refresh_interval, self._retry_time)
+            delay = due - time.monotonic()
+            if delay > 0 and self._wake.wait(delay):
+                continue
+            try:
+                self._refresh()
+            except Exception as error: # pylint: disable=broad-except
+                with self._lock:
+                    self.failures += 1
+                    backoff = min(self.max_backoff, self.refresh_interval * 2 ** (self.failures - 1))
+                    self._retry_time = time.monotonic() + backoff
+                logging.warning(f'Refresh of table snapshot failed ({error}); retrying in {backoff} seconds')
+
+
 DEFAULT_HEADER_VARIABLES = {"required": [], "optional": []}
 '''
 The Default for header variables for a table is both required and optional lists are empty.
@@ -256,11 +564,68 @@ class GalyleoDataServer:
             both of which are lists of strings (variable names).  Either
             or both can be empty.  The variables (and their values) are
             passed with each table request
+        workers: the number of worker processes used to evaluate filters.  Default 1,
+            which evaluates filters in the request thread
+        parallel_min_rows: the minimum number of rows for which filters are evaluated
+            in parallel when workers > 1
+        single_flight: if True, concurrent calls to get_rows() share a single call (see
+            SingleFlight).  Only use this if get_rows() returns the same rows for every
+            request, i.e., doesn't depend on the request's header variables
+        reuse_window: if single_flight is True, the time, in seconds, for which the rows
+            returned by get_rows() are reused.  Default 0 (no reuse)
+        refresh_interval: if not None, requests are served from a snapshot of get_rows()
+            which is refreshed in the background every refresh_interval seconds (see
+            SnapshotRows).  The same caveat as for single_flight applies
+        sketches: if True, column_summary() is answered from approximate sketches of the
+            columns (see galyleo_sketches) rather than exactly.  The sketches are rebuilt each
+            time the version of the rows changes, so they are only used when the rows have a
+            version: with refresh_interval, or single_flight with a reuse_window.  Otherwise
+            the summaries stay exact.  Default False (exact summaries)
     '''
-    def __init__(self, schema, get_rows, header_variables=None):
-        self.schema = schema
+    def __init__(self, schema, get_rows, header_variables=None, workers=1, parallel_min_rows=PARALLEL_MIN_ROWS, single_flight=False, reuse_window=0, refresh_interval=None, sketches=False):
+        self._schema = as_schema(schema)
+        if refresh_interval is not None:
+            get_rows = SnapshotRows(get_rows, refresh_interval)
+        elif single_flight:
+            get_rows = SingleFlight(get_rows, reuse_window)
         self.get_rows = get_rows
         self.header_variables = DEFAULT_HEADER_VARIABLES if header_variables is None else header_variables
+        self.workers = workers
+        self.parallel_min_rows = parallel_min_rows
+        self.table_label = 'unregistered'
+        self.sketches = sketches
+        self._sketch = None
+        self._sketch_lock = threading.Lock()
+
+    @property
+    def schema(self):
+        '''
+        The Schema of the table
+        '''
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema):
+        self._schema = as_schema(schema)
+
+    def snapshot_age(self):
+        '''
+        Return the age, in seconds, of the snapshot the rows are served from, or None if
+        the rows are not served from a snapshot (or no snapshot has been taken yet)
+        '''
+        return self.get_rows.age() if isinstance(self.get_rows, SnapshotRows) else None
+
+    def add_change_listener(self, listener):
+        '''
+        Register a function of no arguments, to be called each time the data served change
+        without a call to notify_table_changed: here, each time a refresh changes the
+        snapshot (see refresh_interval).  Servers whose data change in other ways override this
+
+        Arguments:
+            listener: the function to call
+        '''
+        if isinstance(self.get_rows, SnapshotRows):
+            self.get_rows.add_listener(listener)
 
     # This is used to get the names of a column from the schema
 
@@ -268,13 +633,13 @@ class GalyleoDataServer:
         '''
         Return the names of the columns
         '''
-        return [column["name"] for column in self.schema]
+        return list(self.schema.names)
 
     def column_types(self):
         '''
         Return the types of the columns
         '''
-        return [column["type"] for column in self.schema]
+        return list(self.schema.types)
 
     def get_column_type(self, column_name):
         '''
@@ -284,12 +649,79 @@ class GalyleoDataServer:
         Arguments:
             column_name: name of the column to get the type for
         '''
-        matches = [column["type"] for column in self.schema if column["name"] == column_name]
-        if len(matches) == 0:
+        return self.schema.type_of(column_name)
+
+    def _source_version(self):
+        '''
+        Internal use only.  Return a token which is replaced whenever the data returned by
+        _column_source() may change, or None if the data have no version (get_rows() may
+        return the same list, modified).  Sketches are only kept for data with a version
+        '''
+        get_rows = self.get_rows
+        if isinstance(get_rows, SnapshotRows) or (isinstance(get_rows, SingleFlight) and get_rows.reuse_window > 0):
+            # a call makes sure there is a current result (reused, not recomputed) to have a version
+            get_rows()
+            return get_rows.version()
+        return None
+
+    def _column_source(self):
+        '''
+        Internal use only.  Return the current data of the table, for _source_column
+        '''
+        return self.get_rows()
+
+    def _source_column(self, source, index):
+        '''
+        Internal use only.  Return the list of values of column index of source
+        '''
+        return [row[index] for row in source]
+
+    def _table_sketch(self):
+        '''
+        Internal use only.  Return the TableSketch of the current data, building it if the
+        version of the data has changed since it was last built, or None if the data have
+        no version
+        '''
+        # take the version before the data, so a change in between only costs a rebuild
+        version = self._source_version()
+        if version is None:
             return None
-        else:
-            return matches[0]
-       
+        with self._sketch_lock:
+            if self._sketch is None or self._sketch[0] is not version:
+                source = self._column_source()
+                sketch = TableSketch(self.schema)
+                for index in range(len(self.schema)):
+                    values = self._source_column(source, index)
+                    sketch.update_column(index, values)
+                sketch.rows = len(values) if len(self.schema) > 0 else 0
+                self._sketch = (version, sketch)
+            return self._sketch[1]
+
+    def column_summary(self, column_name:str, top_k = SUMMARY_TOP_K, quantiles = SUMMARY_QUANTILES):
+        '''
+        Summarize column_name: its number of distinct values, its most frequent values, and
+        (for number, date, datetime and timeofday columns) its quantiles.  The summary is
+        exact unless self.sketches is True and the data have a version (see the sketches
+        argument, and galyleo_sketches for the form of the summary).
+        Arguments:
+
+            column_name: name of the column to summarize
+            top_k: the number of most frequent values to return
+            quantiles: the list of quantiles (between 0 and 1) to return
+
+        Returns:
+            the summary, as a dictionary
+
+        '''
+        try:
+            index = self.schema.index(column_name)
+        except ValueError as original_error:
+            raise InvalidDataException(f'{column_name} is not a column of this table') from original_error
+        sketch = self._table_sketch() if self.sketches else None
+        if sketch is not None:
+            return sketch.summary(column_name, top_k, quantiles)
+        values = self._source_column(self._column_source(), index)
+        return column_summary(self.schema.types[index], values, top_k, quantiles)
 
     def all_values(self, column_name:str):
         '''
@@ -299,16 +731,17 @@ class GalyleoDataServer:
             column_name: name of the column to get the values for
 
         Returns:
-            List of the values
+            Sorted list of the values; missing (None) values are omitted
 
         '''
         try:
-            index = self.column_names().index(column_name)
+            index = self.schema.index(column_name)
         except ValueError as original_error:
             raise InvalidDataException(f'{column_name} is not a column of this table') from original_error
-        galyleo_type = self.schema[index]["type"]
+        galyleo_type = self.schema.types[index]
         rows = self.get_rows()
         result =  _convert_list_to_type(galyleo_type, list(set([row[index] for row in rows])))
+        result = [value for value in result if value is not None]
         result.sort()
         return result
 
@@ -323,11 +756,11 @@ class GalyleoDataServer:
             the minimum, maximum, and increment of the column
 
         '''
-        entry = [column for column in self.schema if column["name"] == column_name]
-        if len(entry) == 0:
+        column_type = self.schema.type_of(column_name)
+        if column_type is None:
             raise InvalidDataException(f'{column_name} is not a column of this table')
-        if entry[0]["type"] != GALYLEO_NUMBER:
-            msg = f'The type of {column_name} must be {GALYLEO_NUMBER}, not {entry[0]["type"]}'
+        if column_type != GALYLEO_NUMBER:
+            msg = f'The type of {column_name} must be {GALYLEO_NUMBER}, not {column_type}'
             raise InvalidDataException(msg)
         try:
             values = self.all_values(column_name)
@@ -338,18 +771,58 @@ class GalyleoDataServer:
         except ValueError as original_error:
             raise InvalidDataException(f'Bad data in column {column_name}') from original_error
 
-    def get_filtered_rows(self, filter_spec):
+    def get_filtered_rows(self, filter_spec, workers=None):
         '''
         Filter the rows according to the specification given by filter_spec.
         Returns the rows for which the resulting filter returns True.
 
         Arguments:
             filter_spec: Specification of the filter, as a dictionary
+            workers: the number of worker processes to use for this call.  If None
+                (the default), self.workers is used
         Returns:
             The subset of self.get_rows() which pass the filter
         '''
-        made_filter = Filter(filter_spec, self.column_names())
-        return made_filter.filter(self.get_rows())
+        made_filter = Filter(filter_spec, self.schema)
+        workers = self.workers if workers is None else workers
+        labels = {"table": self.table_label}
+        with metrics.timer('galyleo_get_rows_seconds', labels):
+            rows = self.get_rows()
+        with metrics.timer('galyleo_filter_seconds', labels):
+            return made_filter.filter(rows, workers, self.parallel_min_rows)
+
+    def get_rows_page(self, filter_spec, offset = 0, limit = None):
+        '''
+        Return the rows which pass filter_spec (all rows if filter_spec is None), skipping
+        the first offset and returning at most limit (all, if limit is None).  Servers
+        which can page without computing all the rows override this
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary, or None
+            offset: the number of rows to skip.  Default 0
+            limit: the maximum number of rows to return.  Default None (no limit)
+        Returns:
+            The rows
+        '''
+        rows = self.get_rows() if filter_spec is None else self.get_filtered_rows(filter_spec)
+        return rows[offset:] if limit is None else rows[offset:offset + limit]
+
+    def get_aggregated_rows(self, filter_spec, aggregate_spec):
+        '''
+        Filter the rows according to filter_spec, then group and aggregate them according
+        to aggregate_spec (see galyleo_aggregation).
+
+        Arguments:
+            filter_spec: Specification of the filter, as a dictionary, or None for all rows
+            aggregate_spec: Specification of the aggregation, as a dictionary
+        Returns:
+            {"columns": the schema of the result, "rows": the aggregated rows}
+        '''
+        (group_indices, aggregates) = check_valid_aggregate_spec(aggregate_spec, self.schema)
+        rows = self.get_rows() if filter_spec is None else self.get_filtered_rows(filter_spec)
+        with metrics.timer('galyleo_aggregate_seconds', {"table": self.table_label}):
+            result = aggregate_rows(rows, group_indices, aggregates)
+        return {"columns": result_schema(self.schema, group_indices, aggregates), "rows": result}
 
 
 class RowDataServer(GalyleoDataServer):
@@ -360,10 +833,10 @@ class RowDataServer(GalyleoDataServer):
     served from a general-purpose server.  Note that this will need some
     authentication.
     '''
-    def __init__(self, schema, rows):
-        super(schema, self.get_rows)
+    def __init__(self, schema, rows, header_variables=None):
+        super().__init__(schema, self.get_rows, header_variables)
         self.rows = rows
-    
+
     def get_rows(self):
         '''
         Very simple: just return the rows
@@ -0,0 +1,158 @@
+'''
+Temporal columns.  Values of the types GALYLEO_DATE, GALYLEO_DATETIME and GALYLEO_TIME_OF_DAY
+travel in rows and on the wire as ISO strings ('2024-03-01', '2024-03-01T12:30:00' and
+'12:30:00'), and are held in columns as NumPy arrays: datetime64[D] for dates, datetime64[us]
+for datetimes, and timedelta64[us] since midnight for times of day.  A missing value is NaT.
+Parsing and formatting work on whole columns at once, so NumPy does the ISO parsing in C.
+Strings with a UTC offset are converted to UTC, with a warning from NumPy.
+'''
+
+# BSD 3-Clause License
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import datetime
+import re
+
+import numpy
+
+from galyleo.galyleo_constants import GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY
+from galyleo.galyleo_exceptions import InvalidDataException
+
+TEMPORAL_DTYPES = {
+    GALYLEO_DATE: numpy.dtype('datetime64[D]'),
+    GALYLEO_DATETIME: numpy.dtype('datetime64[us]'),
+    GALYLEO_TIME_OF_DAY: numpy.dtype('timedelta64[us]')
+}
+'''
+The NumPy dtype of a column of each temporal type
+'''
+
+_MIDNIGHT = numpy.datetime64('1970-01-01T00:00:00', 'us')
+
+_TIME_PATTERN = r'\d{2}:\d{2}(:\d{2}(\.\d+)?)?'
+_ISO_PATTERN = re.compile(rf'(\d{{4}}-\d{{2}}-\d{{2}}([T ]{_TIME_PATTERN}(Z|[+-]\d{{2}}:?\d{{2}})?)?|{_TIME_PATTERN})')
+
+
+def is_temporal(galyleo_type):
+    '''
+    Return True if galyleo_type is one of the temporal types
+    '''
+    return galyleo_type in TEMPORAL_DTYPES
+
+def _iso_string(value):
+    '''
+    Internal use only.  Convert a single value to the string NumPy will parse
+    '''
+    if value is None or (isinstance(value, float) and value != value):
+        return 'NaT'
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).strip()
+
+def parse_temporal(galyleo_type, values):
+    '''
+    Convert a sequence of values to the array for a column of type galyleo_type.  The values
+    may be ISO strings, or date, datetime and time objects; None, NaN, '' and 'NaT' are
+    missing.  A datetime given for a date column is truncated to its date.  Raises an
+    InvalidDataException if a value can't be parsed.
+
+    Arguments:
+        galyleo_type: one of GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY
+        values: a list or NumPy array of values
+    Returns:
+        a NumPy array of dtype TEMPORAL_DTYPES[galyleo_type]
+    '''
+    if isinstance(values, numpy.ndarray) and values.dtype.kind == 'U':
+        strings = numpy.char.strip(values)
+    else:
+        strings = numpy.array([_iso_string(value) for value in values], dtype = str)
+    try:
+        if galyleo_type == GALYLEO_TIME_OF_DAY:
+            missing = (strings == '') | (strings == 'NaT')
+            stamps = numpy.where(missing, 'NaT', numpy.char.add('1970-01-01T', strings))
+            return stamps.astype(TEMPORAL_DTYPES[GALYLEO_DATETIME]) - _MIDNIGHT
+        return strings.astype(TEMPORAL_DTYPES[galyleo_type])
+    except ValueError as original_error:
+        raise InvalidDataException(f'Bad {galyleo_type} value: {original_error}') from original_error
+
+def format_temporal(galyleo_type, array):
+    '''
+    Convert the array of a column of type galyleo_type to a list of ISO strings, with None
+    for a missing value.  Dates are formatted as YYYY-MM-DD; datetimes and times of day have
+    seconds, and microseconds only when they are not zero (as datetime.isoformat() does).
+
+    Arguments:
+        galyleo_type: one of GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY
+        array: a NumPy array of dtype TEMPORAL_DTYPES[galyleo_type]
+    Returns:
+        the list of strings
+    '''
+    if galyleo_type == GALYLEO_DATE:
+        strings = numpy.datetime_as_string(array, unit = 'D')
+    else:
+        stamps = array + _MIDNIGHT if galyleo_type == GALYLEO_TIME_OF_DAY else array
+        strings = numpy.datetime_as_string(stamps, unit = 's')
+        fractional = ~numpy.isnat(stamps) & (stamps != stamps.astype('datetime64[s]'))
+        if fractional.any():
+            strings = numpy.where(fractional, numpy.datetime_as_string(stamps, unit = 'us'), strings)
+    result = strings.tolist()
+    if galyleo_type == GALYLEO_TIME_OF_DAY:
+        result = [string[11:] for string in result]
+    for i in numpy.flatnonzero(numpy.isnat(array)):
+        result[i] = None
+    return result
+
+def temporal_objects(galyleo_type, array):
+    '''
+    Convert the array of a column of type galyleo_type to a list of date, datetime or time
+    objects, with None for a missing value.  Datetimes are naive, in UTC if they were stored
+    from values with a time zone.
+
+    Arguments:
+        galyleo_type: one of GALYLEO_DATE, GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY
+        array: a NumPy array of dtype TEMPORAL_DTYPES[galyleo_type]
+    Returns:
+        the list of objects
+    '''
+    result = array.astype(object).tolist()
+    if galyleo_type == GALYLEO_TIME_OF_DAY:
+        midnight = datetime.datetime.min
+        result = [None if value is None else (midnight + value).time() for value in result]
+    return result
+
+def is_iso_temporal(value):
+    '''
+    Return True if value is a string which is an ISO date (YYYY-MM-DD), datetime
+    (YYYY-MM-DDTHH:MM[:SS[.ffffff]], optionally with a UTC offset) or time of day (HH:MM[:SS[.ffffff]])
+    '''
+    if not isinstance(value, str) or _ISO_PATTERN.fullmatch(value.strip()) is None:
+        return False
+    for galyleo_type in (GALYLEO_DATETIME, GALYLEO_TIME_OF_DAY):
+        try:
+            parsed = parse_temporal(galyleo_type, [value])
+        except InvalidDataException:
+            continue
+        if not numpy.isnat(parsed[0]):
+            return True
+    return False
@@ -0,0 +1,125 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test aggregation pushdown, for row and columnar table servers
+'''
+
+import pytest
+
+from galyleo.galyleo_aggregation import aggregate_rows, check_valid_aggregate_spec, result_schema
+from galyleo.galyleo_columns import ColumnarDataServer
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_schema import Schema
+from galyleo.galyleo_table_server import GalyleoDataServer
+
+schema = Schema([{"name": "region", "type": "string"}, {"name": "year", "type": "number"}, {"name": "sales", "type": "number"}, {"name": "open", "type": "boolean"}, {"name": "day", "type": "date"}])
+rows = [
+    ['east', 2020, 10.5, True, '2020-01-03'],
+    ['west', 2020, 4.0, False, '2020-02-01'],
+    ['east', 2021, None, True, '2021-05-05'],
+    ['north', 2021, 7.25, True, None],
+    ['east', 2020, 2.0, False, '2020-12-31'],
+    [None, 2021, 1.0, True, '2021-01-01'],
+    ['west', 2021, float('nan'), True, '2021-07-04']
+]
+spec = {
+    "group_by": ["year", "region"],
+    "aggregates": [
+        {"operator": "count"},
+        {"operator": "sum", "column": "sales"},
+        {"operator": "mean", "column": "sales", "name": "average"},
+        {"operator": "min", "column": "day"},
+        {"operator": "max", "column": "sales"}
+    ]
+}
+
+
+def test_check_valid_aggregate_spec():
+    '''
+    Test normalization and the errors of check_valid_aggregate_spec
+    '''
+    (group_indices, aggregates) = check_valid_aggregate_spec(spec, schema)
+    assert group_indices == [0, 1]
+    assert aggregates == [('count', 'count', None), ('sum_sales', 'sum', 2), ('average', 'mean', 2), ('min_day', 'min', 4), ('max_sales', 'max', 2)]
+    assert [column["name"] for column in result_schema(schema, group_indices, aggregates)] == ['region', 'year', 'count', 'sum_sales', 'average', 'min_day', 'max_sales']
+    assert result_schema(schema, group_indices, aggregates)[5]["type"] == 'date'
+    assert check_valid_aggregate_spec({}, schema) == ([], [('count', 'count', None)])
+    bad_specs = [
+        ([], 'must be a dictionary'),
+        ({"group_by": "region"}, 'must be a list'),
+        ({"group_by": ["city"]}, 'not present in the schema'),
+        ({"aggregates": [{"operator": "median", "column": "sales"}]}, 'not a valid aggregate'),
+        ({"aggregates": [{"operator": "sum", "column": "region"}]}, 'Cannot compute the sum'),
+        ({"aggregates": [{"operator": "max", "column": "open"}]}, 'Cannot compute the max'),
+        ({"aggregates": [{"operator": "min"}]}, 'requires a column'),
+        ({"group_by": ["region"], "aggregates": [{"operator": "count", "name": "region"}]}, 'must be distinct'),
+        ({"aggregates": []}, 'at least one')
+    ]
+    for (bad_spec, message) in bad_specs:
+        with pytest.raises(InvalidDataException, match = message):
+            check_valid_aggregate_spec(bad_spec, schema)
+
+
+def test_aggregate_rows():
+    '''
+    Test aggregate_rows, including missing values and the order of the groups
+    '''
+    (group_indices, aggregates) = check_valid_aggregate_spec(spec, schema)
+    result = aggregate_rows(rows, group_indices, aggregates)
+    assert result == [
+        ['east', 2020, 2, 12.5, 6.25, '2020-01-03', 10.5],
+        ['west', 2020, 1, 4.0, 4.0, '2020-02-01', 4.0],
+        ['east', 2021, 1, 0, None, '2021-05-05', None],
+        ['north', 2021, 1, 7.25, 7.25, None, 7.25],
+        [None, 2021, 1, 1.0, 1.0, '2021-01-01', 1.0],
+        ['west', 2021, 1, 0, None, '2021-07-04', None]
+    ]
+    assert aggregate_rows([], [], [('count', 'count', None)]) == [[0]]
+    assert aggregate_rows([], [0], [('count', 'count', None)]) == []
+
+
+@pytest.mark.parametrize('filter_spec', [None, {"operator": "IN_LIST", "column": "region", "values": ["east", "west"]}])
+def test_servers_agree(filter_spec):
+    '''
+    Test that the row and columnar servers give the same aggregates
+    '''
+    row_server = GalyleoDataServer(schema, lambda: rows)
+    columnar_server = ColumnarDataServer.from_rows(schema, rows)
+    expected = row_server.get_aggregated_rows(filter_spec, spec)
+    actual = columnar_server.get_aggregated_rows(filter_spec, spec)
+    assert actual["columns"] == expected["columns"]
+    assert actual["rows"] == expected["rows"]
+    totals = {"aggregates": [{"operator": "count"}, {"operator": "sum", "column": "year"}, {"operator": "max", "column": "region"}]}
+    assert columnar_server.get_aggregated_rows(filter_spec, totals) == row_server.get_aggregated_rows(filter_spec, totals)
+    nothing = {"operator": "IN_LIST", "column": "region", "values": ["south"]}
+    for server in [row_server, columnar_server]:
+        assert server.get_aggregated_rows(nothing, totals)["rows"] == [[0, 0, None]]
+        assert server.get_aggregated_rows(nothing, {"group_by": ["region"]})["rows"] == []
@@ -0,0 +1,74 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test the benchmark suite, at a size small enough to run with the tests
+'''
+
+import random
+from json import loads
+
+from benchmarks.load_test import make_request, percentiles, run_scenario
+from benchmarks.run import compare, main, run_benchmarks
+from benchmarks.tables import SCHEMA, make_rows
+from galyleo.galyleo_table_server import Filter
+
+
+def test_benchmarks(tmp_path):
+    '''
+    Test that the synthetic tables are repeatable, that the benchmarks run, and that
+    the comparison flags regressions beyond the threshold
+    '''
+    assert make_rows(100, 1) == make_rows(100, 1)
+    assert all(len(row) == len(SCHEMA) for row in make_rows(100))
+    results = run_benchmarks([200], ['aggregate_by', 'filter_index', 'columnar_filter'], repeats = 1)
+    assert set(results.keys()) == {'aggregate_by/200', 'filter_index/200', 'columnar_filter/200'}
+    assert all(result["peak_bytes"] > 0 for result in results.values())
+    baseline = {"aggregate_by/200": {"min_seconds": 1.0, "peak_bytes": 1000}}
+    current = {"aggregate_by/200": {"min_seconds": 1.2, "peak_bytes": 2000}}
+    assert compare(current, baseline, 0.25) == [("aggregate_by/200", "peak_bytes", 1000, 2000)]
+    baseline_path = tmp_path / 'baseline.json'
+    assert main(['--sizes', '200', '--only', 'to_json', '--repeats', '1', '--save', str(baseline_path)]) == 0
+    assert main(['--sizes', '200', '--only', 'to_json', '--repeats', '1', '--no-memory', '--compare', str(baseline_path), '--threshold', '100']) == 0
+
+def test_load_test():
+    '''
+    Test the load tester's request generation and percentiles, and a short run
+    '''
+    generator = random.Random(0)
+    (path, headers) = make_request('get_filtered_rows', 'votes', generator)
+    assert path == '/get_filtered_rows' and headers["Table-Name"] == 'votes'
+    assert Filter(loads(headers["Filter-Spec"]), [column["name"] for column in SCHEMA]) is not None
+    assert percentiles([]) == {"count": 0}
+    stats = percentiles([i / 100 for i in range(1, 101)])
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (0.5, 0.95, 0.99, 1.0)
+    report = run_scenario({"mode": "columnar", "tables": [{"name": "votes", "rows": 500}], "concurrency": 2, "duration": 0.5})
+    assert report["requests"] > 0 and report["errors"] == 0
+    assert report["latency"]["all"]["count"] == report["requests"]
@@ -0,0 +1,323 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test the columnar table servers
+'''
+
+import multiprocessing
+import os
+from datetime import date, datetime, time
+
+import numpy
+import pandas as pd
+import pytest
+
+from galyleo.galyleo_columns import ColumnarDataServer
+from galyleo.galyleo_dataframe_server import DataFrameDataServer
+from galyleo.galyleo_constants import GALYLEO_BOOLEAN, GALYLEO_NUMBER, GALYLEO_STRING
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo import galyleo_shared_store
+from galyleo.galyleo_shared_store import SharedTableServer, SharedTableStore
+from galyleo.galyleo_table_server import GalyleoDataServer
+
+presidential_names = ['Year', 'State', 'Name', 'Party', 'Votes', 'Percentage']
+presidential_types = [GALYLEO_NUMBER, GALYLEO_STRING, GALYLEO_STRING, GALYLEO_STRING, GALYLEO_NUMBER, GALYLEO_NUMBER]
+presidential_schema = [{"name": presidential_names[i], "type": presidential_types[i]} for i in range(len(presidential_names))]
+
+def _presidential_vote_rows():
+    # The columnar servers return missing strings as None, so read them that way
+    frame  = pd.read_csv('tests/presidential_vote.csv').astype(object)
+    return frame.where(frame.notna(), None).to_numpy().tolist()
+
+filter_specs = [
+    {"operator": "IN_LIST", "column": 'State', "values": ["California", "Hawaii", "Nowhere"]},
+    {"operator": "IN_RANGE", "column": 'Year', "min_val": 1960, "max_val": 1980},
+    {"operator": "ALL", "arguments": [
+        {"operator": "IN_LIST", "column": 'Party', "values": ["Democratic"]},
+        {"operator": "IN_RANGE", "column": 'Percentage', "min_val": 0.5, "max_val": 0.6}
+    ]},
+    {"operator": "ANY", "arguments": [
+        {"operator": "IN_LIST", "column": 'State', "values": ["Texas"]},
+        {"operator": "NONE", "arguments": [{"operator": "IN_RANGE", "column": "Year", "min_val": 1840, "max_val": 2016}]}
+    ]},
+    {"operator": "IN_RANGE", "column": 'State', "min_val": "A", "max_val": "C"},
+    {"operator": "ALL", "arguments": []},
+    {"operator": "ANY", "arguments": []}
+]
+
+def _check_same_results(server, reference):
+    '''
+    Check that server answers every query exactly as the row-based reference server does
+    '''
+    assert server.get_rows() == reference.get_rows()
+    for name in ['Year', 'State', 'Party']:
+        assert server.all_values(name) == reference.all_values(name)
+    for name in ['Year', 'Votes']:
+        assert server.numeric_spec(name) == reference.numeric_spec(name)
+    for spec in filter_specs:
+        assert server.get_filtered_rows(spec) == reference.get_filtered_rows(spec)
+
+def test_columnar_server():
+    '''
+    Test that a ColumnarDataServer gives the same results as a GalyleoDataServer
+    '''
+    rows = _presidential_vote_rows()
+    reference = GalyleoDataServer(presidential_schema, _presidential_vote_rows)
+    server = ColumnarDataServer.from_rows(presidential_schema, rows)
+    _check_same_results(server, reference)
+    for spec in filter_specs:
+        assert server.get_filtered_rows(spec, workers = 3) == reference.get_filtered_rows(spec)
+    with pytest.raises(InvalidDataException, match='foo is not a column of this table'):
+        server.all_values('foo')
+    with pytest.raises(InvalidDataException, match=f'The type of Party must be {GALYLEO_NUMBER}, not {GALYLEO_STRING}'):
+        server.numeric_spec('Party')
+    with pytest.raises(InvalidDataException, match='foo is not a valid column'):
+        server.get_filtered_rows({"operator": "IN_LIST", "column": 'foo', "values": []})
+    boolean_schema = [{"name": "flag", "type": GALYLEO_BOOLEAN}]
+    boolean_server = ColumnarDataServer.from_rows(boolean_schema, [[True], [False], [True]])
+    assert boolean_server.get_filtered_rows({"operator": "IN_LIST", "column": "flag", "values": [1]}) == [[True], [True]]
+    with pytest.raises(InvalidDataException, match='All rows must have length 1'):
+        ColumnarDataServer.from_rows(boolean_schema, [[True, 1]])
+
+def test_missing_numbers(tmp_path):
+    '''
+    Test that the columnar servers serve a missing number as None, and leave it out of
+    all_values and numeric_spec
+    '''
+    from galyleo.galyleo_columnar_file import ColumnarFileDataServer, write_columnar_table
+    schema = [{"name": "name", "type": GALYLEO_STRING}, {"name": "value", "type": GALYLEO_NUMBER}]
+    rows = [['a', 1.0], ['b', None], ['c', 3.0], ['d', 4.0]]
+    write_columnar_table(str(tmp_path / 'missing'), 'missing', schema, rows, block_size = 2)
+    for server in [ColumnarDataServer.from_rows(schema, rows), ColumnarFileDataServer(str(tmp_path / 'missing'))]:
+        assert server.get_rows() == rows
+        assert server.all_values('value') == [1.0, 3.0, 4.0]
+        assert server.numeric_spec('value') == {"max_val": 4.0, "min_val": 1.0, "increment": 1.0}
+        assert server.get_filtered_rows({"operator": "IN_RANGE", "column": "value", "min_val": 0, "max_val": 10}) == [rows[0], rows[2], rows[3]]
+    with pytest.raises(InvalidDataException, match='Bad data'):
+        ColumnarDataServer.from_rows(schema, [['a', 1.0], ['b', None]]).numeric_spec('value')
+
+def test_dataframe_server():
+    '''
+    Test that a DataFrameDataServer gives the same results as a GalyleoDataServer, and
+    serves a replacement DataFrame
+    '''
+    frame = pd.read_csv('tests/presidential_vote.csv')
+    reference = GalyleoDataServer(presidential_schema, _presidential_vote_rows)
+    server = DataFrameDataServer(frame)
+    assert server.schema == presidential_schema
+    _check_same_results(server, reference)
+    server.dataframe = frame[frame['Year'] >= 2000]
+    assert server.numeric_spec('Year') == {"max_val": 2020, "min_val": 2000, "increment": 4}
+    with pytest.raises(InvalidDataException, match='are not in the dataframe'):
+        server.dataframe = frame[['Year']]
+    temporal_frame = pd.DataFrame({
+        "when": pd.to_datetime([datetime(2021, 3, 4, 5, 6, 7), None, datetime(2020, 1, 1, 0, 0, 0, 500000)]),
+        "day": ['2021-03-04', '2020-01-01', None],
+        "flag": [True, False, True]
+    })
+    temporal_server = DataFrameDataServer(temporal_frame, [{"name": "when", "type": "datetime"}, {"name": "day", "type": "date"}, {"name": "flag", "type": "boolean"}])
+    assert temporal_server.get_rows() == [['2021-03-04T05:06:07', '2021-03-04', True], [None, '2020-01-01', False], ['2020-01-01T00:00:00.500000', None, True]]
+    assert temporal_server.get_filtered_rows({"operator": "IN_RANGE", "column": "day", "min_val": "2020-01-01", "max_val": "2020-12-31"}) == [[None, '2020-01-01', False]]
+    missing_frame = pd.DataFrame({"x": [1.0, numpy.nan, 3.0], "n": pd.array([1, None, 2], dtype = 'Int64'), "flag": [True, False, True]})
+    missing_server = DataFrameDataServer(missing_frame)
+    assert missing_server.get_rows() == [[1.0, 1.0, True], [None, None, False], [3.0, 2.0, True]]
+    assert missing_server.all_values('x') == [1.0, 3.0]
+    assert missing_server.numeric_spec('x') == {"max_val": 3.0, "min_val": 1.0, "increment": 2.0}
+    assert missing_server.numeric_spec('n') == {"max_val": 2.0, "min_val": 1.0, "increment": 1.0}
+    assert missing_server.get_filtered_rows({"operator": "IN_LIST", "column": "flag", "values": [False]}) == [[None, None, False]]
+    with pytest.raises(InvalidDataException, match='missing values'):
+        DataFrameDataServer(pd.DataFrame({"flag": pd.array([True, None, False], dtype = 'boolean')}))
+    with pytest.raises(InvalidDataException, match='missing values'):
+        ColumnarDataServer.from_rows([{"name": "flag", "type": GALYLEO_BOOLEAN}], [[True], [None]])
+
+def _read_shared_table(store_name, manifest_directory, queue):
+    server = SharedTableServer(store_name, manifest_directory)
+    queue.put((server.generation(), server.get_rows()))
+
+def test_shared_store(tmp_path):
+    '''
+    Test publishing a table to shared memory and reading it from this and other processes
+    '''
+    rows = _presidential_vote_rows()
+    reference = GalyleoDataServer(presidential_schema, _presidential_vote_rows)
+    with pytest.raises(InvalidDataException, match='No shared table'):
+        SharedTableServer('galyleo_test_store', str(tmp_path))
+    with SharedTableStore('galyleo_test_store', str(tmp_path)) as store:
+        assert store.publish(presidential_schema, rows) == 0
+        server = SharedTableServer('galyleo_test_store', str(tmp_path))
+        _check_same_results(server, reference)
+        queue = multiprocessing.get_context('spawn').Queue()
+        process = multiprocessing.get_context('spawn').Process(target = _read_shared_table, args = ('galyleo_test_store', str(tmp_path), queue))
+        process.start()
+        assert queue.get(timeout = 60) == (0, rows)
+        process.join()
+        assert store.publish(presidential_schema, rows[:10]) == 1
+        assert server.generation() == 1
+        assert server.get_rows() == rows[:10]
+
+def test_shared_store_republish(tmp_path, monkeypatch):
+    '''
+    Test that a server notices a publish which keeps the manifest's modification time, and
+    that it rereads the manifest when a publish unlinks the segments it has just read about
+    '''
+    rows = _presidential_vote_rows()
+    with SharedTableStore('galyleo_race_store', str(tmp_path)) as store:
+        store.publish(presidential_schema, rows)
+        server = SharedTableServer('galyleo_race_store', str(tmp_path))
+        old_stat = os.stat(store.manifest_path)
+        store.publish(presidential_schema, rows[:20])
+        os.utime(store.manifest_path, ns = (old_stat.st_atime_ns, old_stat.st_mtime_ns))
+        assert server.generation() == 1
+        stale_manifest = galyleo_shared_store._read_manifest(store.manifest_path)  # pylint: disable=protected-access
+        store.publish(presidential_schema, rows[:10])
+        read_manifest = galyleo_shared_store._read_manifest  # pylint: disable=protected-access
+        reads = []
+        def racing_read(path):
+            reads.append(path)
+            return stale_manifest if len(reads) == 1 else read_manifest(path)
+        monkeypatch.setattr(galyleo_shared_store, '_read_manifest', racing_read)
+        racing_server = SharedTableServer('galyleo_race_store', str(tmp_path))
+        assert len(reads) == 2
+        assert racing_server.generation() == 2
+        assert racing_server.get_rows() == rows[:10]
+
+def test_columnar_file(tmp_path):
+    '''
+    Test writing a table in the columnar format and serving it from memory-mapped files
+    '''
+    from galyleo.galyleo_columnar_file import ColumnarFileDataServer, write_columnar_table
+    from galyleo.galyleo_table import GalyleoTable
+    rows = _presidential_vote_rows()
+    reference = GalyleoDataServer(presidential_schema, _presidential_vote_rows)
+    path = str(tmp_path / 'presidential')
+    write_columnar_table(path, 'presidential', presidential_schema, rows, block_size = 64)
+    server = ColumnarFileDataServer(path)
+    assert server.name == 'presidential'
+    _check_same_results(server, reference)
+    # When the rows are sorted by year, a narrow year range touches few blocks
+    sorted_rows = sorted(rows, key = lambda row: row[0])
+    write_columnar_table(path, 'presidential', presidential_schema, sorted_rows, block_size = 64)
+    server = ColumnarFileDataServer(path)
+    spec = {"operator": "IN_RANGE", "column": 'Year', "min_val": 1960, "max_val": 1964}
+    assert len(server.candidate_blocks(spec)) <= 5
+    assert server.get_filtered_rows(spec) == [row for row in sorted_rows if 1960 <= row[0] <= 1964]
+    assert len(server.candidate_blocks({"operator": "IN_RANGE", "column": 'Year', "min_val": 3000, "max_val": 4000})) == 0
+    assert server.get_filtered_rows({"operator": "IN_RANGE", "column": 'Year', "min_val": 3000, "max_val": 4000}) == []
+    table = GalyleoTable('test')
+    table.load_from_dictionary({"columns": presidential_schema[:2], "rows": [row[:2] for row in rows[:100]]})
+    table.to_columnar(str(tmp_path / 'small'))
+    loaded = GalyleoTable('other')
+    loaded.from_columnar(str(tmp_path / 'small'))
+    assert loaded.equal(table, True)
+    temporal_schema = [{"name": "day", "type": "date"}, {"name": "when", "type": "datetime"}, {"name": "at", "type": "timeofday"}, {"name": "n", "type": GALYLEO_NUMBER}]
+    temporal_table = GalyleoTable('temporal')
+    temporal_table.load_from_dictionary({"columns": temporal_schema, "rows": [
+        [date(2021, 3, 4), datetime(2021, 3, 4, 5, 6, 7, 500000), time(5, 6, 7), 1],
+        [None, None, None, 2]
+    ]})
+    temporal_table.to_columnar(str(tmp_path / 'temporal'))
+    loaded = GalyleoTable('other')
+    loaded.from_columnar(str(tmp_path / 'temporal'))
+    assert loaded.equal(temporal_table, True)
+    loaded.check_schema_match([(column["name"], column["type"]) for column in temporal_schema], loaded.data)
+    with pytest.raises(InvalidDataException, match='Cannot read a columnar table header'):
+        ColumnarFileDataServer(str(tmp_path / 'missing'))
+
+def _write_presidential_csv(path):
+    '''
+    Write the presidential table in the Galyleo CSV format (names row, types row, data)
+    '''
+    frame = pd.read_csv('tests/presidential_vote.csv').fillna('')
+    with open(path, 'w', encoding = 'utf-8', newline = '') as csv_file:
+        csv_file.write(','.join(presidential_names) + '\n')
+        csv_file.write(','.join(presidential_types) + '\n')
+        frame.to_csv(csv_file, header = False, index = False)
+    return frame.to_numpy().tolist()
+
+def test_csv_loader(tmp_path):
+    '''
+    Test create_server_from_csv, serially and in parallel
+    '''
+    from galyleo.galyleo_server_framework import create_server_from_csv
+    path = str(tmp_path / 'presidential.csv')
+    rows = _write_presidential_csv(path)
+    server = create_server_from_csv('presidential_csv', path)
+    assert server.schema == presidential_schema
+    assert server.get_rows() == rows
+    assert server.numeric_spec('Year') == {"max_val": 2020, "min_val": 1828, "increment": 4}
+    parallel_server = create_server_from_csv('presidential_csv', path, workers = 3)
+    assert parallel_server.get_rows() == rows
+    bad_path = str(tmp_path / 'bad.csv')
+    with open(bad_path, 'w', encoding = 'utf-8') as csv_file:
+        csv_file.write('a,b\nnumber,color\n1,red\n')
+    with pytest.raises(InvalidDataException, match='Invalid column types'):
+        create_server_from_csv('bad', bad_path)
+    with open(bad_path, 'w', encoding = 'utf-8') as csv_file:
+        csv_file.write('a,b,c\nnumber,boolean,date\n1,true,2020-01-01\n2,False,2021-02-03\n')
+    server = create_server_from_csv('good', bad_path)
+    assert server.get_rows() == [[1, True, '2020-01-01'], [2, False, '2021-02-03']]
+    with open(bad_path, 'w', encoding = 'utf-8') as csv_file:
+        csv_file.write('a,b\nnumber,string\n1,red\nx,blue\n')
+    with pytest.raises(InvalidDataException, match='raised during conversion to number'):
+        create_server_from_csv('bad', bad_path)
+    with open(bad_path, 'w', encoding = 'utf-8') as csv_file:
+        csv_file.write('a,b\nnumber,string\n1,red\n2\n')
+    with pytest.raises(InvalidDataException, match='All rows must have 2 columns'):
+        create_server_from_csv('bad', bad_path)
+
+def test_csv_records(tmp_path):
+    '''
+    Test that quoted fields containing newlines are parsed whole, whatever the block size and
+    the number of workers, and that blank number cells are missing numbers
+    '''
+    from galyleo.galyleo_csv_loader import load_csv_columns, parse_csv_range, read_csv_header, record_boundaries
+    from galyleo.galyleo_server_framework import create_server_from_csv
+    path = str(tmp_path / 'records.csv')
+    with open(path, 'w', encoding = 'utf-8', newline = '') as csv_file:
+        csv_file.write('name,value\nstring,number\nc,2\n"a\nb",1\nd,3\n')
+    (_, data_start) = read_csv_header(path)
+    columns = parse_csv_range(path, [GALYLEO_STRING, GALYLEO_NUMBER], data_start, os.path.getsize(path), data_start, block_rows = 2)
+    assert [list(array) for array in columns[0]] == [['c', 'a\nb'], ['d']]
+    rows = [[f'line {i}\n"quoted", and\n\nmore' if i % 3 == 0 else f'plain {i}', None if i % 5 == 0 else i] for i in range(200)]
+    with open(path, 'w', encoding = 'utf-8', newline = '') as csv_file:
+        csv_file.write('name,value\nstring,number\n')
+        for (name, value) in rows:
+            name = name.replace('"', '""')
+            csv_file.write(f'"{name}",{"" if value is None else value}\n')
+    (_, data_start) = read_csv_header(path)
+    ranges = record_boundaries(path, data_start, 7)
+    assert len(ranges) > 1 and ranges[0][0] == data_start and ranges[-1][1] == os.path.getsize(path)
+    for workers in [1, 3]:
+        server = create_server_from_csv('records', path, workers = workers)
+        assert server.get_rows() == rows
+        assert load_csv_columns(path, workers, block_rows = 4)[1][0].decode() == [row[0] for row in rows]
+    assert None not in server.all_values('value') and len(server.all_values('value')) == 160
+    assert server.numeric_spec('value') == {"max_val": 199.0, "min_val": 1.0, "increment": 1.0}
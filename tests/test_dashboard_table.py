@@ -32,6 +32,7 @@ Run tests on the dashboard table
 '''
 
 import csv
+import io
 from json import dumps
 
 import pandas as pd
@@ -200,6 +201,42 @@ def test_from_json():
     table.from_json(as_json, True)
     assert table.equal(reference_table, True)
 
+def test_from_json_stream(tmp_path):
+    '''
+    Test the streaming JSON loader
+    '''
+    schema = [{"name": "name", "type": "string"}, {"name": "age", "type": "number"}]
+    data = [['a', 1], ['b', 2]]
+    test_dict = {
+        "name": reference_table.name,
+        "table": {"columns": schema, "rows": data}
+        }
+    as_json = dumps(test_dict)
+    table = GalyleoTable('test')
+    table.from_json_stream(io.StringIO(as_json), False)
+    assert table.equal(reference_table)
+    assert table.name == 'test'
+    table.from_json_stream(io.BytesIO(as_json.encode('utf-8')), True, batch_rows = 1)
+    assert table.equal(reference_table, True)
+    path = str(tmp_path / 'table.json')
+    big_table = GalyleoTable('big')
+    big_table.load_from_dictionary({"columns": schema, "rows": [[f'name {i}', i * 1.5] for i in range(2500)]})
+    with open(path, 'w', encoding = 'utf-8') as json_file:
+        json_file.write(big_table.to_json())
+    table.from_json_stream(path, batch_rows = 1000)
+    assert table.equal(big_table, True)
+    # rows before columns
+    table.from_json_stream(io.StringIO(dumps({"table": {"rows": data, "columns": schema}, "name": "reordered"})))
+    assert table.equal(reference_table) and table.name == 'reordered'
+    with pytest.raises(InvalidDataException, match='Error found in JSON Decode'):
+        table.from_json_stream(io.StringIO(as_json[:-5]))
+    with pytest.raises(InvalidDataException, match='JSON form of table is missing fields'):
+        table.from_json_stream(io.StringIO(dumps({"table": test_dict["table"]})))
+    with pytest.raises(InvalidDataException, match='JSON  table descriptor is missing fields'):
+        table.from_json_stream(io.StringIO(dumps({"name": "a", "table": {"columns": schema}})))
+    with pytest.raises(InvalidDataException, match='Error found by schema checker'):
+        table.from_json_stream(io.StringIO(dumps({"name": "a", "table": {"columns": schema, "rows": [['a', 'b']]}})))
+    assert table.equal(reference_table) and table.name == 'reordered'
 
 #
 # test to_json
@@ -271,6 +308,8 @@ def test_aggregate_by():
     types = [entry["type"] for entry in table4.schema]
     assert types == [GALYLEO_STRING, GALYLEO_NUMBER, GALYLEO_NUMBER]
     assert table4.name == "aggregate_cr"
+    table5 = test_table.aggregate_by(["country", "rating"], workers = 2, min_rows = 2)
+    assert _lists_equal(table4.data, table5.data)
 
 #
 # A table to be used in testing filtering
@@ -412,3 +451,8 @@ def test_as_dictionary_remote():
     assert(table.as_dictionary() == {
         "name": "test1", "table": {"columns": schema, "connector": {"url": base_url, "header_variables": ['a', 'b']}}
     })
+    table = RemoteGalyleoTable('test1', schema, 'https://data.example.com/', interval = 60, push = True)
+    assert(table.as_dictionary() == {
+        "name": "test1", "table": {"columns": schema, "connector": {"url": 'https://data.example.com/', "interval": 60,
+                                                                    "push": {"protocol": "sse", "url": 'https://data.example.com/subscribe'}}}
+    })
@@ -0,0 +1,86 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test downsampling of chart rows
+'''
+
+import numpy
+import pytest
+
+from galyleo.galyleo_downsampling import downsample_rows, lttb_indices, minmax_indices, reservoir_indices
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_schema import Schema
+
+schema = Schema([{"name": "when", "type": "datetime"}, {"name": "label", "type": "string"}, {"name": "value", "type": "number"}])
+
+
+def test_indices():
+    '''
+    Test that each method keeps the endpoints and the features it promises to preserve
+    '''
+    x = numpy.arange(10000, dtype = numpy.float64)
+    y = numpy.sin(x / 100)
+    y[5000] = 10
+    y[7000] = -10
+    chosen = lttb_indices(x, y, 100)
+    assert len(chosen) == 100 and chosen[0] == 0 and chosen[-1] == 9999
+    assert numpy.all(numpy.diff(chosen) > 0)
+    assert 5000 in chosen and 7000 in chosen
+    chosen = minmax_indices(x, y, 100)
+    assert len(chosen) <= 100 and chosen[0] == 0 and chosen[-1] == 9999
+    assert 5000 in chosen and 7000 in chosen
+    assert numpy.array_equal(reservoir_indices(10000, 50), reservoir_indices(10000, 50))
+    assert len(numpy.unique(reservoir_indices(10000, 50))) == 50
+    assert numpy.array_equal(lttb_indices(x[:5], y[:5], 10), numpy.arange(5))
+
+
+def test_downsample_rows():
+    '''
+    Test downsample_rows on a table with a datetime x column, and its errors
+    '''
+    rows = [[f'2024-01-01T{i // 3600:02d}:{(i // 60) % 60:02d}:{i % 60:02d}', 'a', float(i % 100)] for i in range(5000)]
+    shuffled = rows[::-1] + [[None, 'b', 1.0], ['2024-01-01T00:00:00', 'c', None]]
+    for method in ['lttb', 'minmax', 'reservoir']:
+        result = downsample_rows(schema, shuffled, 200, method, 'when', 'value')
+        assert 0 < len(result) <= 200
+        assert result == sorted(result, key = lambda row: row[0])
+        assert all(row in rows for row in result)
+    assert downsample_rows(schema, rows, 200, 'lttb', 'when')[-1] == rows[-1]
+    assert len(downsample_rows(schema, rows, 200)) == 200
+    assert downsample_rows(schema, rows[:10], 200) == rows[:10]
+    with pytest.raises(InvalidDataException, match='Unknown downsampling method'):
+        downsample_rows(schema, rows, 200, 'average')
+    with pytest.raises(InvalidDataException, match='at least 3'):
+        downsample_rows(schema, rows, 2)
+    with pytest.raises(InvalidDataException, match='Cannot downsample on label'):
+        downsample_rows(schema, rows, 200, 'lttb', 'when', 'label')
+    with pytest.raises(InvalidDataException, match='not a column'):
+        downsample_rows(schema, rows, 200, 'lttb', 'no_such_column')
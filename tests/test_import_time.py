@@ -0,0 +1,81 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test that importing galyleo and its lightweight modules doesn't import the heavy dependencies
+'''
+
+import subprocess
+import sys
+from json import loads
+
+import pytest
+
+import galyleo
+
+LIGHT_MODULES = ['galyleo', 'galyleo.galyleo_table', 'galyleo.galyleo_jupyterlab_client']
+HEAVY_MODULES = ['numpy', 'gviz_api', 'pandas', 'ipykernel', 'flask', 'concurrent.futures.process']
+
+_IMPORT_SCRIPT = '''
+import json, sys
+import {module}
+print(json.dumps(sorted(sys.modules.keys())))
+'''
+
+
+def _cold_import(module):
+    '''
+    Import module in a fresh interpreter and return the names of the modules it imported
+    '''
+    output = subprocess.run([sys.executable, '-c', _IMPORT_SCRIPT.format(module = module)],
+                            capture_output = True, check = True, text = True).stdout
+    return loads(output)
+
+
+def test_no_heavy_imports():
+    '''
+    Test that the light modules don't import numpy, gviz_api, pandas, ipykernel or Flask
+    '''
+    for module in LIGHT_MODULES:
+        imported = set(_cold_import(module))
+        assert imported.isdisjoint(HEAVY_MODULES), (module, imported & set(HEAVY_MODULES))
+
+
+def test_lazy_namespace():
+    '''
+    Test that the names in the top-level galyleo namespace resolve to the module attributes
+    '''
+    from galyleo.galyleo_table import GalyleoTable  # pylint: disable=import-outside-toplevel
+    from galyleo.galyleo_server_framework import add_table_server  # pylint: disable=import-outside-toplevel
+    assert galyleo.GalyleoTable is GalyleoTable
+    assert galyleo.add_table_server is add_table_server
+    assert set(galyleo.__all__) <= set(dir(galyleo))
+    with pytest.raises(AttributeError):
+        galyleo.no_such_attribute  # pylint: disable=pointless-statement
@@ -0,0 +1,154 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test the live feed server
+'''
+
+import threading
+
+import pytest
+
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_live_feed import LiveFeedDataServer
+from galyleo.galyleo_server_framework import add_table_server, table_versions
+from galyleo.galyleo_table_registry import get_table_key
+from galyleo.galyleo_table_server import GalyleoDataServer
+
+schema = [{"name": "when", "type": "datetime"}, {"name": "sensor", "type": "string"}, {"name": "reading", "type": "number"}, {"name": "ok", "type": "boolean"}]
+
+
+def _rows(start, count):
+    return [[f'2024-05-01T00:{(i // 60) % 60:02d}:{i % 60:02d}', f's{i % 3}', float(i % 7), i % 2 == 0] for i in range(start, start + count)]
+
+
+def test_ring_buffer():
+    '''
+    Test that the feed keeps the newest capacity rows, and that its statistics track them
+    '''
+    feed = LiveFeedDataServer(schema, 10)
+    changes = []
+    feed.add_change_listener(lambda: changes.append(feed.num_rows()))
+    assert feed.get_rows() == []
+    for start in range(0, 25, 4):
+        feed.append_rows(_rows(start, 4))
+    expected = _rows(18, 10)
+    assert feed.get_rows() == expected
+    assert changes == [4, 8, 10, 10, 10, 10, 10]
+    reference = GalyleoDataServer(schema, lambda: expected)
+    spec = {"operator": "ALL", "arguments": [
+        {"operator": "IN_LIST", "column": "sensor", "values": ["s0", "s2"]},
+        {"operator": "IN_RANGE", "column": "when", "min_val": "2024-05-01T00:00:20", "max_val": "2024-05-01T00:00:26"}
+    ]}
+    assert feed.get_filtered_rows(spec) == reference.get_filtered_rows(spec)
+    for column in ['sensor', 'reading', 'ok']:
+        assert feed.all_values(column) == reference.all_values(column)
+    assert feed.numeric_spec('reading') == reference.numeric_spec('reading')
+    assert feed.column_summary('sensor') == reference.column_summary('sensor')
+    assert feed.column_summary('reading', 3, [0.1, 0.5, 0.9]) == reference.column_summary('reading', 3, [0.1, 0.5, 0.9])
+    feed.append_rows(_rows(100, 25))
+    assert feed.get_rows() == _rows(115, 10)
+    with pytest.raises(InvalidDataException, match='All rows must have length 4'):
+        feed.append_rows([[None, 's0', 1.0]])
+    with pytest.raises(InvalidDataException):
+        feed.append_rows([['not a time', 's0', 1.0, True]])
+    with pytest.raises(InvalidDataException, match='missing values'):
+        feed.append_rows([['2021-01-01T00:00:00', 's0', 1.0, None]])
+    assert feed.get_rows() == _rows(115, 10)
+
+
+def test_string_compaction():
+    '''
+    Test that the strings of a feed are compacted, so memory stays bounded
+    '''
+    feed = LiveFeedDataServer([{"name": "label", "type": "string"}], 5)
+    for i in range(100):
+        feed.append_rows([[f'label{i}'], [None]])
+    assert len(feed._ring[0].strings) <= 10  # pylint: disable=protected-access
+    assert feed.get_rows() == [[None], ['label98'], [None], ['label99'], [None]]
+    assert feed.all_values('label') == ['label98', 'label99']
+    assert feed.column_summary('label')["missing"] == 3
+
+
+def test_time_window():
+    '''
+    Test retention by a time window, and its errors
+    '''
+    feed = LiveFeedDataServer(schema, 1000, 'when', 30)
+    feed.append_rows(_rows(0, 50))
+    assert feed.get_rows() == _rows(19, 31)
+    feed.append_rows(_rows(90, 1))
+    assert feed.get_rows() == _rows(90, 1)
+    with pytest.raises(InvalidDataException, match='time column'):
+        LiveFeedDataServer(schema, 10, 'sensor', 30)
+    with pytest.raises(InvalidDataException, match='positive time_window'):
+        LiveFeedDataServer(schema, 10, 'when')
+
+
+def test_consistent_snapshots():
+    '''
+    Test that concurrent reads see whole batches while a writer appends
+    '''
+    feed = LiveFeedDataServer(schema, 1000)
+    batch = 50
+    done = threading.Event()
+    sizes = []
+    def writer():
+        for start in range(0, 3000, batch):
+            feed.append_rows(_rows(start, batch))
+        done.set()
+    thread = threading.Thread(target = writer)
+    thread.start()
+    while not done.is_set():
+        sizes.append(len(feed.get_filtered_rows({"operator": "ALL", "arguments": []})))
+    thread.join()
+    assert all(size % batch == 0 for size in sizes)
+    assert feed.num_rows() == 1000
+
+
+def test_feed_notifies_subscribers():
+    '''
+    Test that appending to a registered feed bumps the version of its table once, however
+    often it is registered, and not at all once it has been replaced
+    '''
+    feed = LiveFeedDataServer(schema, 10)
+    add_table_server('feed_table', feed)
+    version = table_versions.version(get_table_key('feed_table', None))
+    feed.append_rows(_rows(0, 3))
+    assert table_versions.version(get_table_key('feed_table', None)) == version + 1
+    for _ in range(3):
+        add_table_server('feed_table', feed)
+    version = table_versions.version(get_table_key('feed_table', None))
+    feed.append_rows(_rows(3, 1))
+    assert table_versions.version(get_table_key('feed_table', None)) == version + 1
+    add_table_server('feed_table', LiveFeedDataServer(schema, 10))
+    version = table_versions.version(get_table_key('feed_table', None))
+    feed.append_rows(_rows(4, 1))
+    assert table_versions.version(get_table_key('feed_table', None)) == version
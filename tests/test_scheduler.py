@@ -0,0 +1,157 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test the feed scheduler and the /start and /get_feed_status routes
+'''
+
+import threading
+import time
+from json import loads
+
+import pytest
+from flask import Flask
+
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_scheduler import FeedScheduler
+from galyleo.galyleo_server_framework import add_refresh_job, feed_scheduler, galyleo_server_blueprint
+
+
+def _wait_for(condition, timeout = 5):
+    '''
+    Wait until condition() is true, failing after timeout seconds
+    '''
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for the scheduler'
+        time.sleep(0.01)
+
+
+def test_runs_and_failures():
+    '''
+    Test that jobs run repeatedly, that failures are recorded and backed off, and that
+    jobs never overlap
+    '''
+    scheduler = FeedScheduler(max_workers = 2, jitter = 0, max_backoff = 0.2)
+    runs = []
+    active = []
+    def slow():
+        active.append(1)
+        assert len(active) == 1
+        time.sleep(0.05)
+        runs.append(time.monotonic())
+        active.pop()
+    def broken():
+        raise ValueError('no data')
+    scheduler.add_job('slow', slow, 0.01, timeout = 1)
+    scheduler.add_job('broken', broken, 0.05)
+    assert scheduler.start() and not scheduler.start()
+    _wait_for(lambda: len(runs) >= 3 and scheduler.status()["feeds"]["broken"]["failures"] >= 3)
+    scheduler.stop()
+    status = scheduler.status()
+    assert not status["running"]
+    assert status["feeds"]["slow"]["last_error"] is None and status["feeds"]["slow"]["last_duration"] >= 0.05
+    assert status["feeds"]["broken"]["last_error"] == 'ValueError: no data'
+    assert status["feeds"]["broken"]["consecutive_failures"] == status["feeds"]["broken"]["failures"]
+    with pytest.raises(InvalidDataException, match='must be positive'):
+        scheduler.add_job('bad', slow, 0)
+
+
+def test_timeout():
+    '''
+    Test that a run which takes longer than its timeout is a failure, and isn't overlapped
+    '''
+    scheduler = FeedScheduler(jitter = 0)
+    release = threading.Event()
+    calls = []
+    def stuck():
+        calls.append(1)
+        release.wait(5)
+    scheduler.add_job('stuck', stuck, 0.01, timeout = 0.05)
+    scheduler.start()
+    _wait_for(lambda: scheduler.status()["feeds"]["stuck"]["failures"] == 1)
+    status = scheduler.status()["feeds"]["stuck"]
+    assert status["running"] and status["last_error"] == 'timed out after 0.05 seconds' and len(calls) == 1
+    release.set()
+    _wait_for(lambda: scheduler.status()["feeds"]["stuck"]["runs"] >= 1)
+    scheduler.stop()
+
+
+def test_replace_running_job():
+    '''
+    Test that a job which replaces a running job takes over its run rather than overlapping it
+    '''
+    scheduler = FeedScheduler(jitter = 0)
+    release = threading.Event()
+    active = []
+    replacement_calls = []
+    def old_feed():
+        active.append(1)
+        release.wait(5)
+        active.pop()
+    def new_feed():
+        assert len(active) == 0
+        replacement_calls.append(1)
+    scheduler.add_job('feed', old_feed, 0.01, timeout = 5)
+    scheduler.start()
+    _wait_for(lambda: len(active) == 1)
+    scheduler.add_job('feed', new_feed, 0.01, timeout = 5)
+    time.sleep(0.05)
+    status = scheduler.status()["feeds"]["feed"]
+    assert status["running"] and status["next_run_in"] is None and len(replacement_calls) == 0
+    release.set()
+    _wait_for(lambda: len(replacement_calls) >= 2)
+    scheduler.stop()
+    status = scheduler.status()["feeds"]["feed"]
+    assert not status["running"] and status["runs"] >= 3 and status["failures"] == 0
+
+
+def test_start_route():
+    '''
+    Test that /start starts the framework's scheduler, and /get_feed_status reports on it
+    '''
+    refreshed = []
+    # no jitter, so that the first refresh runs as soon as the scheduler starts
+    (jitter, feed_scheduler.jitter) = (feed_scheduler.jitter, 0)
+    add_refresh_job('scheduled_table', lambda: refreshed.append(1), 60)
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    try:
+        assert not loads(client.get('/get_feed_status').data)["running"]
+        assert loads(client.get('/start').data)["running"]
+        _wait_for(lambda: len(refreshed) == 1)
+        status = loads(client.get('/get_feed_status').data)
+        assert status["running"] and status["feeds"]["scheduled_table"]["runs"] == 1
+        assert status["feeds"]["scheduled_table"]["last_run"] is not None
+    finally:
+        feed_scheduler.stop()
+        feed_scheduler.remove_job('scheduled_table')
+        feed_scheduler.jitter = jitter
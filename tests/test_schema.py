@@ -0,0 +1,112 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test the Schema class
+'''
+
+import copy
+import pickle
+import pytest
+from galyleo.galyleo_constants import GALYLEO_NUMBER, GALYLEO_STRING
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_schema import Schema, as_schema
+from galyleo.galyleo_table import GalyleoTable
+from galyleo.galyleo_table_server import Filter, GalyleoDataServer
+
+schema_list = [{"name": "name", "type": GALYLEO_STRING}, {"name": "age", "type": GALYLEO_NUMBER}]
+
+def test_schema():
+    '''
+    Test construction, lookup, equality, hashing and immutability of a Schema
+    '''
+    schema = Schema(schema_list)
+    assert len(schema) == 2
+    assert list(schema) == schema_list
+    assert schema == schema_list
+    assert schema_list == schema
+    assert schema.to_list() == schema_list
+    assert schema[1] == {"name": "age", "type": GALYLEO_NUMBER}
+    assert schema[1:] == schema_list[1:]
+    assert schema.names == ("name", "age")
+    assert schema.types == (GALYLEO_STRING, GALYLEO_NUMBER)
+    assert schema.index("age") == 1
+    assert schema.type_of("name") == GALYLEO_STRING
+    assert schema.type_of("height") is None
+    with pytest.raises(ValueError):
+        schema.index("height")
+    assert Schema(schema) == schema
+    assert hash(Schema(schema_list)) == hash(schema)
+    assert as_schema(schema) is schema
+    assert {schema: 1}[Schema(schema_list)] == 1
+    assert schema != Schema(schema_list[:1])
+    with pytest.raises(AttributeError):
+        schema.names = ("a", "b")
+    schema[0]["name"] = "changed"
+    assert schema.names[0] == "name"
+    with pytest.raises(InvalidDataException):
+        Schema([("name", GALYLEO_STRING)])
+
+def test_schema_copy_and_pickle():
+    '''
+    Test that a Schema, and a table holding one, survive copy, deepcopy and a pickle round trip
+    '''
+    schema = Schema(schema_list)
+    assert copy.copy(schema) is schema
+    assert copy.deepcopy(schema) is schema
+    restored = pickle.loads(pickle.dumps(schema))
+    assert restored == schema and hash(restored) == hash(schema)
+    assert restored.index("age") == 1
+    table = GalyleoTable('pickle_test')
+    table.load_from_dictionary({"columns": schema_list, "rows": [["a", 1]]})
+    table_copy = copy.deepcopy(table)
+    assert table_copy.schema is table.schema
+    assert table_copy.data == table.data and table_copy.data is not table.data
+    restored_table = pickle.loads(pickle.dumps(table))
+    assert restored_table.schema == table.schema
+    assert restored_table.as_dictionary() == table.as_dictionary()
+
+def test_schema_users():
+    '''
+    Test that tables, servers and filters share the Schema, and that tables still serialize
+    the schema as a list of records
+    '''
+    table = GalyleoTable('schema_test')
+    table.load_from_dictionary({"columns": schema_list, "rows": [["a", 1], ["b", 2]]})
+    assert isinstance(table.schema, Schema)
+    assert table.as_dictionary()["table"]["columns"] == schema_list
+    server = GalyleoDataServer(table.schema, lambda: table.data)
+    assert server.schema is table.schema
+    assert server.get_column_type("age") == GALYLEO_NUMBER
+    assert server.column_names() == ["name", "age"]
+    spec = {"operator": "IN_LIST", "column": "name", "values": ["b"]}
+    assert Filter(spec, server.schema).filter(table.data) == [["b", 2]]
+    assert Filter(spec, server.column_names()).filter(table.data) == [["b", 2]]
+    assert server.get_filtered_rows(spec) == [["b", 2]]
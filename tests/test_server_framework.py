@@ -34,13 +34,24 @@ Test Module for the GalyleoServerFramework
 
 
 # from urllib import response
+import pstats
+import threading
+import time
 from json import loads, dumps
 # import pytest
 import pandas as pd
+import pytest
 from flask import Flask
 from galyleo.galyleo_constants import GALYLEO_NUMBER, GALYLEO_STRING
-from galyleo.galyleo_server_framework import  galyleo_server_blueprint, add_table_server
+from galyleo.galyleo_server_framework import  galyleo_server_blueprint, add_table_server, configure_fan_out
+from galyleo.galyleo_server_framework import configure_subscriptions, notify_table_changed, configure_profiling
+from galyleo.galyleo_server_framework import _fan_out
+from galyleo.galyleo_metrics import MetricsRegistry, metrics
+from galyleo.galyleo_table_registry import TableRegistry
 from galyleo.galyleo_table_server import GalyleoDataServer
+from galyleo.galyleo_columns import ColumnarDataServer
+from galyleo.galyleo_columnar_file import ColumnarFileDataServer, write_columnar_table
+from galyleo.galyleo_sqlite_server import SQLiteDataServer
 
 
 
@@ -130,3 +141,416 @@ def test_server_framework():
     actual_response = galyleo_response.get_data(as_text = True)
     result = loads(actual_response)
     assert expected == result
+
+def test_fan_out():
+    '''
+    Test that requests spanning several servers run concurrently, that slow
+    servers (and servers whose calls are queued behind hung calls) are dropped
+    after the timeout, and that results are merged
+    '''
+    # each call waits until all four are running, so this only finishes if they overlap
+    barrier = threading.Barrier(4, timeout = 10)
+    def meet(value):
+        barrier.wait()
+        return value
+    configure_fan_out(max_workers = 4, timeout = 30)
+    assert sorted(_fan_out('test', meet, [1, 2, 3, 4])) == [1, 2, 3, 4]
+    release = threading.Event()
+    def hang_unless_fast(value):
+        if value != 'fast':
+            release.wait()
+        return value
+    configure_fan_out(max_workers = 2, timeout = 0.5)
+    assert _fan_out('test', hang_unless_fast, ['fast', 'hung']) == ['fast']
+    assert _fan_out('test', hang_unless_fast, ['hung', 'hung']) == []
+    # both workers are now hung, so these calls stay queued; they are dropped, never run
+    ran = []
+    assert _fan_out('test', ran.append, [1, 2]) == []
+    assert ran == []
+    release.set()
+    configure_fan_out(max_workers = 4, timeout = 30)
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    fan_out_schema = [{"name": "fan_out_value", "type": GALYLEO_NUMBER}]
+    add_table_server('fan_out_1', GalyleoDataServer(fan_out_schema, lambda: [[1], [3], [5]]))
+    add_table_server('fan_out_2', GalyleoDataServer(fan_out_schema, lambda: [[2], [4], [12]]))
+    client = app.test_client()
+    galyleo_response = client.get('/get_numeric_spec?column_name=fan_out_value')
+    assert galyleo_response.status == '200 OK'
+    assert loads(galyleo_response.get_data(as_text = True)) == {"max_val": 12, "min_val": 1, "increment": 2}
+    galyleo_response = client.get('/get_all_values?column_name=fan_out_value')
+    assert loads(galyleo_response.get_data(as_text = True)) == [1, 2, 3, 4, 5, 12]
+
+def test_table_registry():
+    '''
+    Test the dashboard and column indices of the table registry, and that the
+    column routes only search the tables of the requested dashboard
+    '''
+    registry = TableRegistry()
+    number_schema = [{"name": "registry_value", "type": GALYLEO_NUMBER}]
+    string_schema = [{"name": "registry_value", "type": GALYLEO_STRING}]
+    server_1 = GalyleoDataServer(number_schema, lambda: [[1], [2], [3]])
+    server_2 = GalyleoDataServer(string_schema, lambda: [['a'], ['b']])
+    server_3 = GalyleoDataServer(number_schema, lambda: [[10], [20], [30]])
+    registry.add('d_table', server_1)
+    registry.add('table_1', server_1, 'dashboard_1')
+    registry.add('table_2', server_2, 'dashboard_1')
+    registry.add('table_3', server_3, 'dashboard_2')
+    assert len(registry) == 4
+    assert registry.tables('d') == []
+    assert registry.tables('dashboard_1') == [server_1, server_2]
+    assert registry.get('table_3', 'dashboard_2') is server_3
+    assert ('dashboard_2', 'table_3') in registry
+    assert registry.servers_with_column('registry_value', 'dashboard_1') == [(server_1, GALYLEO_NUMBER), (server_2, GALYLEO_STRING)]
+    assert len(registry.servers_with_column('registry_value')) == 4
+    assert registry.servers_with_column('no_such_column') == []
+    assert registry.keys_of(server_1) == ['d_table', ('dashboard_1', 'table_1')]
+    registry.add('table_1', server_3, 'dashboard_1')
+    assert registry.keys_of(server_1) == ['d_table']
+    assert registry.servers_with_column('registry_value', 'dashboard_1') == [(server_2, GALYLEO_STRING), (server_3, GALYLEO_NUMBER)]
+    registry.remove('table_2', 'dashboard_1')
+    assert registry.tables('dashboard_1') == [server_3]
+    assert len(registry.servers_with_column('registry_value')) == 3
+    registry[('dashboard_1', 'table_2')] = server_2
+    registry['table_4'] = server_2
+    assert registry.tables('dashboard_1') == [server_3, server_2]
+    assert registry.get('table_4') is server_2
+    assert len(registry.servers_with_column('registry_value')) == 5
+    del registry[('dashboard_1', 'table_2')]
+    del registry['table_4']
+    assert registry.tables('dashboard_1') == [server_3]
+    assert len(registry.servers_with_column('registry_value')) == 3
+    with pytest.raises(KeyError):
+        del registry['table_4']
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    add_table_server('registry_1', server_1, 'registry_dashboard_1')
+    add_table_server('registry_2', server_2, 'registry_dashboard_1')
+    add_table_server('registry_3', server_3, 'registry_dashboard_2')
+    client = app.test_client()
+    headers = {"Dashboard-Name": 'registry_dashboard_1'}
+    galyleo_response = client.get('/get_numeric_spec?column_name=registry_value', headers = headers)
+    assert loads(galyleo_response.get_data(as_text = True)) == {"max_val": 3, "min_val": 1, "increment": 1}
+    galyleo_response = client.get('/get_all_values?column_name=registry_value', headers = {"Dashboard-Name": 'registry_dashboard_2'})
+    assert loads(galyleo_response.get_data(as_text = True)) == [10, 20, 30]
+    galyleo_response = client.get('/get_all_values?column_name=registry_value', headers = {"Dashboard-Name": 'registry'})
+    assert galyleo_response.status_code == 400
+
+def test_batch():
+    '''
+    Test that /batch evaluates its sub-requests with one get_rows() call per table, and
+    reports errors per sub-request
+    '''
+    calls = []
+    def get_rows():
+        calls.append(1)
+        return [[1, 'a'], [2, 'b'], [3, 'a']]
+    batch_schema = [{"name": "batch_value", "type": GALYLEO_NUMBER}, {"name": "batch_name", "type": GALYLEO_STRING}]
+    add_table_server('batch_table', GalyleoDataServer(batch_schema, get_rows), 'batch_dashboard')
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    table = {"table_name": 'batch_table', "dashboard_name": 'batch_dashboard'}
+    spec = {"operator": "IN_LIST", "column": "batch_name", "values": ["a"]}
+    sub_requests = [
+        dict(table, route = '/get_table_spec'),
+        dict(table, route = '/get_all_values', column_name = 'batch_name'),
+        {"route": '/get_all_values', "column_name": 'batch_name', "dashboard_name": 'batch_dashboard'},
+        dict(table, route = '/get_numeric_spec', column_name = 'batch_value'),
+        dict(table, route = '/get_filtered_rows', filter_spec = spec),
+        dict(table, route = '/get_filtered_rows'),
+        dict(table, route = '/get_numeric_spec', column_name = 'batch_name'),
+        {"route": '/get_filtered_rows', "table_name": 'no_such_table'},
+        {"route": '/no_such_route'}
+    ]
+    galyleo_response = client.post('/batch', json = sub_requests)
+    assert galyleo_response.status == '200 OK'
+    result = loads(galyleo_response.get_data(as_text = True))
+    assert [entry["status"] for entry in result] == [200, 200, 200, 200, 200, 200, 400, 400, 400]
+    assert result[0]["result"] == {"schema": batch_schema, "header_variables": {"required": [], "optional": []}}
+    assert result[1]["result"] == ['a', 'b']
+    assert result[2]["result"] == ['a', 'b']
+    assert result[3]["result"] == {"max_val": 3, "min_val": 1, "increment": 1}
+    assert result[4]["result"] == [[1, 'a'], [3, 'a']]
+    assert len(result[5]["result"]) == 3
+    assert len(calls) == 1
+    galyleo_response = client.post('/batch', json = {"route": '/get_table_spec'})
+    assert galyleo_response.status_code == 400
+
+def test_batch_numeric_spec_not_shared():
+    '''
+    Test that merging numeric specs across tables in a /batch doesn't change the cached
+    spec of a single table
+    '''
+    merge_schema = [{"name": "merge_value", "type": GALYLEO_NUMBER}]
+    add_table_server('merge_a', GalyleoDataServer(merge_schema, lambda: [[1], [3], [5]]), 'merge_dashboard')
+    add_table_server('merge_b', GalyleoDataServer(merge_schema, lambda: [[0], [10], [10.5]]), 'merge_dashboard')
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    sub_requests = [
+        {"route": '/get_numeric_spec', "column_name": 'merge_value', "table_name": 'merge_a', "dashboard_name": 'merge_dashboard'},
+        {"route": '/get_numeric_spec', "column_name": 'merge_value', "dashboard_name": 'merge_dashboard'}
+    ]
+    result = loads(client.post('/batch', json = sub_requests).get_data(as_text = True))
+    assert result[0]["result"] == {"max_val": 5, "min_val": 1, "increment": 2}
+    assert result[1]["result"] == {"max_val": 10.5, "min_val": 0, "increment": 0.5}
+
+def test_snapshot_age_header():
+    '''
+    Test that requests served from a snapshot carry the Snapshot-Age header
+    '''
+    snapshot_schema = [{"name": "snapshot_value", "type": GALYLEO_NUMBER}]
+    snapshot_server = GalyleoDataServer(snapshot_schema, lambda: [[1], [2]], refresh_interval = 60)
+    add_table_server('snapshot_table', snapshot_server, 'snapshot_dashboard')
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    headers = {"Table-Name": 'snapshot_table', "Dashboard-Name": 'snapshot_dashboard'}
+    galyleo_response = client.get('/get_filtered_rows', headers = headers)
+    assert loads(galyleo_response.get_data(as_text = True)) == [[1], [2]]
+    assert float(galyleo_response.headers['Snapshot-Age']) < 60
+    galyleo_response = client.get('/get_all_values?column_name=snapshot_value', headers = {"Dashboard-Name": 'snapshot_dashboard'})
+    assert 'Snapshot-Age' in galyleo_response.headers
+    galyleo_response = client.get('/hello')
+    assert 'Snapshot-Age' not in galyleo_response.headers
+    snapshot_server.get_rows.stop()
+
+def test_subscribe():
+    '''
+    Test that /subscribe streams the current data versions, then an event for each change
+    to a subscribed table, and is closed after the maximum duration
+    '''
+    subscribe_schema = [{"name": "subscribe_value", "type": GALYLEO_NUMBER}]
+    add_table_server('subscribe_1', GalyleoDataServer(subscribe_schema, lambda: [[1]]), 'subscribe_dashboard')
+    add_table_server('subscribe_2', GalyleoDataServer(subscribe_schema, lambda: [[2]]), 'subscribe_dashboard')
+    configure_subscriptions(keepalive = 0.1, max_duration = 1)
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    galyleo_response = client.get('/subscribe?table_name=subscribe_1&dashboard_name=subscribe_dashboard')
+    assert galyleo_response.mimetype == 'text/event-stream'
+    stream = iter(galyleo_response.response)
+    def next_event():
+        event = next(stream)
+        event = event.decode() if isinstance(event, bytes) else event
+        return loads(event.split('data: ')[1]) if event.startswith('event: change') else None
+    first = next_event()
+    assert first["table_name"] == 'subscribe_1' and first["dashboard_name"] == 'subscribe_dashboard'
+    notify_table_changed('subscribe_2', 'subscribe_dashboard')
+    assert next_event() is None
+    version = notify_table_changed('subscribe_1', 'subscribe_dashboard')
+    assert next_event() == {"table_name": 'subscribe_1', "dashboard_name": 'subscribe_dashboard', "version": version}
+    assert len(list(stream)) < 20
+    galyleo_response.close()
+    configure_subscriptions(keepalive = 15, max_duration = 300)
+    assert client.get('/subscribe').status_code == 400
+    assert client.get('/subscribe?table_name=no_such_table').status_code == 400
+
+def test_downsampled_rows():
+    '''
+    Test that /get_filtered_rows downsamples when a Max-Points header is sent
+    '''
+    series_schema = [{"name": "series_x", "type": GALYLEO_NUMBER}, {"name": "series_y", "type": GALYLEO_NUMBER}]
+    series_rows = [[i, (i * 7) % 13] for i in range(2000)]
+    add_table_server('series_table', GalyleoDataServer(series_schema, lambda: series_rows))
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    headers = {"Table-Name": 'series_table', "Max-Points": '100', "Downsample-X": 'series_x', "Downsample-Y": 'series_y'}
+    rows = loads(client.get('/get_filtered_rows', headers = headers).data)
+    assert len(rows) == 100 and rows[0] == [0, 0] and rows[-1] == series_rows[-1]
+    headers["Filter-Spec"] = dumps({"operator": "IN_RANGE", "column": "series_x", "min_val": 0, "max_val": 999})
+    headers["Downsample-Method"] = 'minmax'
+    rows = loads(client.get('/get_filtered_rows', headers = headers).data)
+    assert len(rows) <= 100 and rows[-1] == [999, (999 * 7) % 13]
+    headers["Downsample-Method"] = 'bogus'
+    assert client.get('/get_filtered_rows', headers = headers).status_code == 400
+    headers["Max-Points"] = 'many'
+    assert client.get('/get_filtered_rows', headers = headers).status_code == 400
+    assert len(loads(client.get('/get_filtered_rows', headers = {"Table-Name": 'series_table'}).data)) == 2000
+
+def test_column_summary():
+    '''
+    Test the /get_column_summary route, exact and sketched
+    '''
+    summary_schema = [{"name": "summary_name", "type": GALYLEO_STRING}, {"name": "summary_value", "type": GALYLEO_NUMBER}]
+    summary_rows = [[f'n{i % 4}', i] for i in range(100)]
+    add_table_server('summary_table', GalyleoDataServer(summary_schema, lambda: summary_rows))
+    add_table_server('sketched_table', GalyleoDataServer(summary_schema, lambda: summary_rows, single_flight = True, reuse_window = 60, sketches = True))
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    galyleo_response = client.get('/get_column_summary?column_name=summary_value&top_k=2&quantiles=0.5,1', headers = {"Table-Name": 'summary_table'})
+    assert galyleo_response.status_code == 200
+    summary = loads(galyleo_response.data)
+    assert summary["exact"] and summary["cardinality"]["estimate"] == 100
+    assert summary["quantiles"] == [{"q": 0.5, "value": 49}, {"q": 1.0, "value": 99}]
+    summary = loads(client.get('/get_column_summary?column_name=summary_name', headers = {"Table-Name": 'sketched_table'}).data)
+    assert not summary["exact"] and summary["top_values"][0]["count"] == 25
+    assert client.get('/get_column_summary', headers = {"Table-Name": 'summary_table'}).status_code == 400
+    assert client.get('/get_column_summary?column_name=summary_value&top_k=x', headers = {"Table-Name": 'summary_table'}).status_code == 400
+    assert client.get('/get_column_summary?column_name=no_such_column', headers = {"Table-Name": 'summary_table'}).status_code == 400
+    assert client.get('/get_column_summary?column_name=summary_value').status_code == 400
+
+def test_metrics():
+    '''
+    Test that requests are counted and timed by route and table, and that /metrics
+    exports them in the Prometheus text format
+    '''
+    registry = MetricsRegistry()
+    registry.increment('test_total', {"route": '/a"b'})
+    registry.observe('test_seconds', {}, 0.003)
+    registry.observe('test_seconds', {}, 100)
+    text = registry.render()
+    assert 'test_total{route="/a\\"b"} 1' in text
+    assert 'test_seconds_bucket{le="0.005"} 1' in text
+    assert 'test_seconds_bucket{le="+Inf"} 2' in text
+    assert 'test_seconds_count 2' in text
+    metrics_schema = [{"name": "metrics_value", "type": GALYLEO_NUMBER}]
+    add_table_server('metrics_table', GalyleoDataServer(metrics_schema, lambda: [[1], [2], [3]]), 'metrics_dashboard')
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    labels = {"route": '/get_filtered_rows', "table": 'metrics_dashboard/metrics_table'}
+    before = metrics.counter_value('galyleo_requests_total', labels)
+    headers = {"Table-Name": 'metrics_table', "Dashboard-Name": 'metrics_dashboard'}
+    headers['Filter-Spec'] = dumps({"operator": "IN_RANGE", "column": "metrics_value", "min_val": 2, "max_val": 3})
+    assert client.get('/get_filtered_rows', headers = headers).status_code == 200
+    headers['Filter-Spec'] = dumps({"operator": "IN_RANGE", "column": "no_such_column", "min_val": 2, "max_val": 3})
+    assert client.get('/get_filtered_rows', headers = headers).status_code == 400
+    assert metrics.counter_value('galyleo_requests_total', labels) == before + 2
+    assert metrics.counter_value('galyleo_request_errors_total', labels) >= 1
+    assert metrics.histogram('galyleo_filter_seconds', {"table": 'metrics_dashboard/metrics_table'}).count >= 1
+    assert metrics.histogram('galyleo_rows_returned', labels).sum >= 2
+    client.get('/get_all_values?column_name=metrics_value', headers = {"Dashboard-Name": 'metrics_dashboard'})
+    assert metrics.histogram('galyleo_statistics_seconds', {"table": 'metrics_dashboard/metrics_table', "operation": 'all_values'}).count >= 1
+    client.get('/get_filtered_rows', headers = {"Table-Name": 'not_registered'})
+    galyleo_response = client.get('/metrics')
+    assert galyleo_response.status_code == 200
+    text = galyleo_response.get_data(as_text = True)
+    assert '# TYPE galyleo_request_seconds histogram' in text
+    assert 'galyleo_requests_total{route="/get_filtered_rows",table="metrics_dashboard/metrics_table"}' in text
+    assert 'table="unknown"' in text
+    assert 'not_registered' not in text
+
+def test_profiling(tmp_path):
+    '''
+    Test that requests with the profiling headers are profiled into a bounded directory,
+    and that profiles can be listed and downloaded with the token
+    '''
+    profile_schema = [{"name": "profile_value", "type": GALYLEO_NUMBER}]
+    add_table_server('profile_table', GalyleoDataServer(profile_schema, lambda: [[1], [2], [3]]))
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    headers = {"Table-Name": 'profile_table', "Galyleo-Profile": '1', "Galyleo-Profile-Token": 'secret'}
+    galyleo_response = client.get('/get_filtered_rows', headers = headers)
+    assert galyleo_response.status_code == 200
+    assert 'Galyleo-Profile-Name' not in galyleo_response.headers
+    assert client.get('/profiles', headers = headers).status_code == 404
+    configure_profiling(str(tmp_path), 'secret', max_profiles = 2)
+    try:
+        spec = {"operator": "IN_LIST", "column": "profile_value", "values": [1]}
+        headers['Filter-Spec'] = dumps(spec)
+        names = []
+        for i in range(3):
+            galyleo_response = client.get('/get_filtered_rows', headers = headers)
+            assert galyleo_response.status_code == 200
+            assert loads(galyleo_response.get_data(as_text = True)) == [[1]]
+            names.append(galyleo_response.headers['Galyleo-Profile-Name'])
+        bad_headers = dict(headers, **{"Galyleo-Profile-Token": 'wrong'})
+        assert client.get('/get_filtered_rows', headers = bad_headers).status_code == 403
+        for value in ['0', '']:
+            galyleo_response = client.get('/get_filtered_rows', headers = dict(bad_headers, **{"Galyleo-Profile": value}))
+            assert galyleo_response.status_code == 200
+            assert 'Galyleo-Profile-Name' not in galyleo_response.headers
+        assert client.get('/profiles', headers = bad_headers).status_code == 403
+        galyleo_response = client.get('/profiles', headers = headers)
+        listing = loads(galyleo_response.get_data(as_text = True))
+        assert [entry["name"] for entry in listing] == [names[2], names[1]]
+        assert listing[0]["table"] == 'profile_table'
+        assert loads(listing[0]["filter_spec"]) == spec
+        assert listing[0]["status"] == 200
+        galyleo_response = client.get(f'/profiles/{names[2]}', headers = headers)
+        assert galyleo_response.status_code == 200
+        profile_path = tmp_path / 'downloaded.prof'
+        profile_path.write_bytes(galyleo_response.get_data())
+        assert pstats.Stats(str(profile_path)).total_calls > 0
+        assert client.get(f'/profiles/{names[0]}', headers = headers).status_code == 404
+        assert client.get('/profiles/..%2F..%2Fetc', headers = headers).status_code == 404
+    finally:
+        configure_profiling(None)
+
+def test_aggregated_rows():
+    '''
+    Test the /get_aggregated_rows route and its errors
+    '''
+    sales_schema = [{"name": "sales_region", "type": GALYLEO_STRING}, {"name": "sales_amount", "type": GALYLEO_NUMBER}]
+    sales_rows = [[f'r{i % 3}', i] for i in range(30)]
+    add_table_server('sales_table', GalyleoDataServer(sales_schema, lambda: sales_rows))
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    aggregate_spec = {"group_by": ["sales_region"], "aggregates": [{"operator": "count"}, {"operator": "sum", "column": "sales_amount", "name": "total"}]}
+    headers = {"Table-Name": 'sales_table', "Aggregate-Spec": dumps(aggregate_spec)}
+    result = loads(client.get('/get_aggregated_rows', headers = headers).data)
+    assert [column["name"] for column in result["columns"]] == ['sales_region', 'count', 'total']
+    assert result["rows"] == [['r0', 10, 135], ['r1', 10, 145], ['r2', 10, 155]]
+    headers["Filter-Spec"] = dumps({"operator": "IN_RANGE", "column": "sales_amount", "min_val": 0, "max_val": 5})
+    assert loads(client.get('/get_aggregated_rows', headers = headers).data)["rows"] == [['r0', 2, 3], ['r1', 2, 5], ['r2', 2, 7]]
+    headers["Aggregate-Spec"] = dumps({"aggregates": [{"operator": "mean", "column": "sales_region"}]})
+    assert client.get('/get_aggregated_rows', headers = headers).status_code == 400
+    headers["Aggregate-Spec"] = '{"group_by": '
+    assert client.get('/get_aggregated_rows', headers = headers).status_code == 400
+    assert client.get('/get_aggregated_rows', headers = {"Table-Name": 'sales_table'}).status_code == 400
+
+def test_paged_rows():
+    '''
+    Test the Row-Offset and Row-Limit headers of /get_filtered_rows
+    '''
+    page_schema = [{"name": "page_index", "type": GALYLEO_NUMBER}]
+    page_rows = [[i] for i in range(50)]
+    add_table_server('page_table', GalyleoDataServer(page_schema, lambda: page_rows))
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    headers = {"Table-Name": 'page_table', "Row-Offset": '10', "Row-Limit": '5'}
+    assert loads(client.get('/get_filtered_rows', headers = headers).data) == page_rows[10:15]
+    headers["Filter-Spec"] = dumps({"operator": "IN_RANGE", "column": "page_index", "min_val": 40, "max_val": 100})
+    assert loads(client.get('/get_filtered_rows', headers = headers).data) == []
+    del headers["Row-Offset"]
+    assert loads(client.get('/get_filtered_rows', headers = headers).data) == page_rows[40:45]
+    headers["Row-Limit"] = '-1'
+    assert client.get('/get_filtered_rows', headers = headers).status_code == 400
+
+def test_range_bound_types(tmp_path):
+    '''
+    Test that IN_RANGE bounds of the wrong type for their column give a 400 from every kind of server
+    '''
+    bound_schema = [{"name": "bound_value", "type": GALYLEO_NUMBER}, {"name": "bound_day", "type": "date"}]
+    bound_rows = [[1, '2020-01-01'], [2, '2021-01-01']]
+    write_columnar_table(str(tmp_path / 'bounds'), 'bounds', bound_schema, bound_rows)
+    servers = {
+        'bound_rows': GalyleoDataServer(bound_schema, lambda: bound_rows),
+        'bound_columns': ColumnarDataServer.from_rows(bound_schema, bound_rows),
+        'bound_file': ColumnarFileDataServer(str(tmp_path / 'bounds')),
+        'bound_sqlite': SQLiteDataServer.from_rows(bound_schema, bound_rows)
+    }
+    app = Flask(__name__)
+    app.register_blueprint(galyleo_server_blueprint, url_prefix='/')
+    client = app.test_client()
+    bad_specs = [
+        {"operator": "IN_RANGE", "column": "bound_value", "min_val": "2020-01-01", "max_val": "2021-01-01"},
+        {"operator": "IN_RANGE", "column": "bound_day", "min_val": 0, "max_val": 1}
+    ]
+    good_spec = {"operator": "IN_RANGE", "column": "bound_day", "min_val": "2020-06-01", "max_val": "2021-06-01"}
+    for (table_name, server) in servers.items():
+        add_table_server(table_name, server)
+        for spec in bad_specs:
+            galyleo_response = client.get('/get_filtered_rows', headers = {"Table-Name": table_name, "Filter-Spec": dumps(spec)})
+            assert galyleo_response.status_code == 400, (table_name, spec)
+            assert 'cannot be compared' in galyleo_response.get_data(as_text = True)
+        galyleo_response = client.get('/get_filtered_rows', headers = {"Table-Name": table_name, "Filter-Spec": dumps(good_spec)})
+        assert loads(galyleo_response.data) == bound_rows[1:], table_name
+    servers['bound_sqlite'].close()
@@ -0,0 +1,126 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test the approximate column sketches against exact summaries
+'''
+
+import random
+from collections import Counter
+
+import pytest
+
+from galyleo.galyleo_columns import ColumnarDataServer
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_sketches import HyperLogLog, KLLSketch, SpaceSaving, TableSketch, column_summary
+from galyleo.galyleo_table_server import GalyleoDataServer, RowDataServer
+
+
+def test_sketches():
+    '''
+    Test each sketch against the exact answer, within its error bound
+    '''
+    generator = random.Random(0)
+    values = [int(generator.paretovariate(1.1)) for _ in range(50000)]
+    distinct = HyperLogLog()
+    frequent = SpaceSaving(32)
+    quantiles = KLLSketch()
+    for value in values:
+        distinct.add(value)
+        frequent.add(value)
+        quantiles.add(value)
+    true_distinct = len(set(values))
+    assert abs(distinct.estimate() - true_distinct) <= 4 * distinct.relative_error * true_distinct
+    small = HyperLogLog()
+    for value in ['a', 'b', 'c', 'a']:
+        small.add(value)
+    assert small.estimate() == 3
+    counts = Counter(values)
+    for (value, count, max_error) in frequent.top(5):
+        assert count - max_error <= counts[value] <= count
+    assert [value for (value, _, _) in frequent.top(3)] == [value for (value, _) in counts.most_common(3)]
+    ordered = sorted(values)
+    for q in [0.1, 0.5, 0.9, 0.99]:
+        value = quantiles.quantile(q)
+        low = ordered.index(value) / len(ordered)
+        high = (len(ordered) - ordered[::-1].index(value)) / len(ordered)
+        assert low - quantiles.rank_error <= q <= high + quantiles.rank_error
+    assert KLLSketch().quantile(0.5) is None
+    with pytest.raises(InvalidDataException, match='precision'):
+        HyperLogLog(20)
+
+
+def test_column_summary():
+    '''
+    Test exact and approximate summaries from the table servers
+    '''
+    schema = [{"name": "name", "type": "string"}, {"name": "value", "type": "number"}]
+    rows = [[f'n{i % 7}', i] for i in range(1000)] + [[None, None]]
+    exact = column_summary('number', [row[1] for row in rows], 3, [0, 0.5, 1])
+    assert exact["count"] == 1000 and exact["missing"] == 1 and exact["exact"]
+    assert exact["quantiles"] == [{"q": 0, "value": 0}, {"q": 0.5, "value": 499}, {"q": 1, "value": 999}]
+    assert column_summary('string', [row[0] for row in rows], 1, [0.5])["quantiles"] == []
+    server = GalyleoDataServer(schema, lambda: rows)
+    assert server.column_summary('name', 2)["top_values"] == [{"value": "n0", "count": 143, "max_error": 0}, {"value": "n1", "count": 143, "max_error": 0}]
+    shared_rows = list(rows)
+    unversioned = GalyleoDataServer(schema, lambda: shared_rows, sketches = True)
+    assert unversioned.column_summary('value', 3, [0.5])["exact"]
+    shared_rows.append(['n0', 1000])
+    assert unversioned.column_summary('value')["count"] == 1001
+    shared_rows.pop()
+    row_server = RowDataServer(schema, list(rows))
+    row_server.sketches = True
+    row_server.rows.append(['n0', 1000])
+    assert row_server.column_summary('value', 3, [0.5]) == column_summary('number', [row[1] for row in row_server.rows], 3, [0.5])
+    sketched = GalyleoDataServer(schema, lambda: shared_rows, single_flight = True, reuse_window = 60, sketches = True)
+    summary = sketched.column_summary('value', 3, [0.5])
+    assert not summary["exact"] and summary["count"] == 1000
+    assert abs(summary["quantiles"][0]["value"] - 500) <= 1000 * summary["quantile_rank_error"]
+    assert abs(summary["cardinality"]["estimate"] - 1000) <= 1000 * 4 * summary["cardinality"]["relative_error"]
+    assert sketched.column_summary('name', 7)["cardinality"]["estimate"] == 7
+    assert sketched._table_sketch() is sketched._table_sketch()  # pylint: disable=protected-access
+    old_sketch = sketched._table_sketch()  # pylint: disable=protected-access
+    sketched.get_rows.clear()
+    shared_rows.append(['n0', 1000])
+    assert sketched._table_sketch() is not old_sketch  # pylint: disable=protected-access
+    assert sketched.column_summary('value')["count"] == 1001
+    shared_rows.pop()
+    columnar = ColumnarDataServer.from_rows(schema, rows)
+    assert columnar.column_summary('name', 3) == server.column_summary('name', 3)
+    columnar.sketches = True
+    assert columnar.column_summary('name', 1)["top_values"][0]["count"] == 143
+    with pytest.raises(InvalidDataException, match='not a column'):
+        server.column_summary('no_such_column')
+    with pytest.raises(InvalidDataException, match='Quantiles must be'):
+        server.column_summary('value', 3, [2])
+    sketch = TableSketch(schema)
+    sketch.update(rows[:10])
+    sketch.update(rows[10:])
+    assert sketch.summary('value', 1, [1.0])["quantiles"] == [{"q": 1.0, "value": 999}]
@@ -0,0 +1,151 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test the SQLite-backed table server against the row server
+'''
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_schema import Schema
+from galyleo.galyleo_sqlite_server import SQLiteDataServer, filter_to_sql
+from galyleo.galyleo_table_server import GalyleoDataServer
+
+schema = Schema([{"name": "name", "type": "string"}, {"name": "age", "type": "number"}, {"name": "member", "type": "boolean"}, {"name": "joined", "type": "date"}])
+rows = [
+    ['Ann', 31, True, '2020-01-05'],
+    ['Bob', 45.5, False, '2019-07-30'],
+    ['Cy', 31, True, '2021-03-01'],
+    ['Di', 27, False, '2020-11-11'],
+    [None, 60, True, '2018-02-14'],
+    ['Ed', 19, True, '2022-06-30']
+]
+filter_specs = [
+    {"operator": "IN_LIST", "column": "name", "values": ["Ann", "Di", "Zed", 3]},
+    {"operator": "IN_RANGE", "column": "age", "min_val": 27, "max_val": 45.5},
+    {"operator": "IN_LIST", "column": "member", "values": [1]},
+    {"operator": "IN_RANGE", "column": "joined", "min_val": "2019-01-01", "max_val": "2020-12-31T12:00:00"},
+    {"operator": "IN_LIST", "column": "joined", "values": ["2021-03-01", "2018-02-14"]},
+    {"operator": "NONE", "arguments": [{"operator": "IN_LIST", "column": "name", "values": ["Ann"]}]},
+    {"operator": "ALL", "arguments": [
+        {"operator": "ANY", "arguments": [
+            {"operator": "IN_LIST", "column": "name", "values": ["Bob", "Cy", "Ed"]},
+            {"operator": "IN_RANGE", "column": "age", "min_val": 50, "max_val": 70}
+        ]},
+        {"operator": "NONE", "arguments": [{"operator": "IN_LIST", "column": "member", "values": [0]}]}
+    ]},
+    {"operator": "ALL", "arguments": []},
+    {"operator": "ANY", "arguments": []}
+]
+
+
+@pytest.fixture(name = 'servers')
+def fixture_servers():
+    '''
+    A row server and an SQLite server for the same table
+    '''
+    sqlite_server = SQLiteDataServer.from_rows(schema, rows)
+    yield GalyleoDataServer(schema, lambda: rows), sqlite_server
+    sqlite_server.close()
+
+
+@pytest.mark.parametrize('filter_spec', filter_specs)
+def test_filters_agree(servers, filter_spec):
+    '''
+    Test that each filter selects the same rows from both servers
+    '''
+    (row_server, sqlite_server) = servers
+    assert sqlite_server.get_filtered_rows(filter_spec) == row_server.get_filtered_rows(filter_spec)
+
+
+def test_statistics(servers):
+    '''
+    Test all_values, numeric_spec, aggregation and paging
+    '''
+    (row_server, sqlite_server) = servers
+    assert sqlite_server.get_rows() == rows
+    # the row server converts a missing string to 'None'; the database leaves it out
+    assert sqlite_server.all_values('name') == ['Ann', 'Bob', 'Cy', 'Di', 'Ed']
+    for column in ['age', 'member', 'joined']:
+        assert sqlite_server.all_values(column) == row_server.all_values(column)
+    assert sqlite_server.numeric_spec('age') == row_server.numeric_spec('age')
+    with pytest.raises(InvalidDataException):
+        sqlite_server.numeric_spec('name')
+    aggregate_spec = {"group_by": ["member"], "aggregates": [{"operator": "count"}, {"operator": "mean", "column": "age"}, {"operator": "min", "column": "joined"}]}
+    for filter_spec in [None, filter_specs[1]]:
+        assert sqlite_server.get_aggregated_rows(filter_spec, aggregate_spec) == row_server.get_aggregated_rows(filter_spec, aggregate_spec)
+    assert sqlite_server.get_aggregated_rows(filter_specs[-1], {})["rows"] == [[0]]
+    assert sqlite_server.get_rows_page(None, 2, 3) == rows[2:5]
+    assert sqlite_server.get_rows_page(filter_specs[2], 1) == row_server.get_rows_page(filter_specs[2], 1)
+    assert sqlite_server.column_summary('age')["cardinality"]["estimate"] == 5
+
+
+def test_sql_is_parameterized():
+    '''
+    Test that values reach the database as parameters, and that bad columns are caught
+    '''
+    (condition, parameters) = filter_to_sql({"operator": "IN_LIST", "column": "name", "values": ["x'); DROP TABLE t; --"]}, schema)
+    assert condition == '"name" IS NOT NULL AND "name" IN (?)' and parameters == ["x'); DROP TABLE t; --"]
+    with pytest.raises(InvalidDataException):
+        filter_to_sql({"operator": "IN_RANGE", "column": "height", "min_val": 0, "max_val": 1}, schema)
+
+
+def test_threads_and_files(tmp_path):
+    '''
+    Test a server on a database file, queried from several threads, which share a bounded
+    pool of connections
+    '''
+    database = str(tmp_path / 'table.db')
+    server = SQLiteDataServer.from_rows(schema, rows * 100, database, 'people')
+    server.insert_rows([['Flo', 50, False, '2023-01-01T08:00:00+02:00']])
+    with ThreadPoolExecutor(4) as executor:
+        counts = list(executor.map(lambda spec: len(server.get_filtered_rows(spec)), filter_specs[:4] * 4))
+    assert counts == [200, 400, 400, 300] * 4
+    threads = [threading.Thread(target = server.get_filtered_rows, args = (filter_specs[0],)) for _ in range(3 * server.pool_size)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 1 <= len(server._idle) <= server.pool_size  # pylint: disable=protected-access
+    server.close()
+    assert server._idle == []  # pylint: disable=protected-access
+    memory_server = SQLiteDataServer.from_rows(schema, rows)
+    memory_server.pool_size = 0
+    assert len(memory_server.get_filtered_rows(None)) == len(memory_server.get_filtered_rows(None)) == len(rows)
+    memory_server.close()
+    reopened = SQLiteDataServer(schema, database, 'people')
+    assert reopened.get_rows_page(None, 600) == [['Flo', 50, False, '2023-01-01']]
+    with pytest.raises(InvalidDataException):
+        SQLiteDataServer.from_rows(schema, rows, database, 'people')
+    reopened.close()
@@ -32,6 +32,9 @@
 Test the Table Server
 '''
 
+import threading
+import time
+
 import pandas as pd
 import pytest
 
@@ -39,6 +42,7 @@ from galyleo.galyleo_constants import GALYLEO_NUMBER, GALYLEO_STRING
 from galyleo.galyleo_exceptions import InvalidDataException
 # from tabnanny import check
 from galyleo.galyleo_table_server import (Filter, GalyleoDataServer,
+                                          SingleFlight, SnapshotRows,
                                           check_valid_spec)
 
 
@@ -126,9 +130,16 @@ def test_check_filter():
         check_valid_spec(spec)
     for bad_range in bad_ranges:
         bad_type = type(bad_range['min_val'])
-        message = f'The type of min_val for IN_RANGE must be a number, not {bad_type}'
+        if bad_type == str:
+            message = 'The min_val for IN_RANGE must be a number or an ISO date, datetime or time, not -3'
+        else:
+            message = f'The type of min_val for IN_RANGE must be a number, not {bad_type}'
         with pytest.raises(InvalidDataException, match=message):
             check_valid_spec(bad_range)
+    check_valid_spec({"operator": "IN_RANGE", 'column': 'd', 'max_val': '2024-03-01T12:00:00', 'min_val': '2024-01-01'})
+    check_valid_spec({"operator": "IN_RANGE", 'column': 't', 'max_val': '17:00', 'min_val': '09:30:00'})
+    with pytest.raises(InvalidDataException, match='must both be numbers or both be ISO strings'):
+        check_valid_spec({"operator": "IN_RANGE", 'column': 'd', 'max_val': '2024-03-01', 'min_val': 0})
     # Make sure recursion works well with good arguments:
     spec1 = {"operator": 'ALL', 'arguments': [good_ranges[0], good_ranges[1], good_list_spec]}
     spec2 = {"operator": 'ANY', 'arguments': [good_ranges[0], good_ranges[1], good_list_spec]}
@@ -363,6 +374,25 @@ def test_filter_any():
     filter_instance.arguments = []
     assert len(filter_instance.filter_index(rows)) == 0
 
+def test_parallel_filter():
+    '''
+    Test that chunked parallel evaluation gives the same result as serial evaluation
+    '''
+    presidential_rows = _presidential_vote_rows()
+    presidential_columns = ['Year', 'State', 'Name', 'Party', 'Votes', 'Percentage']
+    filter_spec = {
+        "operator": "ANY",
+        "arguments": [
+            {"operator": "IN_LIST", "column": 'State', "values": ["California", "Hawaii"]},
+            {"operator": "NONE", "arguments": [{"operator": "IN_RANGE", "column": "Year", "min_val": 1850, "max_val": 2010}]}
+        ]
+    }
+    filter_instance = Filter(filter_spec, presidential_columns)
+    serial_indices = filter_instance.filter_index(presidential_rows)
+    assert filter_instance.parallel_filter_index(presidential_rows, 3) == serial_indices
+    assert filter_instance.parallel_filter_index(presidential_rows, 4, use_processes = False) == serial_indices
+    assert filter_instance.filter(presidential_rows, 2, 10) == filter_instance.filter(presidential_rows)
+
 def _presidential_vote_rows():
     frame  = pd.read_csv('tests/presidential_vote.csv')
     return frame.to_numpy().tolist()
@@ -404,3 +434,132 @@ def test_galyleo_server():
     filtered_rows = filter_instance.filter( presidential_rows)
     server_rows = server.get_filtered_rows(filter_spec)
     assert filtered_rows == server_rows
+
+class _CountingLock:
+    '''
+    A lock which counts how many times it has been entered, so a test can tell when every
+    caller of a SingleFlight has joined the call in flight
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entered = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.entered += 1
+        return self
+
+    def __exit__(self, *args):
+        self._lock.release()
+
+
+def _wait_for(condition, timeout = 10):
+    '''
+    Wait until condition() is true, failing after timeout seconds
+    '''
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for the condition'
+        time.sleep(0.01)
+
+
+def _join_in_flight(single_flight, callers):
+    '''
+    Start a thread for each caller, and return once all of them have joined the call in
+    flight; the function called must block until the test releases it
+    '''
+    lock = single_flight._lock = _CountingLock() # pylint: disable=protected-access
+    threads = [threading.Thread(target = caller) for caller in callers]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: lock.entered == len(threads))
+    return threads
+
+
+def test_single_flight():
+    '''
+    Test that concurrent get_rows() calls share one call, that results are reused
+    within the reuse window, and that errors reach every waiting caller
+    '''
+    calls = []
+    release = threading.Event()
+    def get_rows():
+        calls.append(1)
+        assert release.wait(10)
+        return [[len(calls)]]
+    server = GalyleoDataServer([{"name": "count", "type": GALYLEO_NUMBER}], get_rows, single_flight=True)
+    results = []
+    threads = _join_in_flight(server.get_rows, [lambda: results.append(server.get_rows())] * 8)
+    assert len(calls) == 1
+    assert results == []
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [[[1]]] * 8
+    assert server.get_rows() == [[2]]
+    reused = SingleFlight(get_rows, reuse_window = 60)
+    assert reused() == [[3]]
+    assert reused() == [[3]]
+    reused.clear()
+    assert reused() == [[4]]
+    fail = threading.Event()
+    failed_calls = []
+    def failing_rows():
+        failed_calls.append(1)
+        assert fail.wait(10)
+        raise InvalidDataException('source unavailable')
+    failing = SingleFlight(failing_rows)
+    errors = []
+    def call_failing():
+        try:
+            failing()
+        except InvalidDataException as error:
+            errors.append(error)
+    threads = _join_in_flight(failing, [call_failing] * 4)
+    fail.set()
+    for thread in threads:
+        thread.join()
+    assert len(failed_calls) == 1
+    assert len(errors) == 4
+
+def test_snapshot_rows():
+    '''
+    Test that a snapshot is served while it is refreshed in the background, and that a
+    failing source keeps the old snapshot and backs off
+    '''
+    state = {"calls": 0, "fail": False}
+    release = threading.Event()
+    fail_times = []
+    def get_rows():
+        if state["fail"]:
+            fail_times.append(time.monotonic())
+            raise InvalidDataException('source unavailable')
+        state["calls"] += 1
+        if state["calls"] > 1:
+            assert release.wait(10)
+        return [[state["calls"]]]
+    server = GalyleoDataServer([{"name": "count", "type": GALYLEO_NUMBER}], get_rows, refresh_interval = 0.05)
+    assert server.snapshot_age() is None
+    assert server.get_rows() == [[1]]
+    changes = []
+    server.get_rows.add_listener(lambda: changes.append(1))
+    # the first refresh is blocked in get_rows, and the old snapshot is served meanwhile
+    _wait_for(lambda: state["calls"] == 2)
+    assert server.get_rows() == [[1]]
+    assert server.snapshot_age() >= 0
+    assert changes == []
+    release.set()
+    _wait_for(lambda: server.get_rows()[0][0] > 1)
+    _wait_for(lambda: len(changes) >= 1)
+    snapshot_rows = server.get_rows
+    state["fail"] = True
+    _wait_for(lambda: snapshot_rows.failures >= 3)
+    assert server.get_rows() == [[state["calls"]]]
+    # each retry waits at least refresh_interval, doubled for each earlier failure
+    assert fail_times[1] - fail_times[0] >= 0.05
+    assert fail_times[2] - fail_times[1] >= 0.1
+    assert server.snapshot_age() >= fail_times[2] - fail_times[0]
+    snapshot_rows.stop()
+    with pytest.raises(InvalidDataException):
+        SnapshotRows(get_rows, 0)
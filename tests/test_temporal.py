@@ -0,0 +1,103 @@
+# BSD 3-Clause License
+
+# Copyright (c) 2019-2022, engageLively
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Test temporal columns: parsing and formatting, and filters over date, datetime and timeofday
+columns in the row, columnar and on-disk servers
+'''
+
+import datetime
+
+import numpy
+import pytest
+
+from galyleo.galyleo_columnar_file import ColumnarFileDataServer, write_columnar_table
+from galyleo.galyleo_columns import ColumnarDataServer
+from galyleo.galyleo_exceptions import InvalidDataException
+from galyleo.galyleo_table_server import GalyleoDataServer
+from galyleo.galyleo_temporal import format_temporal, is_iso_temporal, parse_temporal
+
+schema = [{"name": "day", "type": "date"}, {"name": "when", "type": "datetime"},
+          {"name": "at", "type": "timeofday"}, {"name": "count", "type": "number"}]
+rows = [
+    [f'2024-01-{day:02d}', f'2024-01-{day:02d}T{day % 24:02d}:30:00', f'{day % 24:02d}:15:00', day]
+    for day in range(1, 32)
+] + [[None, None, None, 0]]
+
+range_specs = [
+    {"operator": "IN_RANGE", "column": "day", "min_val": "2024-01-10", "max_val": "2024-01-12"},
+    {"operator": "IN_RANGE", "column": "when", "min_val": "2024-01-05T05:30", "max_val": "2024-01-07"},
+    {"operator": "IN_RANGE", "column": "at", "min_val": "09:00", "max_val": "12:15:00"},
+    {"operator": "IN_LIST", "column": "day", "values": ["2024-01-03", "2024-01-31", "2024-02-01"]},
+    {"operator": "ALL", "arguments": [
+        {"operator": "IN_RANGE", "column": "day", "min_val": "2024-01-01", "max_val": "2024-01-20"},
+        {"operator": "IN_RANGE", "column": "at", "min_val": "10:00", "max_val": "23:59"}
+    ]}
+]
+expected_counts = [[10, 11, 12], [5, 6], [9, 10, 11, 12], [3, 31], [10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20]]
+
+
+def test_parse_and_format():
+    '''
+    Test that parsing and formatting round-trip, with missing values and fractional seconds
+    '''
+    values = ['2024-03-01T12:30:00', '2024-03-01T12:30:00.250000', None]
+    assert format_temporal('datetime', parse_temporal('datetime', values)) == values
+    assert format_temporal('datetime', parse_temporal('datetime', ['2024-03-01 12:30', datetime.datetime(2024, 3, 1)])) == ['2024-03-01T12:30:00', '2024-03-01T00:00:00']
+    assert format_temporal('date', parse_temporal('date', [datetime.date(2024, 3, 1), '', '2024-03-02T10:00'])) == ['2024-03-01', None, '2024-03-02']
+    assert format_temporal('timeofday', parse_temporal('timeofday', ['09:05', datetime.time(23, 59, 59)])) == ['09:05:00', '23:59:59']
+    assert parse_temporal('datetime', numpy.array(['2024-01-01'])).dtype == numpy.dtype('datetime64[us]')
+    with pytest.raises(InvalidDataException, match='Bad date value'):
+        parse_temporal('date', ['yesterday'])
+    assert [is_iso_temporal(value) for value in ['2024-01-01', '10:00', '-3', '2024', 2024]] == [True, True, False, False, False]
+    with pytest.warns(UserWarning):
+        assert is_iso_temporal('2024-01-01T10:00Z')
+
+
+def test_temporal_filters(tmp_path):
+    '''
+    Test that the row, columnar and on-disk servers give the same results for filters over
+    temporal columns, and serve ISO strings
+    '''
+    row_server = GalyleoDataServer(schema, lambda: rows)
+    columnar_server = ColumnarDataServer.from_rows(schema, rows)
+    path = str(tmp_path / 'temporal')
+    write_columnar_table(path, 'temporal', schema, rows, block_size = 4)
+    file_server = ColumnarFileDataServer(path)
+    assert columnar_server.get_rows() == rows
+    assert file_server.get_rows() == rows
+    for server in [row_server, columnar_server, file_server]:
+        for (spec, counts) in zip(range_specs, expected_counts):
+            assert [row[3] for row in server.get_filtered_rows(spec)] == counts
+        assert server.all_values('at')[:2] == ['00:15:00', '01:15:00']
+    assert columnar_server.all_values('day') == [row[0] for row in rows[:-1]]
+    assert len(file_server.candidate_blocks(range_specs[0])) == 1
+    with pytest.raises(InvalidDataException, match='cannot be compared with a date column'):
+        columnar_server.get_filtered_rows({"operator": "IN_RANGE", "column": "day", "min_val": 0, "max_val": 1})